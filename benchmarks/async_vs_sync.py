@@ -0,0 +1,118 @@
+"""
+Benchmark: asyncpg ingest and partition aggregation against the sync path.
+
+Loads the same number of synthetic rows with ingest_data_streaming (one
+psycopg2 COPY connection) and with async_pipeline.run_ingest_async
+(concurrent copy_records_to_table), transforms them into day partitions,
+then aggregates the partitions one after another (aggregate_partition) and
+concurrently (run_aggregations_async). Both aggregations must leave the
+analytics tables identical; they are truncated before each run.
+
+Usage:
+    DATABASE_URL=postgresql://... python benchmarks/async_vs_sync.py --records 500000
+"""
+import argparse
+import os
+import sys
+import time
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pipeline.aggregate import aggregate_partition, finalize_aggregations
+from pipeline.async_pipeline import run_aggregations_async, run_ingest_async
+from pipeline.db_utils import get_engine
+from pipeline.ingest import ingest_data_streaming
+from pipeline.transform import clean_data_partition, merge_transform_results, plan_transform_partitions
+
+
+ANALYTICS_TABLES = [
+    'analytics.daily_airline_stats',
+    'analytics.route_daily_stats',
+    'analytics.route_performance',
+    'analytics.daily_airline_delay_histogram',
+    'analytics.route_daily_delay_histogram'
+]
+
+
+def snapshot(conn):
+    """md5 of every analytics table's rows, ignoring created_at and ids."""
+    checksums = {}
+    for table in ANALYTICS_TABLES:
+        schema, name = table.split('.')
+        columns = conn.execute(text("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = :schema AND table_name = :name AND column_name NOT IN ('id', 'created_at')
+        ORDER BY ordinal_position
+        """), {'schema': schema, 'name': name}).scalars().all()
+        row = f"({', '.join(columns)})::text"
+        checksums[table] = conn.execute(
+            text(f"SELECT md5(COALESCE(string_agg({row}, '|' ORDER BY {row}), '')) FROM {table}")
+        ).scalar()
+    return checksums
+
+
+def truncate_analytics(engine):
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {', '.join(ANALYTICS_TABLES)}"))
+
+
+def timed(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    print(f"{label:<32}{seconds:>10.2f}s")
+    return result, seconds
+
+
+def aggregate_sync(partitions):
+    return finalize_aggregations([aggregate_partition(**partition) for partition in partitions])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--records', type=int, default=200_000, help='Rows to ingest with each path')
+    parser.add_argument('--chunk-size', type=int, default=25_000, help='Rows per generated chunk')
+    parser.add_argument('--pool-size', type=int, default=None,
+                        help='asyncpg connections (DatabaseConfig.async_pool_size otherwise)')
+    args = parser.parse_args()
+    
+    engine = get_engine()
+    results = {}
+    
+    _, results['sync ingest'] = timed(
+        'sync ingest', ingest_data_streaming, num_records=args.records, chunk_size=args.chunk_size, seed=1
+    )
+    _, results['async ingest'] = timed(
+        'async ingest', run_ingest_async,
+        num_records=args.records, chunk_size=args.chunk_size, seed=2, pool_size=args.pool_size
+    )
+    
+    partitions = plan_transform_partitions(granularity='day')
+    partitions = merge_transform_results([clean_data_partition(**partition) for partition in partitions])
+    
+    truncate_analytics(engine)
+    _, results['sync aggregate'] = timed(f'sync aggregate ({len(partitions)} days)', aggregate_sync, partitions)
+    with engine.connect() as conn:
+        expected = snapshot(conn)
+    
+    truncate_analytics(engine)
+    _, results['async aggregate'] = timed(
+        f'async aggregate ({len(partitions)} days)', run_aggregations_async, partitions, pool_size=args.pool_size
+    )
+    with engine.connect() as conn:
+        actual = snapshot(conn)
+    
+    mismatched = [table for table in ANALYTICS_TABLES if expected[table] != actual[table]]
+    if mismatched:
+        raise SystemExit(f"Async aggregation differs from sync in: {', '.join(mismatched)}")
+    
+    print()
+    print(f"ingest speedup:    {results['sync ingest'] / results['async ingest']:.2f}x")
+    print(f"aggregate speedup: {results['sync aggregate'] / results['async aggregate']:.2f}x")
+    print("Analytics tables are identical after both aggregations")
+
+
+if __name__ == '__main__':
+    main()
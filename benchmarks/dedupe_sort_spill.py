@@ -0,0 +1,103 @@
+"""
+Benchmark: sort spill of the raw.flights dedupe before and after key_hash.
+
+Runs EXPLAIN (ANALYZE, BUFFERS) for the full-rebuild dedupe ordered on the
+six natural key columns (the old query) and for transform._dedupe_query,
+which reads rows in idx_flights_key_hash order, and reports execution time,
+sort methods and temp blocks written for each.
+
+Usage:
+    DATABASE_URL=postgresql://... python benchmarks/dedupe_sort_spill.py --records 1000000
+"""
+import argparse
+import os
+import sys
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pipeline.db_utils import get_engine
+from pipeline.ingest import ingest_data_streaming
+from pipeline.transform import _dedupe_query, _get_max_raw_id
+
+
+NATURAL_KEY_DEDUPE_SQL = """
+SELECT DISTINCT ON (flight_date, airline, flight_number, origin, destination, scheduled_departure)
+    id as raw_id, flight_date, airline, flight_number, origin, destination, scheduled_departure,
+    actual_departure, scheduled_arrival, actual_arrival, departure_delay, arrival_delay,
+    cancelled, cancellation_reason, distance
+FROM raw.flights
+WHERE id <= :max_id
+ORDER BY flight_date, airline, flight_number, origin, destination, scheduled_departure, created_at DESC, id DESC
+"""
+
+
+def _walk(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _walk(child)
+
+
+def explain(conn, query, params, work_mem=None):
+    """
+    Run one dedupe under EXPLAIN ANALYZE.
+    
+    Returns:
+        Dict of execution_ms, temp_written_mb and the distinct sort methods used
+    """
+    if work_mem:
+        conn.execute(text(f"SET LOCAL work_mem = '{work_mem}'"))
+    result = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"), params).scalar()
+    root = result[0]
+    nodes = list(_walk(root['Plan']))
+    
+    methods = set()
+    for node in nodes:
+        if node.get('Sort Method'):
+            methods.add(node['Sort Method'])
+        for worker in node.get('Workers', []):
+            if worker.get('Sort Method'):
+                methods.add(worker['Sort Method'])
+        for group in ('Full-sort Groups', 'Pre-sorted Groups'):
+            methods.update(node.get(group, {}).get('Sort Methods Used', []))
+    
+    return {
+        'execution_ms': root['Execution Time'],
+        'temp_written_mb': root['Plan'].get('Temp Written Blocks', 0) * 8 / 1024,
+        'sort_methods': sorted(methods) or ['none']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--records', type=int, default=0,
+                        help='Rows to ingest into raw.flights before measuring')
+    parser.add_argument('--work-mem', default=None,
+                        help="work_mem for the measured queries, e.g. '4MB' (server default otherwise)")
+    args = parser.parse_args()
+    
+    engine = get_engine()
+    
+    if args.records:
+        ingest_data_streaming(num_records=args.records)
+    
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE raw.flights"))
+        conn.commit()
+        max_id = _get_max_raw_id(conn)
+        total = conn.execute(text("SELECT COUNT(*) FROM raw.flights")).scalar()
+    
+    print(f"Deduplicating {total:,} raw.flights rows")
+    print(f"{'query':<24}{'time (ms)':>12}{'temp written (MB)':>20}  sort methods")
+    for name, query in (('natural key order', NATURAL_KEY_DEDUPE_SQL), ('key_hash order', _dedupe_query())):
+        with engine.begin() as conn:
+            stats = explain(conn, query, {'max_id': max_id}, args.work_mem)
+        print(
+            f"{name:<24}{stats['execution_ms']:>12,.0f}{stats['temp_written_mb']:>20,.1f}  "
+            f"{', '.join(stats['sort_methods'])}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,18 @@
 """
 Flight Delay Analytics Pipeline DAG
 Orchestrates the ETL process: Ingest -> Transform -> Aggregate
+
+A quality gate on the newly ingested batch runs before any transform work
+and short-circuits the rest of the run when it fails. Transform and
+aggregate fan out with dynamic task mapping, one mapped task
+per flight_date month of the newly ingested rows, so partitions run in
+parallel on LocalExecutor workers; a fan-in task after each stage merges
+the partition results.
 """
 from datetime import datetime, timedelta
 from airflow import DAG
-from airflow.operators.python import PythonOperator
-from airflow.operators.bash import BashOperator
+from airflow.operators.python import PythonOperator, ShortCircuitOperator
+from airflow.utils.trigger_rule import TriggerRule
 import sys
 import os
 
@@ -13,8 +20,10 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from pipeline.ingest import ingest_data
-from pipeline.transform import clean_data
-from pipeline.aggregate import run_aggregations
+from pipeline.transform import clean_data_partition, merge_transform_results, plan_transform_partitions
+from pipeline.aggregate import aggregate_partition, finalize_aggregations
+from pipeline.partitions import enforce_retention
+from pipeline.quality_checks import run_quality_checks
 
 
 default_args = {
@@ -33,6 +42,8 @@ dag = DAG(
     description='ETL pipeline for flight delay analytics',
     schedule_interval='0 2 * * *',  # Run daily at 2 AM
     catchup=False,
+    # Partitions are planned from the transform watermark, so runs must not overlap
+    max_active_runs=1,
     tags=['etl', 'flight-data', 'analytics'],
 )
 
@@ -43,30 +54,65 @@ ingest_task = PythonOperator(
     dag=dag,
 )
 
-# Task 2: Transform and clean data
-transform_task = PythonOperator(
+# Task 2: Check the new batch before transforming it; an empty batch, or one
+# where more than MAX_REJECT_RATIO of the rows would be rejected, skips every
+# downstream task (see run_incremental_checks for how to push a held batch
+# through by hand)
+quality_check_task = ShortCircuitOperator(
+    task_id='data_quality_check',
+    python_callable=run_quality_checks,
+    op_kwargs={'strategy': 'incremental'},
+    dag=dag,
+)
+
+# Task 3: Split the new raw rows into flight_date partitions
+plan_task = PythonOperator(
+    task_id='plan_partitions',
+    python_callable=plan_transform_partitions,
+    op_kwargs={'granularity': 'month'},
+    dag=dag,
+)
+
+# Task 4: Transform and clean each partition in parallel
+transform_task = PythonOperator.partial(
     task_id='transform_flight_data',
-    python_callable=clean_data,
+    python_callable=clean_data_partition,
+    dag=dag,
+).expand(op_kwargs=plan_task.output)
+
+# Task 5: Combine partition counts and advance the transform watermark
+merge_transform_task = PythonOperator(
+    task_id='merge_transform_results',
+    python_callable=merge_transform_results,
+    op_args=[transform_task.output],
+    # Nothing new to transform maps zero tasks, which Airflow marks skipped
+    trigger_rule=TriggerRule.NONE_FAILED,
     dag=dag,
 )
 
-# Task 3: Aggregate analytics
-aggregate_task = PythonOperator(
+# Task 6: Aggregate each changed partition in parallel
+aggregate_task = PythonOperator.partial(
     task_id='aggregate_analytics',
-    python_callable=run_aggregations,
+    python_callable=aggregate_partition,
+    dag=dag,
+).expand(op_kwargs=merge_transform_task.output)
+
+# Task 7: Merge route performance and airline stats across partitions
+finalize_aggregate_task = PythonOperator(
+    task_id='finalize_aggregations',
+    python_callable=finalize_aggregations,
+    op_args=[aggregate_task.output],
+    trigger_rule=TriggerRule.NONE_FAILED,
     dag=dag,
 )
 
-# Task 4: Data quality check
-quality_check_task = BashOperator(
-    task_id='data_quality_check',
-    bash_command='''
-    echo "Running data quality checks..."
-    # Add custom quality checks here
-    echo "Quality checks passed"
-    ''',
+# Task 8: Drop partitions past the retention window
+retention_task = PythonOperator(
+    task_id='enforce_retention',
+    python_callable=enforce_retention,
     dag=dag,
 )
 
 # Define task dependencies
-ingest_task >> transform_task >> aggregate_task >> quality_check_task
+ingest_task >> quality_check_task >> plan_task >> transform_task >> merge_transform_task
+merge_transform_task >> aggregate_task >> finalize_aggregate_task >> retention_task
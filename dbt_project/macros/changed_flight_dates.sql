@@ -0,0 +1,14 @@
+-- Flight dates of raw rows loaded since the newest raw id an incremental
+-- model has seen (its source_raw_id column).
+--
+-- daily_airline_stats evaluates this twice: in its pre-hook delete and again
+-- in the model query, after the delete. If the delete removed the rows
+-- holding the newest source_raw_id, the second evaluation uses a lower
+-- watermark and only widens the set of dates rebuilt.
+
+{% macro changed_flight_dates(relation) %}
+    SELECT DISTINCT flight_date
+    FROM {{ source('raw', 'flights') }}
+    WHERE flight_date IS NOT NULL
+        AND id > (SELECT COALESCE(MAX(source_raw_id), 0) FROM {{ relation }})
+{% endmacro %}
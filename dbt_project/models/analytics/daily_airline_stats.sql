@@ -1,9 +1,32 @@
 -- Daily airline performance metrics
 -- Aggregates flight statistics by date and airline
+--
+-- Incremental: only flight dates that received raw rows (by raw id) since
+-- the last run are recomputed, replacing every airline row of those dates
+-- (delete+insert on flight_date). The dates come from raw.flights rather
+-- than stg_flights, and the pre-hook deletes them before the insert: the
+-- delete+insert alone only replaces dates the query returns rows for, so a
+-- date whose latest rows were all rejected would keep its old stats.
+-- Rebuild every date with
+-- `dbt run --full-refresh --select daily_airline_stats` (also needed once
+-- when upgrading from the created_at watermark, which used a
+-- source_loaded_at column).
 
 {{ config(
-    materialized='table',
-    schema='analytics'
+    materialized='incremental',
+    schema='analytics',
+    unique_key='flight_date',
+    incremental_strategy='delete+insert',
+    on_schema_change='fail',
+    indexes=[
+        {'columns': ['flight_date', 'airline'], 'unique': True}
+    ],
+    pre_hook="""
+        {% if is_incremental() %}
+        DELETE FROM {{ this }}
+        WHERE flight_date IN ({{ changed_flight_dates(this) }})
+        {% endif %}
+    """
 ) }}
 
 SELECT 
@@ -15,6 +38,10 @@ SELECT
     ROUND(AVG(CASE WHEN NOT cancelled THEN arrival_delay END), 2) as avg_arrival_delay,
     ROUND(100.0 * SUM(CASE WHEN NOT cancelled AND arrival_delay <= 15 THEN 1 ELSE 0 END) / 
         NULLIF(SUM(CASE WHEN NOT cancelled THEN 1 ELSE 0 END), 0), 2) as on_time_percentage,
+    MAX(raw_id) as source_raw_id,
     CURRENT_TIMESTAMP as created_at
 FROM {{ ref('stg_flights') }}
+{% if is_incremental() %}
+WHERE flight_date IN ({{ changed_flight_dates(this) }})
+{% endif %}
 GROUP BY flight_date, airline
@@ -1,20 +1,69 @@
 -- Staging model: Clean and deduplicate raw flight data
 -- This model serves as the foundation for all analytics
+--
+-- Incremental: each run only dedupes raw rows with an id above the newest
+-- raw_id already in the model and replaces those natural keys (delete+insert
+-- on flight_key). The watermark is the raw id rather than created_at:
+-- created_at is the loading transaction's start time, so a load that
+-- commits after a later-started one would fall behind the watermark.
+-- Rebuild from all of raw with `dbt run --full-refresh --select stg_flights+`
+-- (also needed once when upgrading from the created_at watermark, which
+-- added the raw_id column).
+--
+-- With upsert ingest (INGEST_MODE=upsert) raw.flights already holds one row
+-- per flight; run with `--vars '{raw_deduplicated: true}'` to skip the
+-- DISTINCT ON and its sort.
 
 {{ config(
-    materialized='view',
-    schema='staging'
+    materialized='incremental',
+    schema='staging',
+    unique_key='flight_key',
+    incremental_strategy='delete+insert',
+    on_schema_change='fail',
+    indexes=[
+        {'columns': ['flight_key'], 'unique': True},
+        {'columns': ['flight_date']},
+        {'columns': ['raw_id']}
+    ],
+    post_hook="""
+        -- Keys whose latest version has an invalid delay (> 24 hours) are
+        -- dropped, replacing any older valid version the model held
+        DELETE FROM {{ this }}
+        WHERE departure_delay < -60 OR departure_delay > 1440
+            OR arrival_delay < -60 OR arrival_delay > 1440
+    """
 ) }}
 
-WITH deduplicated AS (
-    SELECT DISTINCT ON (
+WITH source AS (
+    SELECT *
+    FROM {{ source('raw', 'flights') }}
+    WHERE flight_date IS NOT NULL
+        AND airline IS NOT NULL
+        AND origin IS NOT NULL
+        AND destination IS NOT NULL
+    {% if is_incremental() %}
+        -- Keys the post-hook dropped can lower MAX(raw_id); rows re-read
+        -- because of that are replaced idempotently by the delete+insert
+        AND id > (SELECT COALESCE(MAX(raw_id), 0) FROM {{ this }})
+    {% endif %}
+),
+
+-- The ORDER BY is idx_flights_key_hash's column order, so rows can come off
+-- the index instead of sorting all of raw on the six key columns
+deduplicated AS (
+    SELECT {% if not var('raw_deduplicated', false) %}DISTINCT ON (
+        key_hash,
         flight_date, 
         airline, 
         flight_number, 
         origin, 
         destination, 
         scheduled_departure
-    )
+    ){% endif %}
+        MD5(CONCAT_WS('|',
+            flight_date, airline, COALESCE(flight_number, '\N'), origin, destination,
+            COALESCE(scheduled_departure::text, '\N')
+        )) as flight_key,
         flight_date,
         airline,
         flight_number,
@@ -29,29 +78,22 @@ WITH deduplicated AS (
         cancelled,
         cancellation_reason,
         distance,
+        id as raw_id,
         created_at
-    FROM {{ source('raw', 'flights') }}
-    WHERE flight_date IS NOT NULL
-        AND airline IS NOT NULL
-        AND origin IS NOT NULL
-        AND destination IS NOT NULL
+    FROM source
+    {% if not var('raw_deduplicated', false) %}
     ORDER BY 
+        key_hash,
         flight_date, 
         airline, 
         flight_number, 
         origin, 
         destination, 
         scheduled_departure,
-        created_at DESC
-),
-
-cleaned AS (
-    SELECT *
-    FROM deduplicated
-    WHERE 
-        -- Filter out invalid delays (> 24 hours)
-        (departure_delay IS NULL OR (departure_delay >= -60 AND departure_delay <= 1440))
-        AND (arrival_delay IS NULL OR (arrival_delay >= -60 AND arrival_delay <= 1440))
+        created_at DESC,
+        id DESC
+    {% endif %}
 )
 
-SELECT * FROM cleaned
+-- Invalid rows are kept until the post-hook so they still replace their key
+SELECT * FROM deduplicated
@@ -14,6 +14,11 @@ class DatabaseConfig:
     user: str = 'airflow'
     password: str = 'airflow'
     database: str = 'airflow'
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_pre_ping: bool = True
+    pool_recycle_seconds: int = 1800
+    async_pool_size: int = 4
     
     @property
     def connection_string(self) -> str:
@@ -28,6 +33,16 @@ class PipelineConfig:
     max_retries: int = 3
     retry_delay_seconds: int = 60
     data_retention_days: int = 90
+    num_records: int = 1000
+    chunk_size: int = 100_000
+    ingest_mode: str = 'append'
+    ingest_workers: int = 1
+    landing_dir: Optional[str] = None
+    kpi_cache_mb: int = 64
+    kpi_cache_dir: Optional[str] = None
+    telemetry_enabled: bool = True
+    telemetry_path: Optional[str] = None
+    max_reject_ratio: float = 0.05
 
 
 @dataclass
@@ -45,14 +60,29 @@ class Config:
             port=int(os.getenv('DB_PORT', '5432')),
             user=os.getenv('DB_USER', 'airflow'),
             password=os.getenv('DB_PASSWORD', 'airflow'),
-            database=os.getenv('DB_NAME', 'airflow')
+            database=os.getenv('DB_NAME', 'airflow'),
+            pool_size=int(os.getenv('DB_POOL_SIZE', '5')),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '10')),
+            pool_pre_ping=os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true',
+            pool_recycle_seconds=int(os.getenv('DB_POOL_RECYCLE', '1800')),
+            async_pool_size=int(os.getenv('DB_ASYNC_POOL_SIZE', '4'))
         )
         
         pipeline_config = PipelineConfig(
             batch_size=int(os.getenv('BATCH_SIZE', '1000')),
             max_retries=int(os.getenv('MAX_RETRIES', '3')),
             retry_delay_seconds=int(os.getenv('RETRY_DELAY', '60')),
-            data_retention_days=int(os.getenv('DATA_RETENTION_DAYS', '90'))
+            data_retention_days=int(os.getenv('DATA_RETENTION_DAYS', '90')),
+            num_records=int(os.getenv('NUM_RECORDS', '1000')),
+            chunk_size=int(os.getenv('CHUNK_SIZE', '100000')),
+            ingest_mode=os.getenv('INGEST_MODE', 'append'),
+            ingest_workers=int(os.getenv('INGEST_WORKERS', '1')),
+            landing_dir=os.getenv('LANDING_DIR') or None,
+            kpi_cache_mb=int(os.getenv('KPI_CACHE_MB', '64')),
+            kpi_cache_dir=os.getenv('KPI_CACHE_DIR') or None,
+            telemetry_enabled=os.getenv('TELEMETRY_ENABLED', 'true').lower() == 'true',
+            telemetry_path=os.getenv('TELEMETRY_PATH') or None,
+            max_reject_ratio=float(os.getenv('MAX_REJECT_RATIO', '0.05'))
         )
         
         return cls(
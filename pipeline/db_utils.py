@@ -1,9 +1,18 @@
 """
 Database utility functions.
 """
-from sqlalchemy import create_engine, text
+from sqlalchemy import bindparam, create_engine, event, text
 from contextlib import contextmanager
+from contextvars import ContextVar
+import io
 import os
+import threading
+import time
+import weakref
+
+import numpy as np
+
+from pipeline.config import config
 
 
 def get_connection_string():
@@ -14,22 +23,167 @@ def get_connection_string():
     )
 
 
+_engines = {}
+_engines_lock = threading.Lock()
+
+_current_task = ContextVar('current_task', default=None)
+_pool_metrics = {}
+_pool_metrics_lock = threading.Lock()
+
+
+def get_current_task():
+    """Name checkouts are attributed to: the tracked task, else the Airflow task id."""
+    return _current_task.get() or os.getenv('AIRFLOW_CTX_TASK_ID', 'default')
+
+
+@contextmanager
+def track_task(name):
+    """
+    Attribute connection checkouts made inside the block to ``name``.
+    
+    Usage:
+        with track_task('transform'):
+            clean_data()
+        print(get_pool_metrics('transform'))
+    """
+    token = _current_task.set(name)
+    try:
+        yield
+    finally:
+        _current_task.reset(token)
+
+
+def _task_metrics(task):
+    return _pool_metrics.setdefault(task, {
+        'checkouts': 0,
+        'connects': 0,
+        'checked_out': 0,
+        'held_seconds': 0.0
+    })
+
+
+def _register_pool_metrics(engine):
+    """Count checkouts, new connections and time held per task on the engine's pool."""
+    
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        with _pool_metrics_lock:
+            _task_metrics(get_current_task())['connects'] += 1
+    
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        task = get_current_task()
+        connection_record.info['checkout_task'] = task
+        connection_record.info['checkout_at'] = time.perf_counter()
+        with _pool_metrics_lock:
+            metrics = _task_metrics(task)
+            metrics['checkouts'] += 1
+            metrics['checked_out'] += 1
+    
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        task = connection_record.info.pop('checkout_task', None)
+        checkout_at = connection_record.info.pop('checkout_at', None)
+        if task is None:
+            return
+        with _pool_metrics_lock:
+            metrics = _task_metrics(task)
+            metrics['checked_out'] -= 1
+            metrics['held_seconds'] += time.perf_counter() - checkout_at
+
+
+def get_pool_metrics(task=None):
+    """
+    Get connection pool checkout metrics.
+    
+    Args:
+        task: Task name to report (defaults to every task seen so far)
+    
+    Returns:
+        Dict of checkouts, new connections, currently checked out and
+        seconds held, either for ``task`` or keyed by task name
+    """
+    with _pool_metrics_lock:
+        if task is not None:
+            return dict(_pool_metrics.get(task, {}))
+        return {name: dict(metrics) for name, metrics in _pool_metrics.items()}
+
+
+def reset_pool_metrics():
+    """Clear all recorded pool metrics."""
+    with _pool_metrics_lock:
+        _pool_metrics.clear()
+
+
+def get_engine(connection_string=None):
+    """
+    Get the process-wide engine for a database URL.
+    
+    Engines are created once per URL and cached, so every module in a DAG
+    run shares one connection pool instead of reconnecting per function.
+    Pool sizing, pre-ping and recycling come from DatabaseConfig.
+    
+    Args:
+        connection_string: Database URL (defaults to get_connection_string())
+    
+    Returns:
+        SQLAlchemy engine
+    """
+    url = connection_string or get_connection_string()
+    with _engines_lock:
+        engine = _engines.get(url)
+        if engine is None:
+            db_config = config.database
+            engine = create_engine(
+                url,
+                future=True,
+                pool_size=db_config.pool_size,
+                max_overflow=db_config.max_overflow,
+                pool_pre_ping=db_config.pool_pre_ping,
+                pool_recycle=db_config.pool_recycle_seconds
+            )
+            _register_pool_metrics(engine)
+            _engines[url] = engine
+    return engine
+
+
+def dispose_engines():
+    """Close every pooled connection and forget the cached engines."""
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for engine in engines:
+        engine.dispose()
+
+
+def _reset_pools_after_fork():
+    # Connections inherited from the parent must not be reused by a forked
+    # child; dispose(close=False) needs SQLAlchemy 1.4.33+ (see requirements.txt)
+    for engine in list(_engines.values()):
+        engine.dispose(close=False)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
 @contextmanager
 def get_db_session():
     """
     Context manager for database sessions.
     
+    Checks a connection out of the shared engine pool and returns it to the
+    pool afterwards.
+    
     Usage:
         with get_db_session() as session:
             result = session.execute(query)
     """
-    engine = create_engine(get_connection_string())
-    connection = engine.connect()
+    connection = get_engine().connect()
     try:
         yield connection
     finally:
         connection.close()
-        engine.dispose()
 
 
 def execute_query(query, params=None):
@@ -69,3 +223,260 @@ def execute_update(query, params=None):
             result = session.execute(text(query))
         session.commit()
         return result.rowcount
+
+
+# Floats at or beyond 2**63 in magnitude do not fit in an int64
+INT64_LIMIT = 2.0 ** 63
+
+
+def _prepare_copy_frame(df):
+    """
+    Coerce a DataFrame into a shape COPY can read back unambiguously.
+    
+    Float columns that only hold whole numbers within the int64 range
+    (pandas' representation of nullable integers, e.g. after read_sql) are
+    written as Int64 so Postgres INTEGER columns do not receive values like
+    '15.0'; larger or infinite values stay floats. Naive datetime columns
+    are pre-formatted with NumPy, which is several times faster than the
+    per-value formatting ``to_csv`` does for them.
+    """
+    df = df.copy(deep=False)
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind == 'M':
+            values = series.to_numpy()
+            formatted = np.datetime_as_string(values, unit='us').astype(object)
+            df[column] = np.where(np.isnat(values), None, formatted)
+        elif series.dtype.kind == 'f':
+            values = series.dropna()
+            if (values == values.round()).all() and (values.abs() < INT64_LIMIT).all():
+                df[column] = series.astype('Int64')
+    return df
+
+
+def copy_to_table(cursor, df, table, columns=None, batch_size=None):
+    """
+    Stream a DataFrame into a table with COPY ... FROM STDIN (CSV).
+    
+    Does not commit; the caller owns the transaction.
+    
+    Args:
+        cursor: psycopg2 cursor
+        df: DataFrame to load
+        table: Schema-qualified target table name
+        columns: Optional column list (defaults to the DataFrame columns)
+        batch_size: Cap on the rows per COPY, which bounds the CSV buffer
+            (defaults to PipelineConfig.chunk_size)
+    
+    Returns:
+        Number of rows copied
+    """
+    columns = list(columns) if columns is not None else list(df.columns)
+    step = batch_size or config.pipeline.chunk_size
+    for start in range(0, len(df), step):
+        buffer = io.StringIO()
+        _prepare_copy_frame(df.iloc[start:start + step][columns]).to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    return len(df)
+
+
+def copy_frames(frames, table_name, engine, schema='raw', batch_size=None):
+    """
+    Bulk load an iterable of DataFrames into Postgres using COPY.
+    
+    Frames are consumed lazily, so a generator of chunks is loaded without
+    ever holding more than one chunk in memory. Everything is streamed over
+    a single psycopg2 connection, one COPY per frame, and committed once at
+    the end.
+    
+    Args:
+        frames: Iterable of DataFrames with identical columns
+        table_name: Target table name
+        engine: SQLAlchemy engine
+        schema: Target schema
+        batch_size: Cap on the rows per COPY, which bounds the CSV buffer
+            (defaults to PipelineConfig.chunk_size, so a streamed chunk is
+            one COPY and a whole-table frame is split)
+    
+    Returns:
+        Number of rows loaded
+    """
+    table = f'{schema}.{table_name}'
+    rows_loaded = 0
+    start_time = time.time()
+    
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for df in frames:
+            rows_loaded += copy_to_table(cursor, df, table, batch_size=batch_size)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    
+    duration = time.time() - start_time
+    rows_per_sec = rows_loaded / duration if duration > 0 else float(rows_loaded)
+    print(f"Copied {rows_loaded} rows to {table} in {duration:.2f}s ({rows_per_sec:,.0f} rows/sec)")
+    
+    return rows_loaded
+
+
+def copy_dataframe(df, table_name, engine, schema='raw', batch_size=None):
+    """
+    Bulk load a DataFrame into Postgres using COPY instead of INSERTs.
+    
+    Args:
+        df: DataFrame to load
+        table_name: Target table name
+        engine: SQLAlchemy engine
+        schema: Target schema
+        batch_size: Cap on the rows per COPY (defaults to PipelineConfig.chunk_size)
+    
+    Returns:
+        Number of rows loaded
+    """
+    return copy_frames([df], table_name, engine, schema=schema, batch_size=batch_size)
+
+
+def get_watermark(connection, name):
+    """
+    Read the high-water mark recorded for an incremental job.
+    
+    Args:
+        connection: SQLAlchemy connection (inside the job's transaction)
+        name: Watermark name, e.g. 'transform.flights_clean'
+    
+    Returns:
+        Last processed id, or 0 if the job has never run
+    """
+    result = connection.execute(
+        text("SELECT last_id FROM staging.etl_watermarks WHERE name = :name"),
+        {'name': name}
+    )
+    row = result.fetchone()
+    return row[0] if row else 0
+
+
+def get_watermark_timestamp(connection, name):
+    """
+    Read the load timestamp recorded for an incremental job.
+    
+    Returns:
+        Last processed created_at, or None if the job has never run
+    """
+    result = connection.execute(
+        text("SELECT last_loaded_at FROM staging.etl_watermarks WHERE name = :name"),
+        {'name': name}
+    )
+    row = result.fetchone()
+    return row[0] if row else None
+
+
+def set_watermark(connection, name, last_id=0, last_loaded_at=None):
+    """
+    Record the high-water mark for an incremental job.
+    
+    Call this inside the same transaction as the load it describes so the
+    mark only moves forward when the load commits.
+    """
+    connection.execute(
+        text("""
+        INSERT INTO staging.etl_watermarks (name, last_id, last_loaded_at, updated_at)
+        VALUES (:name, :last_id, :last_loaded_at, CURRENT_TIMESTAMP)
+        ON CONFLICT (name)
+        DO UPDATE SET
+            last_id = EXCLUDED.last_id,
+            last_loaded_at = EXCLUDED.last_loaded_at,
+            updated_at = EXCLUDED.updated_at
+        """),
+        {'name': name, 'last_id': last_id, 'last_loaded_at': last_loaded_at}
+    )
+
+
+DATA_VERSION_PREFIX = 'data_version.'
+
+# References to the callbacks; call one to get its callback, or None once collected
+_data_version_listeners = []
+
+
+def on_data_version_change(callback):
+    """
+    Call ``callback(source)`` whenever this process publishes a new data version.
+    
+    Caches in the same process use this to drop stale results immediately
+    instead of waiting for their next version check. Bound methods are held
+    weakly, so registering one does not keep its object alive; use
+    remove_data_version_listener to stop notifications earlier.
+    """
+    if hasattr(callback, '__self__') and hasattr(callback, '__func__'):
+        ref = weakref.WeakMethod(callback)
+    else:
+        ref = lambda: callback
+    _data_version_listeners[:] = [
+        listener for listener in _data_version_listeners if listener() is not None
+    ] + [ref]
+
+
+def remove_data_version_listener(callback):
+    """Stop calling a callback registered with on_data_version_change."""
+    _data_version_listeners[:] = [
+        listener for listener in _data_version_listeners if listener() not in (None, callback)
+    ]
+
+
+def get_data_versions(connection, sources):
+    """
+    Read the data version of each source (e.g. 'staging', 'analytics').
+    
+    Returns:
+        Tuple of versions in ``sources`` order, 0 for sources never published
+    """
+    rows = connection.execute(
+        text("SELECT name, last_id FROM staging.etl_watermarks WHERE name IN :names").bindparams(
+            bindparam('names', expanding=True)
+        ),
+        {'names': [DATA_VERSION_PREFIX + source for source in sources]}
+    ).fetchall()
+    versions = dict(rows)
+    return tuple(versions.get(DATA_VERSION_PREFIX + source, 0) for source in sources)
+
+
+def publish_data_version(engine, source):
+    """
+    Advance a source's data version once a load into it has committed.
+    
+    The version lives in staging.etl_watermarks, so caches in other
+    processes pick the change up on their next version check.
+    
+    Returns:
+        The new version number
+    """
+    with engine.begin() as conn:
+        version = conn.execute(
+            text("""
+            INSERT INTO staging.etl_watermarks (name, last_id, last_loaded_at, updated_at)
+            VALUES (:name, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            ON CONFLICT (name)
+            DO UPDATE SET
+                last_id = staging.etl_watermarks.last_id + 1,
+                last_loaded_at = EXCLUDED.last_loaded_at,
+                updated_at = EXCLUDED.updated_at
+            RETURNING last_id
+            """),
+            {'name': DATA_VERSION_PREFIX + source}
+        ).scalar()
+    
+    for listener in list(_data_version_listeners):
+        callback = listener()
+        if callback is not None:
+            callback(source)
+    
+    return version
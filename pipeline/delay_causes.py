@@ -0,0 +1,132 @@
+"""
+BTS delay cause ingestion module.
+Loads the monthly carrier x airport Airline_Delay_Cause extract into raw schema.
+"""
+import os
+import time
+import pandas as pd
+
+from pipeline.config import config
+from pipeline.db_utils import copy_to_table, get_engine
+from pipeline.monitoring import track_stage
+
+
+DEFAULT_DELAY_CAUSES_PATH = os.path.join(
+    os.path.dirname(__file__), '..', 'data', 'Airline_Delay_Cause.csv'
+)
+
+COUNT_COLUMNS = [
+    'arr_flights', 'arr_del15', 'carrier_ct', 'weather_ct', 'nas_ct',
+    'security_ct', 'late_aircraft_ct', 'arr_cancelled', 'arr_diverted',
+    'arr_delay', 'carrier_delay', 'weather_delay', 'nas_delay',
+    'security_delay', 'late_aircraft_delay'
+]
+
+DELAY_CAUSE_DTYPES = {
+    'year': 'int16',
+    'month': 'int8',
+    'carrier': 'category',
+    'carrier_name': 'category',
+    'airport': 'category',
+    'airport_name': 'category',
+    **{column: 'float32' for column in COUNT_COLUMNS}
+}
+
+
+def get_db_connection():
+    """Get the shared pooled database engine."""
+    return get_engine()
+
+
+def get_delay_causes_path():
+    """Get the BTS delay cause file path from environment."""
+    return os.getenv('DELAY_CAUSES_PATH', DEFAULT_DELAY_CAUSES_PATH)
+
+
+def read_delay_causes(path=None, chunksize=None):
+    """
+    Parse the BTS delay cause CSV in typed chunks.
+    
+    Carrier and airport columns are read as categoricals and the count
+    columns as float32, which keeps a chunk at roughly a third of the
+    memory pandas' inferred object/float64 types would use.
+    
+    Args:
+        path: CSV path (defaults to DELAY_CAUSES_PATH or the bundled file)
+        chunksize: Rows per chunk (defaults to PipelineConfig.chunk_size)
+    
+    Yields:
+        DataFrames with DELAY_CAUSE_DTYPES columns
+    """
+    return pd.read_csv(
+        path or get_delay_causes_path(),
+        usecols=list(DELAY_CAUSE_DTYPES),
+        dtype=DELAY_CAUSE_DTYPES,
+        chunksize=chunksize or config.pipeline.chunk_size
+    )
+
+
+@track_stage('ingest_delay_causes')
+def ingest_delay_causes(path=None, chunksize=None):
+    """
+    Load the BTS delay cause file into raw.delay_causes.
+    
+    Every (year, month) present in the file replaces whatever was loaded for
+    that month before, inside one transaction, so rerunning the task on each
+    monthly BTS drop is idempotent.
+    
+    Returns:
+        Number of rows loaded
+    """
+    print("Starting delay cause ingestion...")
+    
+    engine = get_db_connection()
+    
+    rows_loaded = 0
+    parse_seconds = 0.0
+    frame_bytes = 0
+    periods_seen = set()
+    
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        chunks = iter(read_delay_causes(path, chunksize))
+        while True:
+            parse_start = time.time()
+            chunk = next(chunks, None)
+            parse_seconds += time.time() - parse_start
+            if chunk is None:
+                break
+            
+            frame_bytes += chunk.memory_usage(deep=True).sum()
+            
+            periods = set(zip(chunk['year'].tolist(), chunk['month'].tolist()))
+            for year, month in sorted(periods - periods_seen):
+                cursor.execute(
+                    "DELETE FROM raw.delay_causes WHERE year = %s AND month = %s",
+                    (year, month)
+                )
+            periods_seen |= periods
+            
+            rows_loaded += copy_to_table(cursor, chunk, 'raw.delay_causes')
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    
+    if rows_loaded:
+        parse_rate = rows_loaded / parse_seconds if parse_seconds > 0 else float(rows_loaded)
+        mb_per_million = frame_bytes / rows_loaded * 1_000_000 / 1024 / 1024
+        print(f"Parsed {rows_loaded} rows in {parse_seconds:.2f}s ({parse_rate:,.0f} rows/sec)")
+        print(f"  Memory: {mb_per_million:.1f}MB per million rows")
+    
+    print(f"Successfully loaded {rows_loaded} records for {len(periods_seen)} months to raw.delay_causes")
+    
+    return rows_loaded
+
+
+if __name__ == '__main__':
+    records_loaded = ingest_delay_causes()
+    print(f"Delay cause ingestion complete: {records_loaded} records")
@@ -0,0 +1,287 @@
+"""
+KPI query module.
+Runs the dashboard KPIs from sql/kpi_queries.sql on Postgres or an embedded DuckDB engine.
+"""
+import os
+import re
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+from sqlalchemy import text
+
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - DuckDB engine is optional
+    duckdb = None
+
+from pipeline import landing
+from pipeline.config import config
+from pipeline.db_utils import get_engine
+from pipeline.exceptions import ConfigurationError
+from pipeline.transform import FLIGHT_COLUMNS, NATURAL_KEY, _reject_reason_sql
+
+
+DEFAULT_KPI_QUERIES_PATH = os.path.join(
+    os.path.dirname(__file__), '..', 'sql', 'kpi_queries.sql'
+)
+
+# "-- 1. Overall delay statistics by airline" opens each KPI query
+KPI_HEADER = re.compile(r'^--\s*\d+\.\s*(.+)$', re.MULTILINE)
+
+KPI_ENGINES = ('postgres', 'duckdb')
+
+
+@dataclass
+class KpiResult:
+    """Rows and wall-clock time of one KPI query on one engine."""
+    name: str
+    engine: str
+    seconds: float
+    rows: pd.DataFrame
+
+
+def get_db_connection():
+    """Get the shared pooled database engine."""
+    return get_engine()
+
+
+def get_kpi_queries_path():
+    """Get the KPI query file path from environment."""
+    return os.getenv('KPI_QUERIES_PATH', DEFAULT_KPI_QUERIES_PATH)
+
+
+def load_kpi_queries(path=None):
+    """
+    Parse the KPI query file.
+    
+    Statements are split on ``;`` and named after their numbered header
+    comment, so the file stays the single definition both engines run.
+    
+    Returns:
+        Dict mapping KPI name (e.g. 'overall_delay_statistics_by_airline')
+        to its SQL, in file order
+    """
+    with open(path or get_kpi_queries_path()) as f:
+        statements = f.read().split(';')
+    
+    queries = {}
+    for statement in statements:
+        header = KPI_HEADER.search(statement)
+        if header is None:
+            continue
+        name = re.sub(r'[^a-z0-9]+', '_', header.group(1).lower()).strip('_')
+        queries[name] = statement[header.end():].strip()
+    
+    return queries
+
+
+def _timed(name, engine, run):
+    start = time.time()
+    rows = run()
+    result = KpiResult(name, engine, time.time() - start, rows)
+    print(f"  {name}: {len(rows)} rows in {result.seconds:.3f}s ({engine})")
+    return result
+
+
+def run_kpis_postgres(queries=None):
+    """
+    Run KPI queries against staging.flights_clean in Postgres.
+    
+    Returns:
+        List of KpiResult in query order
+    """
+    queries = queries or load_kpi_queries()
+    engine = get_db_connection()
+    
+    with engine.connect() as conn:
+        return [
+            _timed(name, 'postgres', lambda sql=sql: pd.read_sql(text(sql), conn))
+            for name, sql in queries.items()
+        ]
+
+
+def _string_literal(value):
+    """Quote a path as a SQL string literal."""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _flights_source_sql(source):
+    """
+    DuckDB relation standing in for staging.flights_clean.
+    
+    'landing' applies the transform stage to the landed Parquet files on
+    the fly: the latest version of each flight wins and rows with a reject
+    reason are dropped. Ties on ingested_at go to the last row in file and
+    row order, as in transform.dedupe_latest. Any other source is a path to
+    a staging snapshot (.csv, or Parquet file/glob).
+    """
+    if source == 'landing':
+        columns = ', '.join(FLIGHT_COLUMNS)
+        return f"""
+        SELECT {columns}
+        FROM (
+            SELECT *
+            FROM read_parquet({_string_literal(landing.flights_glob())}, hive_partitioning = true,
+                              hive_types = {{'flight_date': DATE}},
+                              filename = true, file_row_number = true)
+            QUALIFY ROW_NUMBER() OVER (
+                PARTITION BY {', '.join(NATURAL_KEY)}
+                ORDER BY ingested_at DESC, filename DESC, file_row_number DESC
+            ) = 1
+        ) latest
+        WHERE ({_reject_reason_sql()}) IS NULL
+        """
+    if source.endswith('.csv'):
+        return f"SELECT * FROM read_csv_auto({_string_literal(source)}, header = true)"
+    return f"SELECT * FROM read_parquet({_string_literal(source)})"
+
+
+def run_kpis_duckdb(source='landing', queries=None, materialize=True):
+    """
+    Run KPI queries in an embedded DuckDB engine, without touching Postgres.
+    
+    The queries are executed unchanged against a ``staging.flights_clean``
+    defined over ``source``.
+    
+    Args:
+        source: 'landing' for the Parquet landing zone, or a path to a
+            staging snapshot (see export_staging_snapshot)
+        queries: Dict of KPI name to SQL (defaults to kpi_queries.sql)
+        materialize: Load the source into DuckDB once instead of rescanning
+            the files for every query
+    
+    Returns:
+        List of KpiResult in query order
+    """
+    if duckdb is None:
+        raise ConfigurationError("The DuckDB KPI engine requires duckdb")
+    queries = queries or load_kpi_queries()
+    
+    conn = duckdb.connect()
+    try:
+        conn.execute("CREATE SCHEMA staging")
+        relation = 'TABLE' if materialize else 'VIEW'
+        load_start = time.time()
+        conn.execute(f"CREATE {relation} staging.flights_clean AS {_flights_source_sql(source)}")
+        if materialize:
+            print(f"Loaded {source} into DuckDB in {time.time() - load_start:.3f}s")
+        
+        return [
+            _timed(name, 'duckdb', lambda sql=sql: conn.execute(sql).df())
+            for name, sql in queries.items()
+        ]
+    finally:
+        conn.close()
+
+
+def export_staging_snapshot(path, chunksize=None):
+    """
+    Write staging.flights_clean to a Parquet snapshot for run_kpis_duckdb.
+    
+    Returns:
+        Number of rows written
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    engine = get_db_connection()
+    
+    rows = 0
+    writer = None
+    with engine.connect() as conn:
+        chunks = pd.read_sql(
+            text(f"SELECT {', '.join(FLIGHT_COLUMNS)} FROM staging.flights_clean"),
+            conn,
+            chunksize=chunksize or config.pipeline.chunk_size
+        )
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+    
+    print(f"Exported {rows} staging rows to {path}")
+    
+    return rows
+
+
+def run_kpis(engine='postgres', source='landing', queries=None):
+    """
+    Run the KPI queries on the chosen engine.
+    
+    Args:
+        engine: 'postgres' or 'duckdb'
+        source: DuckDB source, see run_kpis_duckdb
+    
+    Returns:
+        List of KpiResult in query order
+    """
+    print(f"Running KPI queries on {engine}...")
+    
+    if engine == 'postgres':
+        results = run_kpis_postgres(queries)
+    elif engine == 'duckdb':
+        results = run_kpis_duckdb(source, queries)
+    else:
+        raise ConfigurationError(f"Unknown KPI engine: {engine}")
+    
+    print(f"KPI queries complete in {sum(result.seconds for result in results):.3f}s")
+    
+    return results
+
+
+def _normalized(rows):
+    """KPI rows with Decimal and date values coerced so both engines' frames compare equal."""
+    rows = rows.reset_index(drop=True).copy()
+    for column in rows.columns:
+        if rows[column].dtype == object:
+            converted = pd.to_numeric(rows[column], errors='coerce')
+            if converted.notna().sum() == rows[column].notna().sum():
+                rows[column] = converted.astype(float)
+        if column == 'flight_date':
+            rows[column] = pd.to_datetime(rows[column])
+    return rows
+
+
+def compare_kpis(expected, actual, rtol=1e-6):
+    """
+    Check that two engines returned the same KPI rows.
+    
+    Args:
+        expected: KpiResult list from one engine (usually Postgres)
+        actual: KpiResult list from the other engine
+        rtol: Relative tolerance for numeric columns
+    
+    Returns:
+        Dict mapping KPI name to True when the rows match
+    """
+    actual_by_name = {result.name: result for result in actual}
+    
+    matches = {}
+    for result in expected:
+        other = actual_by_name.get(result.name)
+        if other is None:
+            matches[result.name] = False
+            continue
+        try:
+            pd.testing.assert_frame_equal(
+                _normalized(result.rows), _normalized(other.rows),
+                check_dtype=False, check_exact=False, rtol=rtol
+            )
+            matches[result.name] = True
+        except AssertionError:
+            matches[result.name] = False
+    
+    return matches
+
+
+if __name__ == '__main__':
+    engine = 'duckdb' if landing.get_landing_dir() else 'postgres'
+    for kpi in run_kpis(engine):
+        print(f"\n{kpi.name}\n{kpi.rows.to_string(index=False)}")
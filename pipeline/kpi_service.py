@@ -0,0 +1,212 @@
+"""
+KPI query service module.
+Serves kpi_queries.sql results from a cache keyed on the staging data version.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import text
+
+from pipeline.config import config
+from pipeline.db_utils import (
+    get_data_versions, get_engine, on_data_version_change, remove_data_version_listener
+)
+from pipeline.exceptions import ConfigurationError
+from pipeline.kpi import load_kpi_queries
+
+
+# Every KPI query reads staging.flights_clean
+KPI_SOURCES = ('staging',)
+
+# How long a read trusts the last data version it saw before asking Postgres
+# again; loads in this process invalidate immediately (on_data_version_change)
+VERSION_CHECK_SECONDS = 5.0
+
+
+def get_db_connection():
+    """Get the shared pooled database engine."""
+    return get_engine()
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of DataFrames capped by their in-memory size.
+    
+    Results bigger than the whole cap are not cached.
+    """
+    
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key, frame):
+        size = int(frame.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (frame, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+class KpiService:
+    """
+    Run KPI queries through a result cache.
+    
+    A result is cached under the query, its parameters, the data version of
+    KPI_SOURCES and today's date (custom queries may bound windows with
+    CURRENT_DATE). clean_data and run_aggregations publish a new data
+    version when they commit, so the next read after a load misses and
+    re-runs the query; every other read is a dictionary lookup.
+    
+    Returned DataFrames are shared with the cache and must not be modified.
+    Call close() when done with a service to stop its load notifications.
+    """
+    
+    def __init__(self, queries=None, max_mb=None, cache_dir=None, version_check_seconds=VERSION_CHECK_SECONDS):
+        """
+        Args:
+            queries: Dict of KPI name to SQL (defaults to kpi_queries.sql)
+            max_mb: Memory cap in MB (defaults to PipelineConfig.kpi_cache_mb)
+            cache_dir: Directory to persist results as Parquet across
+                restarts (defaults to PipelineConfig.kpi_cache_dir; None
+                keeps results in memory only)
+            version_check_seconds: How long a seen data version is trusted
+        """
+        self.queries = queries or load_kpi_queries()
+        self.cache = ResultCache((max_mb or config.pipeline.kpi_cache_mb) * 1024 * 1024)
+        self.cache_dir = cache_dir or config.pipeline.kpi_cache_dir
+        self.version_check_seconds = version_check_seconds
+        self._version = None
+        self._version_checked_at = 0.0
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        on_data_version_change(self._on_data_version_change)
+    
+    def _on_data_version_change(self, source):
+        if source in KPI_SOURCES:
+            self._version_checked_at = 0.0
+    
+    def data_version(self):
+        """Current data version of KPI_SOURCES, re-read at most every version_check_seconds."""
+        now = time.monotonic()
+        if self._version is None or now - self._version_checked_at >= self.version_check_seconds:
+            engine = get_db_connection()
+            with engine.connect() as conn:
+                version = get_data_versions(conn, KPI_SOURCES)
+            if version != self._version:
+                # Results of older versions can never be hit again
+                self.cache.clear()
+                self._prune_disk(self._version_tag(version))
+            self._version = version
+            self._version_checked_at = now
+        return self._version
+    
+    def _version_tag(self, version):
+        return '-'.join(str(part) for part in version) + f"-{date.today():%Y%m%d}"
+    
+    def _key(self, name, params, version):
+        digest = hashlib.sha256(
+            json.dumps([name, self.queries[name], params or {}], sort_keys=True, default=str).encode()
+        ).hexdigest()[:16]
+        return f"{self._version_tag(version)}-{digest}"
+    
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+    
+    def _prune_disk(self, current_tag):
+        """Delete persisted results of older data versions."""
+        if not self.cache_dir:
+            return
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.parquet') and not filename.startswith(current_tag + '-'):
+                os.remove(os.path.join(self.cache_dir, filename))
+    
+    def query(self, name, params=None):
+        """
+        Get a KPI's rows, running the query only on a cache miss.
+        
+        Args:
+            name: KPI name (see load_kpi_queries)
+            params: Optional bind parameters for the query
+        
+        Returns:
+            DataFrame of KPI rows (read-only)
+        """
+        if name not in self.queries:
+            raise ConfigurationError(f"Unknown KPI: {name}")
+        
+        key = self._key(name, params, self.data_version())
+        
+        rows = self.cache.get(key)
+        if rows is not None:
+            return rows
+        
+        if self.cache_dir and os.path.exists(self._disk_path(key)):
+            rows = pd.read_parquet(self._disk_path(key))
+        else:
+            engine = get_db_connection()
+            with engine.connect() as conn:
+                rows = pd.read_sql(text(self.queries[name]), conn, params=params)
+            if self.cache_dir:
+                rows.to_parquet(self._disk_path(key), index=False)
+        
+        self.cache.put(key, rows)
+        return rows
+    
+    def query_all(self, params=None):
+        """Rows of every KPI, keyed by name."""
+        return {name: self.query(name, params) for name in self.queries}
+    
+    def invalidate(self):
+        """Drop every cached result and re-read the data version on the next query."""
+        self.cache.clear()
+        self._version_checked_at = 0.0
+        if self.cache_dir:
+            self._prune_disk(current_tag='')
+    
+    def close(self):
+        """Stop listening for data versions published in this process and drop the cached results."""
+        remove_data_version_listener(self._on_data_version_change)
+        self.cache.clear()
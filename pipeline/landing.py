@@ -0,0 +1,135 @@
+"""
+Parquet landing zone module.
+Keeps a columnar, flight_date-partitioned copy of every ingested batch on disk.
+"""
+import os
+import uuid
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # pragma: no cover - landing zone is optional
+    pa = None
+    ds = None
+
+from pipeline.config import config
+from pipeline.exceptions import ConfigurationError
+
+
+FLIGHTS_DATASET = 'flights'
+
+
+def get_landing_dir():
+    """Landing directory from config, or None when the landing zone is disabled."""
+    return config.pipeline.landing_dir
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ConfigurationError("The Parquet landing zone requires pyarrow")
+
+
+def _flights_path(landing_dir=None):
+    landing_dir = landing_dir or get_landing_dir()
+    if not landing_dir:
+        raise ConfigurationError("LANDING_DIR is not configured")
+    return os.path.join(landing_dir, FLIGHTS_DATASET)
+
+
+def flights_glob(landing_dir=None):
+    """Glob matching every landed flights Parquet file, for engines that scan files directly."""
+    return os.path.join(_flights_path(landing_dir), '*', '*.parquet')
+
+
+def _partitioning():
+    return ds.partitioning(pa.schema([('flight_date', pa.date32())]), flavor='hive')
+
+
+def new_batch_id():
+    """Unique name prefix for the files of one ingest batch."""
+    return uuid.uuid4().hex
+
+
+def write_flights(df, batch_id=None, landing_dir=None):
+    """
+    Append a batch of flights to the landing zone.
+    
+    Rows are written as Parquet under ``flights/flight_date=YYYY-MM-DD/``
+    with an ``ingested_at`` column, so later reads can prune by date and
+    pick the latest version of a flight the way raw.flights' created_at does.
+    
+    Args:
+        df: Flights DataFrame as produced by ingest
+        batch_id: File name prefix (defaults to a new batch id); pass the
+            same id for every chunk of one streaming load. Each call adds
+            its own part id, so chunks of a batch never overwrite each other
+        landing_dir: Landing directory (defaults to LANDING_DIR)
+    
+    Returns:
+        Number of rows written
+    """
+    _require_pyarrow()
+    if df.empty:
+        return 0
+    
+    table = pa.Table.from_pandas(
+        df.assign(ingested_at=pd.Timestamp.now()),
+        preserve_index=False
+    )
+    flight_date = table.schema.get_field_index('flight_date')
+    table = table.set_column(
+        flight_date, 'flight_date', table.column('flight_date').cast(pa.timestamp('ns')).cast(pa.date32())
+    )
+    
+    ds.write_dataset(
+        table,
+        _flights_path(landing_dir),
+        format='parquet',
+        partitioning=_partitioning(),
+        # {i} restarts at 0 on every call, hence the per-call part id
+        basename_template=f"{batch_id or new_batch_id()}-{uuid.uuid4().hex[:12]}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore'
+    )
+    return table.num_rows
+
+
+def read_flights(columns=None, start_date=None, end_date=None, landing_dir=None):
+    """
+    Read flights from the landing zone with column and partition pruning.
+    
+    Only the ``flight_date`` directories inside the window are opened and
+    only the requested columns are decoded.
+    
+    Args:
+        columns: Columns to read (defaults to all); flight_date and
+            ingested_at are always included
+        start_date: Optional first flight_date to read
+        end_date: Optional last flight_date to read
+        landing_dir: Landing directory (defaults to LANDING_DIR)
+    
+    Returns:
+        DataFrame with flight_date as datetime64
+    """
+    _require_pyarrow()
+    path = _flights_path(landing_dir)
+    if not os.path.isdir(path):
+        return pd.DataFrame(columns=list(columns or []) + ['flight_date', 'ingested_at'])
+    
+    dataset = ds.dataset(path, format='parquet', partitioning=_partitioning())
+    
+    row_filter = None
+    if start_date is not None:
+        row_filter = ds.field('flight_date') >= pd.Timestamp(start_date).date()
+    if end_date is not None:
+        upper = ds.field('flight_date') <= pd.Timestamp(end_date).date()
+        row_filter = upper if row_filter is None else row_filter & upper
+    
+    if columns is not None:
+        columns = list(dict.fromkeys(list(columns) + ['flight_date', 'ingested_at']))
+    
+    table = dataset.to_table(columns=columns, filter=row_filter)
+    df = table.to_pandas(date_as_object=False)
+    df['flight_date'] = df['flight_date'].astype('datetime64[ns]')
+    return df
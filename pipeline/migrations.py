@@ -0,0 +1,187 @@
+"""
+Schema migrations for existing deployments.
+
+sql/init.sql only runs on a fresh database. Changes to tables that already
+hold data are made by the migrations here, run by hand:
+
+    python -m pipeline.migrations partition_flights
+    python -m pipeline.migrations raw_natural_key
+"""
+import argparse
+import os
+import re
+
+from sqlalchemy import text
+
+from pipeline.db_utils import get_engine
+from pipeline.partitions import PARTITIONED_TABLES, _insertable_columns, ensure_monthly_partitions, is_partitioned
+from pipeline.transform import NATURAL_KEY, RAW_NATURAL_KEY_INDEX, raw_is_deduplicated
+
+
+INIT_SQL_PATH = os.path.join(os.path.dirname(__file__), '..', 'sql', 'init.sql')
+
+
+# Keep only the newest version (created_at, then id) of every natural key
+COMPACT_RAW_FLIGHTS_SQL = f"""
+DELETE FROM raw.flights f
+USING (
+    SELECT id, ROW_NUMBER() OVER (
+        PARTITION BY key_hash, {', '.join(NATURAL_KEY)}
+        ORDER BY created_at DESC, id DESC
+    ) as version
+    FROM raw.flights
+) versions
+WHERE f.id = versions.id AND versions.version > 1
+"""
+
+
+def get_db_connection():
+    """Get the shared pooled database engine."""
+    return get_engine()
+
+
+def init_statements(table, path=None):
+    """
+    The sql/init.sql statements that create ``table``, its partitions and indexes.
+    
+    Keeps init.sql the single definition of the table for migrations.
+    """
+    with open(path or INIT_SQL_PATH) as f:
+        script = re.sub(r'--[^\n]*', '', f.read())
+    # The table itself, not e.g. raw.flights_default
+    mentions = re.compile(rf'\b{re.escape(table)}\b(?!_)')
+    return [
+        statement.strip() for statement in script.split(';')
+        if mentions.search(statement)
+    ]
+
+
+def _drop_indexes(conn, table):
+    """Drop every index and key of ``table``, freeing their names for the table replacing it."""
+    rows = conn.execute(text("""
+    SELECT i.indexrelid::regclass::text, c.conname
+    FROM pg_index i
+    LEFT JOIN pg_constraint c ON c.conindid = i.indexrelid AND c.contype IN ('p', 'u')
+    WHERE i.indrelid = to_regclass(:table)
+    """), {'table': table}).fetchall()
+    for index, constraint in rows:
+        if constraint:
+            conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT {constraint}"))
+        else:
+            conn.execute(text(f"DROP INDEX {index}"))
+
+
+def _create_raw_natural_key(conn):
+    conn.execute(text(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {RAW_NATURAL_KEY_INDEX} "
+        f"ON raw.flights ({', '.join(NATURAL_KEY)}) NULLS NOT DISTINCT"
+    ))
+
+
+def partition_flight_tables(engine=None):
+    """
+    Convert raw.flights and staging.flights_clean to monthly flight_date partitions.
+    
+    Databases created before partitioning have plain heap tables, which
+    the partition DDL of ingest and transform refuses (see
+    partitions.list_partitions). Each such table is renamed, recreated
+    from its sql/init.sql definition (partitions, key_hash, indexes), given
+    the monthly partitions its rows need and refilled with the same ids,
+    so the transform watermark stays valid. Both tables convert in one
+    transaction that holds their locks until it commits.
+    
+    Returns:
+        List of tables converted
+    """
+    engine = engine or get_db_connection()
+    
+    converted = []
+    with engine.begin() as conn:
+        for table in PARTITIONED_TABLES:
+            if is_partitioned(conn, table):
+                continue
+            
+            keyed = table == 'raw.flights' and raw_is_deduplicated(conn)
+            schema, name = table.split('.')
+            old = f"{table}_unpartitioned"
+            conn.execute(text(f"ALTER TABLE {table} RENAME TO {name}_unpartitioned"))
+            _drop_indexes(conn, old)
+            
+            for statement in init_statements(table):
+                conn.execute(text(statement))
+            
+            min_date, max_date = conn.execute(text(f"SELECT MIN(flight_date), MAX(flight_date) FROM {old}")).fetchone()
+            ensure_monthly_partitions(conn, table, min_date, max_date)
+            
+            old_columns = set(_insertable_columns(conn, old))
+            columns = ', '.join(column for column in _insertable_columns(conn, table) if column in old_columns)
+            rows = conn.execute(text(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {old}")).rowcount
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence(:table, 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) "
+                f"FROM {table}"
+            ), {'table': table})
+            conn.execute(text(f"DROP TABLE {old}"))
+            # The old table's sequence held the name until now
+            sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {'table': table}).scalar()
+            if sequence != f"{table}_id_seq":
+                conn.execute(text(f"ALTER SEQUENCE {sequence} RENAME TO {name}_id_seq"))
+            if keyed:
+                _create_raw_natural_key(conn)
+            
+            print(f"Partitioned {table} ({rows} rows)")
+            converted.append(table)
+    
+    if not converted:
+        print("raw.flights and staging.flights_clean are already partitioned")
+    
+    return converted
+
+
+def add_raw_natural_key(engine=None):
+    """
+    Give raw.flights a unique index on the natural key, compacting it first.
+    
+    Superseded versions of every flight are deleted so the index can be
+    built; from then on every ingest merges on the natural key, keeping raw
+    duplicate-free, and readers skip their DISTINCT ON dedupe (see
+    transform.raw_is_deduplicated). NULLS NOT DISTINCT (Postgres 15+) makes
+    keys with a missing flight_number or scheduled_departure collide the way
+    they group in that dedupe.
+    
+    This deletes raw history and cannot be undone by dropping the index.
+    
+    Returns:
+        Number of superseded rows deleted (0 if the index already existed)
+    """
+    engine = engine or get_db_connection()
+    
+    with engine.begin() as conn:
+        if raw_is_deduplicated(conn):
+            print(f"raw.flights already has {RAW_NATURAL_KEY_INDEX}")
+            return 0
+        
+        # Hold off concurrent loads until the index is in place
+        conn.execute(text("LOCK TABLE raw.flights IN SHARE ROW EXCLUSIVE MODE"))
+        deleted = conn.execute(text(COMPACT_RAW_FLIGHTS_SQL)).rowcount
+        _create_raw_natural_key(conn)
+    
+    print(f"Compacted raw.flights to one row per flight ({deleted} superseded rows removed)")
+    
+    return deleted
+
+
+MIGRATIONS = {
+    'partition_flights': partition_flight_tables,
+    'raw_natural_key': add_raw_natural_key
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a schema migration')
+    parser.add_argument('migration', choices=sorted(MIGRATIONS))
+    args = parser.parse_args(argv)
+    MIGRATIONS[args.migration]()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,93 @@
 """
 Performance monitoring utilities.
+
+Every pipeline stage wrapped in ``track_stage`` (or ``stage_run``) produces a
+StageRun telemetry record with its wall time, CPU time, peak RSS and row
+counts. Records are handed to a background writer thread that appends them
+to a JSON-lines file and to monitoring.stage_runs, so a stage never waits
+on telemetry I/O.
 """
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
 import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from datetime import datetime
 from functools import wraps
-from typing import Callable
+from typing import Callable, Optional
+
 import psutil
-import os
+from sqlalchemy import text
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+from pipeline.config import config
+from pipeline.db_utils import get_engine, track_task
+
+
+DEFAULT_TELEMETRY_PATH = os.path.join(
+    os.path.dirname(__file__), '..', 'logs', 'stage_runs.jsonl'
+)
+
+STAGE_RUN_COLUMNS = [
+    'stage', 'task', 'run_id', 'status', 'started_at', 'wall_seconds', 'cpu_seconds',
+    'peak_rss_mb', 'rows_in', 'rows_out', 'rows_per_sec', 'error'
+]
+
+INSERT_STAGE_RUN_SQL = f"""
+INSERT INTO monitoring.stage_runs ({', '.join(STAGE_RUN_COLUMNS)})
+VALUES ({', '.join(f':{column}' for column in STAGE_RUN_COLUMNS)})
+"""
+
+_current_stage = ContextVar('current_stage', default=None)
+
+_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+@dataclass
+class StageRun:
+    """Telemetry record of one pipeline stage run."""
+    stage: str
+    started_at: datetime
+    task: Optional[str] = None
+    run_id: Optional[str] = None
+    status: str = 'running'
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_rss_mb: Optional[float] = None
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    error: Optional[str] = None
+    
+    @property
+    def rows_per_sec(self) -> Optional[float]:
+        """Throughput over the rows written, else the rows read."""
+        rows = self.rows_out if self.rows_out is not None else self.rows_in
+        if rows is None or self.wall_seconds <= 0:
+            return None
+        return round(rows / self.wall_seconds, 2)
+    
+    def to_record(self) -> dict:
+        """Flat dict with STAGE_RUN_COLUMNS keys."""
+        return {**asdict(self), 'rows_per_sec': self.rows_per_sec}
 
 
 def measure_time(func: Callable) -> Callable:
     """
     Decorator to measure function execution time.
     
+    The call is also recorded as a stage run named after the function.
+    
     Usage:
         @measure_time
         def my_function():
@@ -19,11 +95,9 @@ def measure_time(func: Callable) -> Callable:
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        duration = end_time - start_time
-        print(f"{func.__name__} took {duration:.2f} seconds")
+        with stage_run(func.__name__) as run:
+            result = func(*args, **kwargs)
+        print(f"{func.__name__} took {run.wall_seconds:.2f} seconds")
         return result
     return wrapper
 
@@ -35,30 +109,285 @@ def get_memory_usage():
     return round(memory_mb, 2)
 
 
+def _process_high_water_mb():
+    """ru_maxrss in MB, or None where the resource module is unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def get_peak_memory_usage():
+    """
+    Get the peak memory usage of this process so far in MB.
+    
+    This is the process high-water mark: it never goes down, so it is not
+    the peak of any one stage once an earlier stage used more memory. Use
+    RssSampler to measure a block.
+    """
+    current = get_memory_usage()
+    peak_mb = _process_high_water_mb()
+    if peak_mb is None:
+        return current
+    return round(max(peak_mb, current), 2)
+
+
+class RssSampler:
+    """
+    Peak RSS of this process while a block of code runs.
+    
+    A daemon thread samples RSS every ``interval`` seconds. If the block
+    pushes the process high-water mark (ru_maxrss) up, that new mark is
+    its exact peak and is used; otherwise the peak is the largest sample,
+    which can miss a spike shorter than the interval.
+    
+    Usage:
+        sampler = RssSampler()
+        ...
+        peak_mb = sampler.stop()
+    """
+    
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self._process = psutil.Process(os.getpid())
+        self._high_water_start = _process_high_water_mb()
+        self._peak = self._rss()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name='rss-sampler', daemon=True)
+        self._thread.start()
+    
+    def _rss(self):
+        return self._process.memory_info().rss
+    
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            self._peak = max(self._peak, self._rss())
+    
+    def stop(self) -> float:
+        """Stop sampling and return the block's peak RSS in MB."""
+        self._stopped.set()
+        self._thread.join()
+        peak_mb = max(self._peak, self._rss()) / 1024 / 1024
+        high_water = _process_high_water_mb()
+        if high_water is not None and high_water > self._high_water_start:
+            peak_mb = max(peak_mb, high_water)
+        return round(peak_mb, 2)
+
+
 def get_cpu_usage():
-    """Get current CPU usage percentage."""
-    return psutil.cpu_percent(interval=1)
+    """
+    Get system CPU usage percentage since the previous call.
+    
+    Non-blocking: psutil compares against the last sample instead of
+    sleeping for an interval (the first sample is taken at import).
+    """
+    return psutil.cpu_percent(interval=None)
+
+
+def _emit(run):
+    if not config.pipeline.telemetry_enabled:
+        return
+    _queue.put(run.to_record())
+    _ensure_writer()
+
+
+@contextmanager
+def stage_run(name):
+    """
+    Record one run of a pipeline stage.
+    
+    Wall time, process CPU time and the peak RSS reached inside the block
+    (see RssSampler) are measured; row counts come from ``record_rows``
+    calls made inside it. The record is emitted when the block exits, with
+    status 'failed' and the error message if it raised.
+    
+    Usage:
+        with stage_run('transform') as run:
+            run.rows_out = clean_data()
+    
+    Yields:
+        The StageRun being recorded
+    """
+    run = StageRun(
+        stage=name,
+        started_at=datetime.now(),
+        task=os.getenv('AIRFLOW_CTX_TASK_ID'),
+        run_id=os.getenv('AIRFLOW_CTX_DAG_RUN_ID')
+    )
+    token = _current_stage.set(run)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    sampler = RssSampler()
+    try:
+        yield run
+        run.status = 'success'
+    except BaseException as e:
+        run.status = 'failed'
+        run.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        run.wall_seconds = round(time.perf_counter() - wall_start, 6)
+        run.cpu_seconds = round(time.process_time() - cpu_start, 6)
+        run.peak_rss_mb = sampler.stop()
+        _current_stage.reset(token)
+        _emit(run)
+
+
+def track_stage(name=None):
+    """
+    Decorator recording every call of a function as a stage run.
+    
+    An int return value is taken as rows_out unless the function reported
+    rows itself with ``record_rows``.
+    
+    Usage:
+        @track_stage('ingest')
+        def ingest_data():
+            ...
+    """
+    def decorator(func):
+        stage = name or func.__name__
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_run(stage) as run:
+                result = func(*args, **kwargs)
+                if run.rows_out is None and isinstance(result, int) and not isinstance(result, bool):
+                    run.rows_out = result
+                return result
+        return wrapper
+    return decorator
+
+
+def record_rows(rows_in=None, rows_out=None):
+    """
+    Add row counts to the stage run in progress.
+    
+    Counts accumulate, so chunked loads can report each chunk. Outside a
+    stage run (including on worker threads, which do not inherit it) this
+    does nothing.
+    """
+    run = _current_stage.get()
+    if run is None:
+        return
+    if rows_in is not None:
+        run.rows_in = (run.rows_in or 0) + int(rows_in)
+    if rows_out is not None:
+        run.rows_out = (run.rows_out or 0) + int(rows_out)
+
+
+def get_telemetry_path():
+    """JSON-lines file stage runs are appended to."""
+    return config.pipeline.telemetry_path or DEFAULT_TELEMETRY_PATH
+
+
+def _write_jsonl(records, path=None):
+    path = path or get_telemetry_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record, default=str) + '\n')
+
+
+def _write_db(records):
+    with track_task('telemetry'):
+        with get_engine().begin() as conn:
+            conn.execute(text(INSERT_STAGE_RUN_SQL), records)
+
+
+def _write_batch(records):
+    """Write a batch to every sink; a failing sink only costs its own copy."""
+    for target, sink in (('jsonl', _write_jsonl), ('monitoring.stage_runs', _write_db)):
+        try:
+            sink(records)
+        except Exception as e:
+            print(f"Warning: could not write {len(records)} stage runs to {target}: {e}")
+
+
+def _drain():
+    while True:
+        records = [_queue.get()]
+        while True:
+            try:
+                records.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _write_batch(records)
+        finally:
+            for _ in records:
+                _queue.task_done()
+
+
+def _ensure_writer():
+    global _writer
+    if _writer is not None and _writer.is_alive():
+        return
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_drain, name='telemetry-writer', daemon=True)
+            _writer.start()
+
+
+def flush_telemetry(timeout=5.0):
+    """
+    Wait for queued stage runs to be written.
+    
+    Registered at exit so short-lived task processes do not drop their
+    last records.
+    
+    Returns:
+        True if the queue drained within ``timeout`` seconds
+    """
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _reset_writer_after_fork():
+    # The writer thread does not survive a fork; the child starts its own
+    global _queue, _writer
+    _queue = queue.Queue()
+    _writer = None
+
+
+atexit.register(flush_telemetry)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_writer_after_fork)
+
+# Prime the CPU sample so the first get_cpu_usage() call is meaningful
+psutil.cpu_percent(interval=None)
 
 
 class PerformanceMonitor:
-    """Context manager for monitoring performance."""
+    """Context manager for monitoring performance, recorded as a stage run."""
     
     def __init__(self, operation_name: str):
         self.operation_name = operation_name
         self.start_time = None
         self.start_memory = None
+        self.run = None
+        self._stage = None
     
     def __enter__(self):
         self.start_time = time.time()
         self.start_memory = get_memory_usage()
         print(f"Starting {self.operation_name}...")
+        self._stage = stage_run(self.operation_name)
+        self.run = self._stage.__enter__()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stage.__exit__(exc_type, exc_val, exc_tb)
         duration = time.time() - self.start_time
         memory_used = get_memory_usage() - self.start_memory
         
         print(f"Completed {self.operation_name}")
         print(f"  Duration: {duration:.2f}s")
         print(f"  Memory used: {memory_used:.2f}MB")
+        print(f"  CPU time: {self.run.cpu_seconds:.2f}s")
         print(f"  CPU usage: {get_cpu_usage()}%")
@@ -0,0 +1,272 @@
+"""
+Partition management module.
+Creates monthly flight_date range partitions and enforces data retention.
+"""
+import re
+from datetime import date, timedelta
+
+import pandas as pd
+from sqlalchemy import text
+
+from pipeline.config import config
+from pipeline.db_utils import get_engine, publish_data_version
+from pipeline.exceptions import ConfigurationError
+
+
+PARTITIONED_TABLES = ['raw.flights', 'staging.flights_clean']
+
+# Unpartitioned tables derived from the flights, expired row by row
+RETAINED_TABLES = [
+    'staging.flights_rejected',
+    'analytics.daily_airline_stats',
+    'analytics.route_daily_stats',
+    'analytics.daily_trends',
+    'analytics.daily_cancellations',
+    'analytics.daily_airline_delay_histogram',
+    'analytics.route_daily_delay_histogram'
+]
+
+PARTITION_SUFFIX = re.compile(r'_p(\d{4})_(\d{2})$')
+
+
+def get_db_connection():
+    """Get the shared pooled database engine."""
+    return get_engine()
+
+
+def _month_start(value):
+    """First day of the month containing ``value`` (date, datetime or numpy/pandas timestamp)."""
+    value = pd.Timestamp(value).date()
+    return value.replace(day=1)
+
+
+def _next_month(month):
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def partition_name(table, month):
+    """Name of the monthly partition of ``table`` holding ``month``, e.g. raw.flights_p2024_01."""
+    return f"{table}_p{month:%Y_%m}"
+
+
+def is_partitioned(conn, table):
+    """Whether ``table`` exists as a partitioned table."""
+    return bool(conn.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"), {'table': table}
+    ).scalar())
+
+
+def list_partitions(conn, table):
+    """
+    Get the monthly partitions attached to a table.
+    
+    Raises:
+        ConfigurationError: ``table`` is a plain table, as in databases
+            created before partitioning (see migrations.partition_flight_tables)
+    
+    Returns:
+        Dict mapping partition name to the first day of its month
+    """
+    if not is_partitioned(conn, table):
+        raise ConfigurationError(
+            f"{table} is not partitioned by flight_date; "
+            f"run `python -m pipeline.migrations partition_flights` to convert it"
+        )
+    
+    schema, name = table.split('.')
+    rows = conn.execute(text("""
+    SELECT child.relname
+    FROM pg_inherits i
+    JOIN pg_class parent ON parent.oid = i.inhparent
+    JOIN pg_namespace ns ON ns.oid = parent.relnamespace
+    JOIN pg_class child ON child.oid = i.inhrelid
+    WHERE ns.nspname = :schema AND parent.relname = :name
+    """), {'schema': schema, 'name': name}).fetchall()
+    
+    partitions = {}
+    for (relname,) in rows:
+        match = PARTITION_SUFFIX.search(relname)
+        if match:
+            partitions[f"{schema}.{relname}"] = date(int(match.group(1)), int(match.group(2)), 1)
+    return partitions
+
+
+def _insertable_columns(conn, table):
+    """Columns of ``table`` that take explicit values, i.e. all but generated columns."""
+    schema, name = table.split('.')
+    return conn.execute(text("""
+    SELECT column_name
+    FROM information_schema.columns
+    WHERE table_schema = :schema AND table_name = :name AND is_generated = 'NEVER'
+    ORDER BY ordinal_position
+    """), {'schema': schema, 'name': name}).scalars().all()
+
+
+def _create_partition(conn, table, month):
+    """
+    Create one monthly partition.
+    
+    Rows for the month that already landed in the default partition are
+    moved into the new partition, since Postgres refuses to create a
+    partition whose range the default partition still holds rows for.
+    """
+    bounds = {'start': month, 'end': _next_month(month)}
+    default = f"{table}_default"
+    in_range = "flight_date >= :start AND flight_date < :end"
+    
+    has_default_rows = conn.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})"), bounds
+    ).scalar()
+    if has_default_rows:
+        conn.execute(text(f"CREATE TEMP TABLE partition_rows AS SELECT * FROM {default} WHERE {in_range}"), bounds)
+        conn.execute(text(f"DELETE FROM {default} WHERE {in_range}"), bounds)
+    
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+    ))
+    
+    if has_default_rows:
+        columns = ', '.join(_insertable_columns(conn, table))
+        conn.execute(text(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM partition_rows"))
+        conn.execute(text("DROP TABLE partition_rows"))
+
+
+def ensure_monthly_partitions(conn, table, start_date, end_date):
+    """
+    Create any missing monthly partitions covering a flight_date range.
+    
+    Args:
+        conn: Open SQLAlchemy connection (the caller commits)
+        table: Partitioned table, e.g. 'raw.flights'
+        start_date: First flight_date to cover
+        end_date: Last flight_date to cover
+    
+    Returns:
+        List of partition names created
+    """
+    if pd.isna(start_date) or pd.isna(end_date):
+        return []
+    
+    existing = set(list_partitions(conn, table))
+    created = []
+    
+    month = _month_start(start_date)
+    last_month = _month_start(end_date)
+    while month <= last_month:
+        name = partition_name(table, month)
+        if name not in existing:
+            _create_partition(conn, table, month)
+            created.append(name)
+        month = _next_month(month)
+    
+    if created:
+        print(f"Created partitions: {', '.join(created)}")
+    
+    return created
+
+
+def retention_boundary(retention_days, today=None):
+    """
+    First flight_date retention keeps.
+    
+    Whole months are expired, so this is the first day of the month holding
+    the retention cutoff.
+    """
+    return _month_start((today or date.today()) - timedelta(days=retention_days))
+
+
+def drop_expired_partitions(conn, table, retention_days, today=None):
+    """
+    Detach and drop monthly partitions entirely older than the retention window.
+    
+    A partition is only dropped once its whole month is past the cutoff, so
+    retention never deletes individual rows of a partitioned month.
+    
+    Returns:
+        List of partition names dropped
+    """
+    boundary = retention_boundary(retention_days, today)
+    
+    dropped = []
+    for name, month in sorted(list_partitions(conn, table).items(), key=lambda item: item[1]):
+        if _next_month(month) > boundary:
+            continue
+        conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    
+    return dropped
+
+
+def delete_expired_rows(conn, table, retention_days, today=None):
+    """
+    Delete the rows of an unpartitioned table that retention expires.
+    
+    Uses the same month boundary as drop_expired_partitions, so derived
+    tables and default partitions lose exactly the dates the monthly
+    partitions did. Rows without a flight_date are kept.
+    
+    Returns:
+        Number of rows deleted
+    """
+    result = conn.execute(
+        text(f"DELETE FROM {table} WHERE flight_date < :boundary"),
+        {'boundary': retention_boundary(retention_days, today)}
+    )
+    return result.rowcount
+
+
+def enforce_retention(retention_days=None):
+    """
+    Apply PipelineConfig.data_retention_days to the flights and everything derived from them.
+    
+    Expired months of the partitioned tables are dropped; their default
+    partitions, the rejects and the dated analytics tables are trimmed to
+    the same boundary, and the all-time route and airline rollups are
+    re-merged from what is left. New staging and analytics data versions
+    are published when anything expired, so KPI caches don't serve the
+    dropped dates.
+    
+    Returns:
+        List of partition names dropped
+    """
+    # aggregate imports this module (through transform)
+    from pipeline.aggregate import rebuild_airline_stats, remerge_route_performance
+    
+    retention_days = retention_days or config.pipeline.data_retention_days
+    print(f"Enforcing {retention_days} day retention...")
+    
+    engine = get_db_connection()
+    
+    dropped = []
+    with engine.begin() as conn:
+        for table in PARTITIONED_TABLES:
+            dropped.extend(drop_expired_partitions(conn, table, retention_days))
+        
+        deleted = {}
+        for table in [f"{table}_default" for table in PARTITIONED_TABLES] + RETAINED_TABLES:
+            rows = delete_expired_rows(conn, table, retention_days)
+            if rows:
+                deleted[table] = rows
+        
+        if deleted:
+            remerge_route_performance(conn)
+            rebuild_airline_stats(conn)
+    
+    if dropped or deleted:
+        publish_data_version(engine, 'staging')
+        publish_data_version(engine, 'analytics')
+    
+    if dropped:
+        print(f"Dropped expired partitions: {', '.join(dropped)}")
+    else:
+        print("No partitions past the retention window")
+    for table, rows in deleted.items():
+        print(f"Deleted {rows} expired rows from {table}")
+    
+    return dropped
+
+
+if __name__ == '__main__':
+    enforce_retention()
@@ -1,9 +1,13 @@
 """
 Data validation schemas using Pydantic.
 """
+from dataclasses import dataclass
 from pydantic import BaseModel, Field, validator
 from datetime import datetime, date
-from typing import Optional
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
 
 
 class FlightRecord(BaseModel):
@@ -48,3 +52,127 @@ class FlightRecord(BaseModel):
     class Config:
         """Pydantic config."""
         validate_assignment = True
+
+
+# Columnar mirror of the FlightRecord rules; test_schemas checks both agree.
+REQUIRED_COLUMNS = [
+    'flight_date', 'airline', 'flight_number', 'origin', 'destination',
+    'scheduled_departure', 'scheduled_arrival', 'distance'
+]
+
+STRING_LENGTHS = {
+    'airline': (2, 50),
+    'flight_number': (1, 20),
+    'origin': (3, 10),
+    'destination': (3, 10),
+    'cancellation_reason': (0, 50)
+}
+
+AIRPORT_COLUMNS = ['origin', 'destination']
+
+DELAY_COLUMNS = ['departure_delay', 'arrival_delay']
+DELAY_RANGE = (-60, 1440)
+
+
+@dataclass
+class ValidationReport:
+    """
+    Result of validating a batch of flights.
+    
+    ``valid`` is a boolean mask aligned with the input rows and ``rejects``
+    holds one (row, reason) pair per broken rule, where ``row`` is the
+    input's index label.
+    """
+    valid: np.ndarray
+    rejects: pd.DataFrame
+    
+    @property
+    def total_count(self) -> int:
+        return len(self.valid)
+    
+    @property
+    def valid_count(self) -> int:
+        return int(self.valid.sum())
+    
+    @property
+    def reject_count(self) -> int:
+        return self.total_count - self.valid_count
+    
+    def reason_counts(self) -> Dict[str, int]:
+        """Number of rejected rows per reason."""
+        return self.rejects['reason'].value_counts().to_dict()
+
+
+def _per_value(codes, unique_mask):
+    """Broadcast a mask computed over factorized uniques back to the rows (-1 codes are missing)."""
+    return np.append(np.asarray(unique_mask, dtype=bool), False)[codes]
+
+
+def validate_flights(batch) -> ValidationReport:
+    """
+    Apply the FlightRecord rules to a whole batch with vectorized masks.
+    
+    Checks required fields, string lengths, uppercase airport codes,
+    origin != destination, the delay range and distance > 0 without
+    building a model per row. String columns are factorized once and their
+    rules evaluated per distinct value, so the cost is dominated by hashing
+    rather than per-row Python string calls.
+    
+    Args:
+        batch: pandas DataFrame, or an Arrow Table/RecordBatch (anything
+            with ``to_pandas()``)
+    
+    Returns:
+        ValidationReport for the batch
+    """
+    df = batch.to_pandas() if hasattr(batch, 'to_pandas') else batch
+    rows = len(df)
+    failures = {}
+    
+    factorized = {
+        column: pd.factorize(df[column], use_na_sentinel=True)
+        for column in STRING_LENGTHS if column in df
+    }
+    
+    for column in REQUIRED_COLUMNS:
+        if column in factorized:
+            failures[f'missing_{column}'] = factorized[column][0] < 0
+        elif column in df:
+            failures[f'missing_{column}'] = df[column].isna().to_numpy()
+        else:
+            failures[f'missing_{column}'] = np.ones(rows, dtype=bool)
+    
+    if 'cancelled' in df:
+        failures['missing_cancelled'] = df['cancelled'].isna().to_numpy()
+    
+    for column, (codes, uniques) in factorized.items():
+        min_length, max_length = STRING_LENGTHS[column]
+        lengths = pd.Series(uniques, dtype=object).str.len()
+        failures[f'{column}_length'] = _per_value(codes, ~lengths.between(min_length, max_length))
+        if column in AIRPORT_COLUMNS:
+            uppercase = pd.Series(uniques, dtype=object).str.isupper().fillna(False).astype(bool)
+            failures[f'{column}_not_uppercase'] = _per_value(codes, ~uppercase)
+    
+    if 'origin' in df and 'destination' in df:
+        failures['same_origin_destination'] = (
+            (factorized['origin'][0] >= 0) & (df['origin'] == df['destination']).to_numpy(dtype=bool)
+        )
+    
+    low, high = DELAY_RANGE
+    for column in DELAY_COLUMNS:
+        if column in df:
+            values = df[column]
+            failures[f'{column}_out_of_range'] = (values.notna() & ~values.between(low, high)).to_numpy(dtype=bool)
+    
+    if 'distance' in df:
+        failures['distance_not_positive'] = (df['distance'].notna() & (df['distance'] <= 0)).to_numpy(dtype=bool)
+    
+    reasons = list(failures)
+    failed = np.column_stack([failures[reason] for reason in reasons])
+    positions, reason_idx = np.nonzero(failed)
+    rejects = pd.DataFrame({
+        'row': df.index.to_numpy()[positions],
+        'reason': np.array(reasons, dtype=object)[reason_idx]
+    })
+    
+    return ValidationReport(valid=~failed.any(axis=1), rejects=rejects)
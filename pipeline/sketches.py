@@ -0,0 +1,173 @@
+"""
+Delay sketch module.
+Mergeable arrival delay histograms behind approximate quantile KPIs.
+
+Validated delays are whole minutes inside DELAY_RANGE, so a fixed-width
+histogram is a complete mergeable sketch: merging two groups is a SUM per
+bucket, and its error does not depend on the rank being asked for or the
+number of flights. For any set of flights, a quantile read back from the
+merged buckets is within ERROR_BOUND_MINUTES of the exact
+PERCENTILE_CONT over the same flights. Each sketch row holds at most
+(1440 + 60) / BUCKET_WIDTH + 1 buckets.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from pipeline.db_utils import get_engine
+from pipeline.exceptions import DataTransformationError
+from pipeline.transform import DELAY_RANGE
+
+
+# Minutes per bucket; changing it requires rebuilding the histogram tables
+BUCKET_WIDTH = 5
+
+# A bucket's flights are spread evenly over its BUCKET_WIDTH whole minutes
+ERROR_BOUND_MINUTES = BUCKET_WIDTH - 1
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+# Sketch name -> (histogram table, group columns besides flight_date)
+SKETCH_TABLES = {
+    'airline': ('analytics.daily_airline_delay_histogram', ['airline']),
+    'route': ('analytics.route_daily_delay_histogram', ['origin', 'destination']),
+}
+
+
+def get_db_connection():
+    """Get the shared pooled database engine."""
+    return get_engine()
+
+
+def bucket_sql(column='arrival_delay'):
+    """SQL for the bucket of an integer delay column."""
+    return f"({column} - ({DELAY_RANGE[0]})) / {BUCKET_WIDTH}"
+
+
+def histogram_insert_sql(table, keys, window):
+    """INSERT ... SELECT rebuilding one histogram table from staging.flights_clean inside ``window``."""
+    columns = ', '.join(['flight_date'] + keys)
+    return f"""
+    INSERT INTO {table} ({columns}, delay_bucket, flights)
+    SELECT {columns}, {bucket_sql()} as delay_bucket, COUNT(*) as flights
+    FROM staging.flights_clean
+    WHERE NOT cancelled AND arrival_delay IS NOT NULL AND {window}
+    GROUP BY {columns}, delay_bucket
+    """
+
+
+def build_histograms(df):
+    """
+    Pandas equivalent of histogram_insert_sql for flights read outside Postgres.
+    
+    Returns:
+        Dict mapping sketch name to a DataFrame of histogram table rows
+    """
+    flown = df[~df['cancelled'].astype(bool) & df['arrival_delay'].notna()]
+    flown = flown.assign(
+        delay_bucket=(flown['arrival_delay'].astype('int64') - DELAY_RANGE[0]) // BUCKET_WIDTH
+    )
+    
+    histograms = {}
+    for name, (_, keys) in SKETCH_TABLES.items():
+        columns = ['flight_date'] + keys + ['delay_bucket']
+        histograms[name] = flown.groupby(columns).size().rename('flights').reset_index()
+    return histograms
+
+
+def quantiles_from_histogram(buckets, counts, quantiles=DEFAULT_QUANTILES):
+    """
+    Estimate PERCENTILE_CONT quantiles from delay bucket counts.
+    
+    The k-th flight of a bucket holding c flights is placed at the
+    (k + 0.5) / c point of the bucket's minute range, and quantiles
+    interpolate between neighbouring ranks exactly like PERCENTILE_CONT.
+    Each estimated rank shares a bucket with the true value, so the error
+    is at most ERROR_BOUND_MINUTES.
+    
+    Args:
+        buckets: Delay bucket numbers
+        counts: Flights per bucket
+        quantiles: Fractions in [0, 1]
+    
+    Returns:
+        List of estimated delays in minutes (None when there are no flights)
+    """
+    buckets = np.asarray(buckets, dtype='int64')
+    counts = np.asarray(counts, dtype='int64')
+    order = np.argsort(buckets)
+    buckets, counts = buckets[order], counts[order]
+    
+    total = counts.sum()
+    if total == 0:
+        return [None] * len(quantiles)
+    
+    ends = np.cumsum(counts)
+    low, high = DELAY_RANGE
+    
+    def delay_at(rank):
+        i = np.searchsorted(ends, rank, side='right')
+        position = (rank - (ends[i] - counts[i]) + 0.5) / counts[i]
+        bucket_low = low + buckets[i] * BUCKET_WIDTH
+        bucket_high = min(bucket_low + BUCKET_WIDTH - 1, high)
+        return bucket_low + (bucket_high - bucket_low) * position
+    
+    estimates = []
+    for q in quantiles:
+        rank = (total - 1) * q
+        below = int(np.floor(rank))
+        value = delay_at(below)
+        if rank > below:
+            value += (rank - below) * (delay_at(below + 1) - value)
+        estimates.append(float(value))
+    return estimates
+
+
+def _quantile_column(q):
+    """Result column for a quantile, e.g. 0.5 -> 'p50', 0.999 -> 'p99_9'."""
+    return 'p' + f"{q * 100:g}".replace('.', '_')
+
+
+def delay_quantiles(by='airline', start_date=None, end_date=None, quantiles=DEFAULT_QUANTILES):
+    """
+    Approximate arrival delay quantiles per airline or route for a date range.
+    
+    Reads only the stored histograms: the date range's buckets are merged
+    in SQL and the quantiles estimated per group, so the cost does not grow
+    with the number of flights.
+    
+    Args:
+        by: 'airline' or 'route'
+        start_date: Optional first flight_date
+        end_date: Optional last flight_date
+        quantiles: Fractions in [0, 1]
+    
+    Returns:
+        DataFrame with the group columns, 'flights' and one column per
+        quantile ('p50', 'p90', 'p99', ...), within ERROR_BOUND_MINUTES of
+        the exact values
+    """
+    if by not in SKETCH_TABLES:
+        raise DataTransformationError(f"Unknown delay sketch: {by}")
+    table, keys = SKETCH_TABLES[by]
+    
+    engine = get_db_connection()
+    
+    query = f"""
+    SELECT {', '.join(keys)}, delay_bucket, SUM(flights) as flights
+    FROM {table}
+    WHERE (CAST(:start_date AS DATE) IS NULL OR flight_date >= :start_date)
+        AND (CAST(:end_date AS DATE) IS NULL OR flight_date <= :end_date)
+    GROUP BY {', '.join(keys)}, delay_bucket
+    """
+    
+    with engine.connect() as conn:
+        merged = pd.read_sql(text(query), conn, params={'start_date': start_date, 'end_date': end_date})
+    
+    rows = []
+    for group, histogram in merged.groupby(keys, sort=True):
+        group = group if isinstance(group, tuple) else (group,)
+        estimates = quantiles_from_histogram(histogram['delay_bucket'], histogram['flights'], quantiles)
+        rows.append(list(group) + [int(histogram['flights'].sum())] + estimates)
+    
+    return pd.DataFrame(rows, columns=keys + ['flights'] + [_quantile_column(q) for q in quantiles])
@@ -9,9 +9,18 @@ CREATE SCHEMA IF NOT EXISTS staging;
 -- Create analytics schema
 CREATE SCHEMA IF NOT EXISTS analytics;
 
--- Raw flight data table
+-- Create monitoring schema
+CREATE SCHEMA IF NOT EXISTS monitoring;
+
+-- Raw flight data table, range partitioned by month of flight_date.
+-- Monthly partitions are created on ingest (pipeline/partitions.py); rows
+-- without a usable flight_date land in the default partition. flight_date
+-- may be NULL in raw data, so id is indexed rather than a primary key.
+-- key_hash is a 64-bit hash of the natural key computed by Postgres as rows
+-- are ingested; the transform and stg_flights dedupe in key_hash order, read
+-- off idx_flights_key_hash instead of sorting all of raw on the key columns.
 CREATE TABLE IF NOT EXISTS raw.flights (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     flight_date DATE,
     airline VARCHAR(50),
     flight_number VARCHAR(20),
@@ -26,12 +35,51 @@ CREATE TABLE IF NOT EXISTS raw.flights (
     cancelled BOOLEAN,
     cancellation_reason VARCHAR(50),
     distance INTEGER,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    key_hash BIGINT GENERATED ALWAYS AS (hashtextextended(
+        COALESCE((flight_date - DATE '2000-01-01')::text, '') || '|' ||
+        COALESCE(airline, '') || '|' ||
+        COALESCE(flight_number, '') || '|' ||
+        COALESCE(origin, '') || '|' ||
+        COALESCE(destination, '') || '|' ||
+        COALESCE(EXTRACT(EPOCH FROM scheduled_departure)::text, ''),
+        0
+    )) STORED
+) PARTITION BY RANGE (flight_date);
+
+CREATE TABLE IF NOT EXISTS raw.flights_default PARTITION OF raw.flights DEFAULT;
+
+-- Raw BTS delay cause counts (monthly carrier x airport)
+CREATE TABLE IF NOT EXISTS raw.delay_causes (
+    id SERIAL PRIMARY KEY,
+    year SMALLINT NOT NULL,
+    month SMALLINT NOT NULL,
+    carrier VARCHAR(10) NOT NULL,
+    carrier_name VARCHAR(100),
+    airport VARCHAR(10) NOT NULL,
+    airport_name VARCHAR(200),
+    arr_flights REAL,
+    arr_del15 REAL,
+    carrier_ct REAL,
+    weather_ct REAL,
+    nas_ct REAL,
+    security_ct REAL,
+    late_aircraft_ct REAL,
+    arr_cancelled REAL,
+    arr_diverted REAL,
+    arr_delay REAL,
+    carrier_delay REAL,
+    weather_delay REAL,
+    nas_delay REAL,
+    security_delay REAL,
+    late_aircraft_delay REAL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(year, month, carrier, airport)
 );
 
--- Staging table for cleaned data
+-- Staging table for cleaned data, partitioned like raw.flights
 CREATE TABLE IF NOT EXISTS staging.flights_clean (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     flight_date DATE,
     airline VARCHAR(50),
     flight_number VARCHAR(20),
@@ -46,7 +94,49 @@ CREATE TABLE IF NOT EXISTS staging.flights_clean (
     cancelled BOOLEAN,
     cancellation_reason VARCHAR(50),
     distance INTEGER,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, flight_date)
+) PARTITION BY RANGE (flight_date);
+
+CREATE TABLE IF NOT EXISTS staging.flights_clean_default PARTITION OF staging.flights_clean DEFAULT;
+
+-- Rows the transform refused, with the first rule each one broke
+CREATE TABLE IF NOT EXISTS staging.flights_rejected (
+    id BIGSERIAL PRIMARY KEY,
+    raw_id INTEGER,
+    flight_date DATE,
+    airline VARCHAR(50),
+    flight_number VARCHAR(20),
+    origin VARCHAR(10),
+    destination VARCHAR(10),
+    scheduled_departure TIMESTAMP,
+    actual_departure TIMESTAMP,
+    scheduled_arrival TIMESTAMP,
+    actual_arrival TIMESTAMP,
+    departure_delay INTEGER,
+    arrival_delay INTEGER,
+    cancelled BOOLEAN,
+    cancellation_reason VARCHAR(50),
+    distance INTEGER,
+    reason VARCHAR(50) NOT NULL,
+    rejected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- High-water marks for incremental jobs
+CREATE TABLE IF NOT EXISTS staging.etl_watermarks (
+    name VARCHAR(100) PRIMARY KEY,
+    last_id BIGINT NOT NULL DEFAULT 0,
+    last_loaded_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Flight dates each transform changed in staging, including dates whose
+-- rows it deleted; incremental aggregation recomputes and consumes them.
+-- A NULL flight_date records a rebuild of all of staging.
+CREATE TABLE IF NOT EXISTS staging.changed_dates (
+    id BIGSERIAL PRIMARY KEY,
+    flight_date DATE,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Analytics aggregation tables
@@ -58,10 +148,44 @@ CREATE TABLE IF NOT EXISTS analytics.daily_airline_stats (
     cancelled_flights INTEGER,
     avg_departure_delay NUMERIC(10,2),
     avg_arrival_delay NUMERIC(10,2),
+    dep_delay_sum BIGINT,
+    dep_delay_count INTEGER,
+    arr_delay_sum BIGINT,
+    arr_delay_count INTEGER,
+    on_time_count INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(flight_date, airline)
 );
 
+CREATE TABLE IF NOT EXISTS analytics.airline_stats (
+    id SERIAL PRIMARY KEY,
+    airline VARCHAR(50) UNIQUE,
+    total_flights INTEGER,
+    cancelled_flights INTEGER,
+    avg_departure_delay NUMERIC(10,2),
+    avg_arrival_delay NUMERIC(10,2),
+    cancellation_rate NUMERIC(5,2),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS analytics.daily_trends (
+    id SERIAL PRIMARY KEY,
+    flight_date DATE UNIQUE,
+    total_flights INTEGER,
+    cancelled_flights INTEGER,
+    avg_departure_delay NUMERIC(10,2),
+    avg_arrival_delay NUMERIC(10,2),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS analytics.daily_cancellations (
+    id SERIAL PRIMARY KEY,
+    flight_date DATE,
+    cancellation_reason VARCHAR(50),
+    cancelled_flights INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 CREATE TABLE IF NOT EXISTS analytics.route_performance (
     id SERIAL PRIMARY KEY,
     origin VARCHAR(10),
@@ -69,13 +193,89 @@ CREATE TABLE IF NOT EXISTS analytics.route_performance (
     total_flights INTEGER,
     avg_delay NUMERIC(10,2),
     on_time_percentage NUMERIC(5,2),
+    delay_sum BIGINT,
+    delay_count INTEGER,
+    on_time_count INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(origin, destination)
 );
 
+-- Per-day route partial sums; route_performance is merged from these
+CREATE TABLE IF NOT EXISTS analytics.route_daily_stats (
+    id SERIAL PRIMARY KEY,
+    flight_date DATE,
+    origin VARCHAR(10),
+    destination VARCHAR(10),
+    total_flights INTEGER,
+    delay_sum BIGINT,
+    delay_count INTEGER,
+    on_time_count INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(flight_date, origin, destination)
+);
+
+-- Mergeable arrival delay sketches: one row per fixed-width delay bucket
+-- (see pipeline/sketches.py), so quantiles for any date range come from
+-- summing buckets instead of re-sorting staging rows
+CREATE TABLE IF NOT EXISTS analytics.daily_airline_delay_histogram (
+    flight_date DATE,
+    airline VARCHAR(50),
+    delay_bucket SMALLINT,
+    flights INTEGER,
+    PRIMARY KEY (flight_date, airline, delay_bucket)
+);
+
+CREATE TABLE IF NOT EXISTS analytics.route_daily_delay_histogram (
+    flight_date DATE,
+    origin VARCHAR(10),
+    destination VARCHAR(10),
+    delay_bucket SMALLINT,
+    flights INTEGER,
+    PRIMARY KEY (flight_date, origin, destination, delay_bucket)
+);
+
+-- One row per pipeline stage run (pipeline/monitoring.py track_stage)
+CREATE TABLE IF NOT EXISTS monitoring.stage_runs (
+    id BIGSERIAL PRIMARY KEY,
+    stage VARCHAR(100) NOT NULL,
+    task VARCHAR(250),
+    run_id VARCHAR(250),
+    status VARCHAR(20) NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    wall_seconds DOUBLE PRECISION,
+    cpu_seconds DOUBLE PRECISION,
+    peak_rss_mb DOUBLE PRECISION,
+    rows_in BIGINT,
+    rows_out BIGINT,
+    rows_per_sec DOUBLE PRECISION,
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Create indexes for better query performance
+-- Also serves the raw id watermark scans of the incremental dbt models
+CREATE INDEX IF NOT EXISTS idx_flights_id ON raw.flights(id);
 CREATE INDEX IF NOT EXISTS idx_flights_date ON raw.flights(flight_date);
 CREATE INDEX IF NOT EXISTS idx_flights_airline ON raw.flights(airline);
 CREATE INDEX IF NOT EXISTS idx_flights_route ON raw.flights(origin, destination);
+-- Dedupe order, column for column: key_hash, then the natural key (so
+-- colliding hashes stay apart), then the latest version first
+CREATE INDEX IF NOT EXISTS idx_flights_key_hash ON raw.flights(
+    key_hash, flight_date, airline, flight_number, origin, destination, scheduled_departure,
+    created_at DESC, id DESC
+);
 CREATE INDEX IF NOT EXISTS idx_staging_date ON staging.flights_clean(flight_date);
+CREATE INDEX IF NOT EXISTS idx_staging_created_at ON staging.flights_clean(created_at);
+CREATE INDEX IF NOT EXISTS idx_staging_rejected_reason ON staging.flights_rejected(reason, rejected_at);
+-- Partition reruns clear their earlier rejects by raw id window
+CREATE INDEX IF NOT EXISTS idx_staging_rejected_raw_id ON staging.flights_rejected(raw_id);
+-- NULLS NOT DISTINCT (Postgres 15+): a flight missing flight_number or
+-- scheduled_departure is still one flight, as in the transform's dedupe,
+-- so its reloads upsert instead of piling up
+CREATE UNIQUE INDEX IF NOT EXISTS uq_staging_flights_natural_key ON staging.flights_clean(
+    flight_date, airline, flight_number, origin, destination, scheduled_departure
+) NULLS NOT DISTINCT;
 CREATE INDEX IF NOT EXISTS idx_analytics_daily_date ON analytics.daily_airline_stats(flight_date);
+CREATE INDEX IF NOT EXISTS idx_analytics_route_daily_route ON analytics.route_daily_stats(origin, destination);
+CREATE INDEX IF NOT EXISTS idx_analytics_cancellations_date ON analytics.daily_cancellations(flight_date);
+CREATE INDEX IF NOT EXISTS idx_stage_runs_stage ON monitoring.stage_runs(stage, started_at);
@@ -1,4 +1,11 @@
 -- KPI Queries for Flight Delay Analytics
+-- staging.flights_clean is partitioned by month of flight_date; bound queries
+-- with date arithmetic on flight_date (e.g. <date> - 29, not an INTERVAL,
+-- which would compare as a timestamp) so Postgres can prune partitions. Bounds
+-- are relative to the data, not CURRENT_DATE, so the KPIs don't change meaning
+-- when the latest load is older than today.
+-- The same file is run by the embedded DuckDB engine (pipeline/kpi.py), so keep
+-- to SQL both engines accept and break ORDER BY ties so LIMITs agree.
 
 -- 1. Overall delay statistics by airline
 SELECT 
@@ -11,7 +18,7 @@ SELECT
     ROUND(100.0 * SUM(CASE WHEN cancelled THEN 1 ELSE 0 END) / COUNT(*), 2) as cancellation_rate
 FROM staging.flights_clean
 GROUP BY airline
-ORDER BY avg_arrival_delay DESC;
+ORDER BY avg_arrival_delay DESC, airline;
 
 -- 2. Route performance analysis
 SELECT 
@@ -24,7 +31,7 @@ FROM staging.flights_clean
 WHERE NOT cancelled
 GROUP BY origin, destination
 HAVING COUNT(*) >= 10
-ORDER BY on_time_percentage ASC
+ORDER BY on_time_percentage ASC, origin, destination
 LIMIT 20;
 
 -- 3. Daily trends
@@ -35,6 +42,8 @@ SELECT
     AVG(arrival_delay) as avg_arrival_delay,
     SUM(CASE WHEN cancelled THEN 1 ELSE 0 END) as cancelled_flights
 FROM staging.flights_clean
+-- the 30 days up to the latest flight (pruned at execution time)
+WHERE flight_date >= (SELECT MAX(flight_date) FROM staging.flights_clean) - 29
 GROUP BY flight_date
 ORDER BY flight_date DESC
 LIMIT 30;
@@ -50,7 +59,7 @@ FROM staging.flights_clean
 WHERE NOT cancelled
 GROUP BY origin, destination
 HAVING COUNT(*) >= 5
-ORDER BY avg_delay DESC
+ORDER BY avg_delay DESC, origin, destination
 LIMIT 10;
 
 -- 5. Cancellation reasons breakdown
@@ -61,4 +70,4 @@ SELECT
 FROM staging.flights_clean
 WHERE cancelled = TRUE
 GROUP BY cancellation_reason
-ORDER BY count DESC;
+ORDER BY count DESC, cancellation_reason;
@@ -5,6 +5,14 @@ import pytest
 from unittest.mock import Mock
 from sqlalchemy import create_engine
 
+from pipeline.config import config
+
+
+@pytest.fixture(autouse=True)
+def disable_telemetry(monkeypatch):
+    """Keep stage run telemetry from writing to the database or logs/ during tests."""
+    monkeypatch.setattr(config.pipeline, 'telemetry_enabled', False)
+
 
 @pytest.fixture
 def mock_db_engine():
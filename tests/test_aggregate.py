@@ -2,8 +2,14 @@
 Unit tests for aggregation module.
 """
 import pytest
-from unittest.mock import Mock, patch
-from pipeline.aggregate import aggregate_daily_stats, aggregate_route_performance, run_aggregations
+import pandas as pd
+from unittest.mock import Mock, MagicMock, patch
+from pipeline.aggregate import (
+    ROLLUP_DIMENSIONS, ROLLUPS, _grouping_id, aggregate_daily_stats, aggregate_delay_sketches,
+    aggregate_partition, aggregate_route_performance, build_landing_rollups, finalize_aggregations,
+    partition_refresh_statements, run_aggregations, run_rollups
+)
+from pipeline.exceptions import DataTransformationError
 
 
 class TestAggregateDailyStats:
@@ -12,7 +18,7 @@ class TestAggregateDailyStats:
     @patch('pipeline.aggregate.get_db_connection')
     def test_aggregate_daily_stats_executes_query(self, mock_conn):
         """Test that daily stats query is executed."""
-        mock_engine = Mock()
+        mock_engine = MagicMock()
         mock_conn.return_value = mock_engine
         
         result = aggregate_daily_stats()
@@ -23,14 +29,36 @@ class TestAggregateDailyStats:
     @patch('pipeline.aggregate.get_db_connection')
     def test_aggregate_daily_stats_commits(self, mock_conn):
         """Test that transaction is committed."""
-        mock_engine = Mock()
-        mock_connection = Mock()
+        mock_engine = MagicMock()
+        mock_connection = MagicMock()
         mock_engine.connect().__enter__.return_value = mock_connection
         mock_conn.return_value = mock_engine
         
         aggregate_daily_stats()
         
         mock_connection.commit.assert_called_once()
+    
+    
+    @patch('pipeline.aggregate.get_db_connection')
+    def test_aggregate_daily_stats_date_window(self, mock_conn):
+        """Test that a window deletes and recomputes only its dates."""
+        mock_engine = MagicMock()
+        mock_connection = MagicMock()
+        mock_engine.connect().__enter__.return_value = mock_connection
+        mock_conn.return_value = mock_engine
+        
+        aggregate_daily_stats('2024-01-01', '2024-01-07')
+        
+        delete_call, insert_call, *rollup_calls = mock_connection.execute.call_args_list
+        assert 'DELETE FROM analytics.daily_airline_stats' in str(delete_call[0][0])
+        assert 'flight_date >= :start_date AND flight_date <= :end_date' in str(insert_call[0][0])
+        assert insert_call[0][1] == {'start_date': '2024-01-01', 'end_date': '2024-01-07'}
+        
+        rollups = [str(c[0][0]) for c in rollup_calls]
+        assert rollups[0].startswith('DELETE FROM analytics.daily_trends WHERE flight_date >=')
+        assert 'FROM analytics.daily_airline_stats' in rollups[1]
+        assert rollups[2].startswith('DELETE FROM analytics.daily_cancellations WHERE flight_date >=')
+        assert 'INSERT INTO analytics.daily_cancellations' in rollups[3]
 
 
 class TestAggregateRoutePerformance:
@@ -39,7 +67,7 @@ class TestAggregateRoutePerformance:
     @patch('pipeline.aggregate.get_db_connection')
     def test_aggregate_route_performance_executes_query(self, mock_conn):
         """Test that route performance query is executed."""
-        mock_engine = Mock()
+        mock_engine = MagicMock()
         mock_conn.return_value = mock_engine
         
         result = aggregate_route_performance()
@@ -50,22 +78,223 @@ class TestAggregateRoutePerformance:
     @patch('pipeline.aggregate.get_db_connection')
     def test_aggregate_route_performance_commits(self, mock_conn):
         """Test that transaction is committed."""
-        mock_engine = Mock()
-        mock_connection = Mock()
+        mock_engine = MagicMock()
+        mock_connection = MagicMock()
         mock_engine.connect().__enter__.return_value = mock_connection
         mock_conn.return_value = mock_engine
         
         aggregate_route_performance()
         
         mock_connection.commit.assert_called_once()
+    
+    
+    @patch('pipeline.aggregate.get_db_connection')
+    def test_aggregate_route_performance_merges_partials(self, mock_conn):
+        """Test that routes are re-merged from daily partials, not from staging."""
+        mock_engine = MagicMock()
+        mock_connection = MagicMock()
+        mock_engine.connect().__enter__.return_value = mock_connection
+        mock_conn.return_value = mock_engine
+        
+        aggregate_route_performance('2024-01-01', '2024-01-01')
+        
+        statements = [str(c[0][0]) for c in mock_connection.execute.call_args_list]
+        assert 'affected_routes' in statements[0]
+        assert 'INSERT INTO analytics.route_daily_stats' in statements[2]
+        assert 'flight_date >= :start_date' in statements[2]
+        assert 'FROM analytics.route_daily_stats p' in statements[3]
+        assert 'staging.flights_clean' not in statements[3]
+
+
+class TestAggregateDelaySketches:
+    """Test suite for delay histogram aggregation."""
+    
+    @patch('pipeline.aggregate.get_db_connection')
+    def test_aggregate_delay_sketches_replaces_window(self, mock_conn):
+        """Test that both histogram tables are rebuilt from staging within the window."""
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        conn = mock_engine.connect.return_value.__enter__.return_value
+        
+        aggregate_delay_sketches('2024-01-05', '2024-01-06')
+        
+        statements = [str(call[0][0]) for call in conn.execute.call_args_list]
+        assert statements[0].startswith('DELETE FROM analytics.daily_airline_delay_histogram WHERE flight_date >=')
+        assert 'INSERT INTO analytics.route_daily_delay_histogram' in statements[3]
+        assert 'GROUP BY flight_date, origin, destination, delay_bucket' in statements[3]
+        conn.commit.assert_called_once()
+
+
+class TestRunRollups:
+    """Test suite for the single-pass rollup engine."""
+    
+    @patch('pipeline.aggregate.get_db_connection')
+    def test_run_rollups_scans_staging_once(self, mock_conn):
+        """Test that every rollup is fed from one grouping-sets scan."""
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        conn = mock_engine.connect.return_value.__enter__.return_value
+        
+        stats = run_rollups()
+        
+        statements = [str(call[0][0]) for call in conn.execute.call_args_list]
+        assert sum('FROM staging.flights_clean' in sql for sql in statements) == 1
+        assert 'GROUPING SETS' in statements[0]
+        assert '(flight_date, origin, destination, delay_bucket)' in statements[0]
+        assert any('INSERT INTO analytics.route_daily_delay_histogram' in sql for sql in statements)
+        assert set(stats['write_seconds']) == {rollup.name for rollup in ROLLUPS}
+        conn.commit.assert_called_once()
+    
+    @patch('pipeline.aggregate.get_db_connection')
+    def test_run_rollups_replaces_window(self, mock_conn):
+        """Test that each rollup table is only replaced within the date window."""
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        conn = mock_engine.connect.return_value.__enter__.return_value
+        
+        run_rollups('2024-01-05', '2024-01-06')
+        
+        deletes = [str(call[0][0]) for call in conn.execute.call_args_list
+                   if str(call[0][0]).startswith('DELETE FROM analytics.daily')]
+        assert 'DELETE FROM analytics.daily_airline_stats WHERE flight_date >= :start_date' \
+            ' AND flight_date <= :end_date' in deletes
+        assert conn.execute.call_args_list[0][0][1] == {'start_date': '2024-01-05', 'end_date': '2024-01-06'}
+    
+    def test_grouping_id_matches_postgres_bitmask(self):
+        """Test that rolled-up dimensions set bits in GROUPING() argument order."""
+        assert _grouping_id(ROLLUP_DIMENSIONS) == 0
+        assert _grouping_id(('flight_date', 'airline')) == 0b001111
+        assert _grouping_id(('flight_date',)) == 0b011111
+        assert _grouping_id(('flight_date', 'cancellation_reason')) == 0b011101
+        assert _grouping_id(('flight_date', 'airline', 'delay_bucket')) == 0b001110
+
+
+class TestLandingRollups:
+    """Test suite for rollups computed from the landing zone."""
+    
+    def test_build_landing_rollups_matches_sql_semantics(self):
+        """Test that cancelled flights only count toward totals and NULL delays are skipped."""
+        daily, routes = build_landing_rollups(pd.DataFrame({
+            'flight_date': pd.to_datetime(['2024-01-01'] * 3),
+            'airline': ['AA', 'AA', 'AA'],
+            'origin': ['JFK', 'JFK', 'JFK'],
+            'destination': ['LAX', 'LAX', 'LAX'],
+            'departure_delay': pd.array([10, None, 99], dtype='Int64'),
+            'arrival_delay': pd.array([20, 5, 99], dtype='Int64'),
+            'cancelled': [False, False, True]
+        }))
+        
+        row = daily.iloc[0]
+        assert (row['total_flights'], row['cancelled_flights']) == (3, 1)
+        assert (row['dep_delay_sum'], row['dep_delay_count']) == (10, 1)
+        assert (row['arr_delay_sum'], row['arr_delay_count']) == (25, 2)
+        assert row['avg_arrival_delay'] == 12.5
+        assert row['on_time_count'] == 1
+        
+        route = routes.iloc[0]
+        assert (route['total_flights'], route['delay_sum'], route['delay_count'], route['on_time_count']) == (2, 25, 2, 1)
+    
+    @patch('pipeline.aggregate.copy_to_table')
+    @patch('pipeline.aggregate.get_db_connection')
+    @patch('pipeline.aggregate.build_histograms')
+    @patch('pipeline.aggregate.build_landing_rollups')
+    @patch('pipeline.aggregate.read_landing_flights')
+    def test_run_aggregations_landing_mode(self, mock_read, mock_build, mock_histograms, mock_conn, mock_copy):
+        """Test that landing mode swaps the window and re-merges route performance."""
+        mock_read.return_value = (
+            pd.DataFrame(columns=['flight_date', 'cancelled', 'cancellation_reason']), pd.DataFrame()
+        )
+        mock_build.return_value = (pd.DataFrame(), pd.DataFrame())
+        mock_histograms.return_value = {'airline': pd.DataFrame(), 'route': pd.DataFrame()}
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        conn = mock_engine.connect.return_value.__enter__.return_value
+        
+        assert run_aggregations('landing', '2024-01-05', '2024-01-06') is True
+        
+        assert mock_read.call_args[0] == ('2024-01-05', '2024-01-06')
+        statements = [str(call[0][0]) for call in conn.execute.call_args_list]
+        assert any('INSERT INTO analytics.route_performance' in sql for sql in statements)
+        assert any('INSERT INTO analytics.daily_trends' in sql for sql in statements)
+        assert any('INSERT INTO analytics.airline_stats' in sql for sql in statements)
+        assert [call[0][2] for call in mock_copy.call_args_list] == [
+            'analytics.daily_airline_stats', 'analytics.route_daily_stats', 'analytics.daily_cancellations',
+            'analytics.daily_airline_delay_histogram', 'analytics.route_daily_delay_histogram'
+        ]
+        conn.commit.assert_called_once()
+
+
+class TestPartitionedAggregations:
+    """Test suite for the per-partition aggregations used by the mapped DAG tasks."""
+    
+    @patch('pipeline.aggregate.aggregate_delay_sketches')
+    @patch('pipeline.aggregate.aggregate_route_performance')
+    @patch('pipeline.aggregate.aggregate_daily_stats')
+    def test_partition_defers_route_merge(self, mock_daily, mock_route, mock_sketches):
+        """Test that a partition refreshes its window without merging route_performance."""
+        result = aggregate_partition('2024-01-01', '2024-01-31')
+        
+        assert result == {'start_date': '2024-01-01', 'end_date': '2024-01-31'}
+        mock_daily.assert_called_once_with('2024-01-01', '2024-01-31')
+        mock_route.assert_called_once_with('2024-01-01', '2024-01-31', merge=False)
+        mock_sketches.assert_called_once_with('2024-01-01', '2024-01-31')
+    
+    def test_partition_refresh_statements(self):
+        """Test that the refresh replaces every per-day table inside the window only."""
+        statements = partition_refresh_statements('2024-01-01', '2024-01-31')
+        
+        tables = [sql.split('INTO ')[1].split()[0] for sql, _ in statements if 'INSERT' in sql]
+        assert tables == [
+            'analytics.daily_airline_stats', 'analytics.daily_trends', 'analytics.daily_cancellations',
+            'analytics.route_daily_stats',
+            'analytics.daily_airline_delay_histogram', 'analytics.route_daily_delay_histogram'
+        ]
+        assert not any('route_performance' in sql for sql, _ in statements)
+        assert all(params == {'start_date': '2024-01-01', 'end_date': '2024-01-31'} for _, params in statements)
+    
+    @patch('pipeline.aggregate.get_db_connection')
+    def test_route_partials_without_merge(self, mock_conn):
+        """Test that merge=False only replaces route_daily_stats."""
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        conn = mock_engine.connect.return_value.__enter__.return_value
+        
+        aggregate_route_performance('2024-01-01', '2024-01-31', merge=False)
+        
+        statements = [str(call[0][0]) for call in conn.execute.call_args_list]
+        assert not any('route_performance' in sql for sql in statements)
+        assert any('INSERT INTO analytics.route_daily_stats' in sql for sql in statements)
+    
+    @patch('pipeline.aggregate.publish_data_version')
+    @patch('pipeline.aggregate.get_db_connection')
+    def test_finalize_merges_routes_once(self, mock_conn, mock_publish):
+        """Test that the fan-in merges route performance, rebuilds airline stats and clears changed dates."""
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        conn = mock_engine.connect.return_value.__enter__.return_value
+        
+        assert finalize_aggregations([{'start_date': '2024-01-01', 'end_date': '2024-01-31'}]) == 1
+        
+        statements = [str(call[0][0]) for call in conn.execute.call_args_list]
+        assert sum('INSERT INTO analytics.route_performance' in sql for sql in statements) == 1
+        assert any('INSERT INTO analytics.airline_stats' in sql for sql in statements)
+        assert any('DELETE FROM staging.changed_dates' in sql for sql in statements)
+        mock_publish.assert_called_once_with(mock_engine, 'analytics')
+    
+    @patch('pipeline.aggregate.get_db_connection')
+    def test_finalize_without_partitions(self, mock_conn):
+        """Test that an empty fan-in does nothing."""
+        assert finalize_aggregations([]) == 0
+        mock_conn.assert_not_called()
 
 
 class TestRunAggregations:
     """Test suite for running all aggregations."""
     
+    @patch('pipeline.aggregate.get_db_connection')
     @patch('pipeline.aggregate.aggregate_route_performance')
     @patch('pipeline.aggregate.aggregate_daily_stats')
-    def test_run_aggregations_calls_all(self, mock_daily, mock_route):
+    def test_run_aggregations_calls_all(self, mock_daily, mock_route, mock_conn):
         """Test that all aggregation functions are called."""
         mock_daily.return_value = True
         mock_route.return_value = True
@@ -76,17 +305,18 @@ class TestRunAggregations:
         mock_daily.assert_called_once()
         mock_route.assert_called_once()
     
+    @patch('pipeline.aggregate.get_db_connection')
     @patch('pipeline.aggregate.aggregate_route_performance')
     @patch('pipeline.aggregate.aggregate_daily_stats')
-    def test_run_aggregations_order(self, mock_daily, mock_route):
+    def test_run_aggregations_order(self, mock_daily, mock_route, mock_conn):
         """Test that aggregations are called in correct order."""
         call_order = []
         
-        def daily_side_effect():
+        def daily_side_effect(*args):
             call_order.append('daily')
             return True
         
-        def route_side_effect():
+        def route_side_effect(*args):
             call_order.append('route')
             return True
         
@@ -96,3 +326,75 @@ class TestRunAggregations:
         run_aggregations()
         
         assert call_order == ['daily', 'route']
+    
+    def test_run_aggregations_rejects_unknown_mode(self):
+        """Test that an unknown mode is refused."""
+        with pytest.raises(DataTransformationError):
+            run_aggregations(mode='sideways')
+    
+    @patch('pipeline.aggregate.consume_changed_dates')
+    @patch('pipeline.aggregate.read_changed_dates')
+    @patch('pipeline.aggregate.get_db_connection')
+    @patch('pipeline.aggregate.aggregate_route_performance')
+    @patch('pipeline.aggregate.aggregate_daily_stats')
+    def test_run_aggregations_incremental_uses_changed_window(
+        self, mock_daily, mock_route, mock_conn, mock_changed, mock_consume
+    ):
+        """Test that incremental runs only recompute the logged dates and then consume them."""
+        mock_conn.return_value = MagicMock()
+        mock_changed.return_value = ([7, 8], '2024-01-05', '2024-01-06', False)
+        
+        run_aggregations(mode='incremental')
+        
+        mock_daily.assert_called_once_with('2024-01-05', '2024-01-06')
+        mock_route.assert_called_once_with('2024-01-05', '2024-01-06')
+        assert mock_consume.call_args[0][1] == [7, 8]
+    
+    @patch('pipeline.aggregate.consume_changed_dates')
+    @patch('pipeline.aggregate.read_changed_dates')
+    @patch('pipeline.aggregate.get_db_connection')
+    @patch('pipeline.aggregate.aggregate_route_performance')
+    @patch('pipeline.aggregate.aggregate_daily_stats')
+    def test_run_aggregations_incremental_after_rebuild(
+        self, mock_daily, mock_route, mock_conn, mock_changed, mock_consume
+    ):
+        """Test that a logged staging rebuild recomputes every date."""
+        mock_conn.return_value = MagicMock()
+        mock_changed.return_value = ([9], None, None, True)
+        
+        run_aggregations(mode='incremental')
+        
+        mock_daily.assert_called_once_with(None, None)
+        mock_route.assert_called_once_with(None, None)
+        assert mock_consume.call_args[0][1] == [9]
+    
+    @patch('pipeline.aggregate.read_changed_dates')
+    @patch('pipeline.aggregate.get_db_connection')
+    @patch('pipeline.aggregate.aggregate_route_performance')
+    @patch('pipeline.aggregate.aggregate_daily_stats')
+    def test_run_aggregations_incremental_noop(
+        self, mock_daily, mock_route, mock_conn, mock_changed
+    ):
+        """Test that nothing is recomputed when staging has not changed."""
+        mock_conn.return_value = MagicMock()
+        mock_changed.return_value = ([], None, None, False)
+        
+        assert run_aggregations(mode='incremental') is True
+        mock_daily.assert_not_called()
+        mock_route.assert_not_called()
+    
+    @patch('pipeline.aggregate.get_db_connection')
+    @patch('pipeline.aggregate.aggregate_route_performance')
+    @patch('pipeline.aggregate.aggregate_daily_stats')
+    @patch('pipeline.aggregate.aggregate_delay_sketches')
+    @patch('pipeline.aggregate.run_rollups')
+    def test_run_aggregations_single_pass(self, mock_rollups, mock_sketches, mock_daily, mock_route, mock_conn):
+        """Test that single-pass mode delegates to the rollup engine, sketches included."""
+        mock_conn.return_value = MagicMock()
+        
+        run_aggregations(single_pass=True)
+        
+        mock_rollups.assert_called_once_with(None, None)
+        mock_daily.assert_not_called()
+        mock_route.assert_not_called()
+        mock_sketches.assert_not_called()
@@ -0,0 +1,169 @@
+"""
+Unit tests for the async ingestion and aggregation module.
+"""
+import asyncio
+import datetime
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pandas as pd
+import pytest
+
+from pipeline import async_pipeline
+from pipeline.async_pipeline import (
+    aggregate_partitions_async, copy_chunks_async, frame_records, run_aggregations_async,
+    run_ingest_async, to_positional
+)
+from pipeline.exceptions import ConfigurationError, DataIngestionError
+
+
+class FakePool:
+    """Stands in for an asyncpg pool, recording the connections handed out."""
+    
+    def __init__(self, max_size=2):
+        self.max_size = max_size
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.connections = []
+    
+    def get_max_size(self):
+        return self.max_size
+    
+    @asynccontextmanager
+    async def acquire(self):
+        conn = MagicMock()
+        conn.copy_records_to_table = AsyncMock()
+        conn.execute = AsyncMock(return_value='INSERT 0 3')
+        self.connections.append(conn)
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        try:
+            await asyncio.sleep(0)
+            yield conn
+        finally:
+            self.in_use -= 1
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+def test_to_positional_rewrites_binds():
+    """Test that :name binds become $n placeholders but casts are left alone."""
+    query, args = to_positional(
+        "SELECT '-infinity'::timestamp WHERE d >= :start_date AND d <= :end_date",
+        {'start_date': 'a', 'end_date': 'b'}
+    )
+    
+    assert query == "SELECT '-infinity'::timestamp WHERE d >= $1 AND d <= $2"
+    assert args == ['a', 'b']
+
+
+def test_frame_records_use_python_values():
+    """Test that missing values become None and timestamps become datetimes."""
+    df = pd.DataFrame({
+        'scheduled_departure': pd.to_datetime(['2024-01-01 08:30', None]),
+        'departure_delay': pd.array([5, None], dtype='Int64'),
+        'cancelled': [False, True]
+    })
+    
+    records = frame_records(df, ['scheduled_departure', 'departure_delay', 'cancelled'])
+    
+    assert records == [(datetime.datetime(2024, 1, 1, 8, 30), 5, False), (None, None, True)]
+    assert type(records[0][1]) is int
+    assert type(records[0][2]) is bool
+
+
+class TestAsyncIngest:
+    """Test suite for concurrent COPY loads."""
+    
+    def test_copies_every_chunk_within_pool_bound(self):
+        """Test that all chunks are copied and no more than the pool run at once."""
+        pool = FakePool(max_size=2)
+        chunks = [pd.DataFrame({'airline': ['AA'] * size}) for size in (3, 2, 4, 1)]
+        
+        rows = asyncio.run(copy_chunks_async(pool, chunks, 'flights', columns=['airline']))
+        
+        assert rows == 10
+        assert len(pool.connections) == 4
+        assert pool.peak_in_use <= 2
+        pool.connections[0].copy_records_to_table.assert_awaited_once_with(
+            'flights', schema_name='raw', columns=['airline'], records=[('AA',)] * 3
+        )
+    
+    @patch('pipeline.async_pipeline.raw_is_deduplicated', return_value=False)
+    @patch('pipeline.async_pipeline._ensure_raw_partitions')
+    @patch('pipeline.async_pipeline.get_db_connection')
+    def test_run_ingest_async_loads_records(self, mock_conn, mock_partitions, mock_deduplicated):
+        """Test that the sync wrapper generates and loads the requested rows."""
+        pool = FakePool(max_size=3)
+        
+        with patch('pipeline.async_pipeline.create_pool', return_value=pool):
+            assert run_ingest_async(num_records=250, chunk_size=100, seed=1) == 250
+        
+        assert len(pool.connections) == 3
+        mock_partitions.assert_called_once()
+    
+    def test_upsert_mode_is_rejected(self):
+        """Test that the async path refuses upsert loads."""
+        with pytest.raises(DataIngestionError):
+            run_ingest_async(num_records=10, mode='upsert')
+    
+    @patch('pipeline.async_pipeline.raw_is_deduplicated', return_value=True)
+    @patch('pipeline.async_pipeline.create_pool')
+    @patch('pipeline.async_pipeline.get_db_connection')
+    def test_natural_key_is_rejected(self, mock_conn, mock_pool, mock_deduplicated):
+        """Test that nothing is copied into a raw.flights that would reject reloaded flights."""
+        with pytest.raises(DataIngestionError, match='unique natural key'):
+            run_ingest_async(num_records=10)
+        
+        mock_pool.assert_not_called()
+    
+    def test_missing_asyncpg(self):
+        """Test that a clear error is raised without asyncpg installed."""
+        with patch.object(async_pipeline, 'asyncpg', None):
+            with pytest.raises(ConfigurationError):
+                async_pipeline.create_pool()
+
+
+class TestAsyncAggregations:
+    """Test suite for concurrent partition aggregation."""
+    
+    def test_partitions_run_in_own_transactions(self):
+        """Test that each partition refreshes its window on its own connection."""
+        pool = FakePool(max_size=2)
+        partitions = [
+            {'start_date': '2024-01-01', 'end_date': '2024-01-01'},
+            {'start_date': '2024-01-02', 'end_date': '2024-01-02'}
+        ]
+        
+        with patch('pipeline.async_pipeline.create_pool', return_value=pool):
+            results = asyncio.run(aggregate_partitions_async(partitions))
+        
+        assert results == partitions
+        assert len(pool.connections) == 2
+        for conn, day in zip(pool.connections, (1, 2)):
+            conn.transaction.assert_called_once()
+            query, *args = conn.execute.await_args_list[0].args
+            assert query == "DELETE FROM analytics.daily_airline_stats WHERE flight_date >= $1 AND flight_date <= $2"
+            assert args == [datetime.date(2024, 1, day)] * 2
+    
+    @patch('pipeline.async_pipeline.finalize_aggregations', return_value=2)
+    @patch('pipeline.async_pipeline.aggregate_partitions_async', new_callable=AsyncMock)
+    def test_run_aggregations_async_finalizes(self, mock_aggregate, mock_finalize):
+        """Test that the sync wrapper hands the partition results to the fan-in."""
+        partitions = [{'start_date': '2024-01-01', 'end_date': '2024-01-31'}, None]
+        mock_aggregate.return_value = partitions[:1]
+        
+        assert run_aggregations_async(partitions) == 2
+        
+        mock_aggregate.assert_awaited_once_with(partitions[:1], pool_size=None)
+        mock_finalize.assert_called_once_with(partitions[:1])
+    
+    @patch('pipeline.async_pipeline.finalize_aggregations')
+    def test_no_partitions(self, mock_finalize):
+        """Test that nothing runs when no partitions changed."""
+        assert run_aggregations_async([]) == 0
+        mock_finalize.assert_not_called()
@@ -58,6 +58,8 @@ class TestPipelineConfig:
         assert config.max_retries == 3
         assert config.retry_delay_seconds == 60
         assert config.data_retention_days == 90
+        assert config.num_records == 1000
+        assert config.chunk_size == 100_000
     
     def test_pipeline_config_custom_values(self):
         """Test custom pipeline configuration."""
@@ -85,6 +87,8 @@ class TestConfig:
         'DB_NAME': 'test-db',
         'BATCH_SIZE': '2000',
         'MAX_RETRIES': '5',
+        'NUM_RECORDS': '5000000',
+        'CHUNK_SIZE': '250000',
         'ENVIRONMENT': 'production'
     })
     def test_config_from_env(self):
@@ -96,6 +100,8 @@ class TestConfig:
         assert config.database.user == 'test-user'
         assert config.pipeline.batch_size == 2000
         assert config.pipeline.max_retries == 5
+        assert config.pipeline.num_records == 5_000_000
+        assert config.pipeline.chunk_size == 250_000
         assert config.environment == 'production'
     
     @patch.dict(os.environ, {}, clear=True)
@@ -2,8 +2,17 @@
 Unit tests for database utilities.
 """
 import pytest
+import weakref
 from unittest.mock import Mock, patch, MagicMock
-from pipeline.db_utils import get_connection_string, get_db_session, execute_query, execute_update
+import pandas as pd
+from sqlalchemy import create_engine
+from pipeline.config import config
+from pipeline.db_utils import (
+    get_connection_string, get_db_session, execute_query, execute_update,
+    get_engine, dispose_engines, track_task, get_pool_metrics, reset_pool_metrics, _register_pool_metrics,
+    copy_to_table, copy_dataframe, copy_frames, get_watermark, set_watermark,
+    get_data_versions, on_data_version_change, publish_data_version, remove_data_version_listener
+)
 
 
 class TestGetConnectionString:
@@ -25,30 +34,83 @@ class TestGetConnectionString:
 class TestGetDbSession:
     """Test suite for database session context manager."""
     
-    @patch('pipeline.db_utils.create_engine')
-    def test_get_db_session_yields_connection(self, mock_create_engine):
+    @patch('pipeline.db_utils.get_engine')
+    def test_get_db_session_yields_connection(self, mock_get_engine):
         """Test that session yields a connection."""
         mock_engine = Mock()
         mock_connection = Mock()
         mock_engine.connect.return_value = mock_connection
-        mock_create_engine.return_value = mock_engine
+        mock_get_engine.return_value = mock_engine
         
         with get_db_session() as session:
             assert session == mock_connection
     
-    @patch('pipeline.db_utils.create_engine')
-    def test_get_db_session_closes_connection(self, mock_create_engine):
-        """Test that connection is closed after use."""
+    @patch('pipeline.db_utils.get_engine')
+    def test_get_db_session_closes_connection(self, mock_get_engine):
+        """Test that the connection goes back to the pool and the engine is kept."""
         mock_engine = Mock()
         mock_connection = Mock()
         mock_engine.connect.return_value = mock_connection
-        mock_create_engine.return_value = mock_engine
+        mock_get_engine.return_value = mock_engine
         
         with get_db_session() as session:
             pass
         
         mock_connection.close.assert_called_once()
-        mock_engine.dispose.assert_called_once()
+        mock_engine.dispose.assert_not_called()
+
+
+class TestGetEngine:
+    """Test suite for the shared engine registry."""
+    
+    def setup_method(self):
+        dispose_engines()
+        reset_pool_metrics()
+    
+    def teardown_method(self):
+        dispose_engines()
+    
+    @patch('pipeline.db_utils.create_engine')
+    def test_get_engine_is_cached_per_url(self, mock_create_engine):
+        """Test that one engine is built per database URL."""
+        with patch('pipeline.db_utils._register_pool_metrics'):
+            first = get_engine('postgresql://a@host/db')
+            second = get_engine('postgresql://a@host/db')
+            other = get_engine('postgresql://b@host/db')
+        
+        assert first is second
+        assert mock_create_engine.call_count == 2
+        assert other is mock_create_engine.return_value
+    
+    @patch('pipeline.db_utils.create_engine')
+    def test_get_engine_uses_pool_config(self, mock_create_engine):
+        """Test that pool settings come from the database config."""
+        with patch('pipeline.db_utils._register_pool_metrics'):
+            get_engine('postgresql://a@host/db')
+        
+        kwargs = mock_create_engine.call_args[1]
+        assert kwargs['future'] is True
+        assert kwargs['pool_size'] == config.database.pool_size
+        assert kwargs['max_overflow'] == config.database.max_overflow
+        assert kwargs['pool_pre_ping'] == config.database.pool_pre_ping
+        assert kwargs['pool_recycle'] == config.database.pool_recycle_seconds
+    
+    def test_pool_metrics_are_tracked_per_task(self):
+        """Test that checkouts are attributed to the tracked task."""
+        engine = create_engine('sqlite://')
+        _register_pool_metrics(engine)
+        
+        with track_task('transform'):
+            with engine.connect():
+                assert get_pool_metrics('transform')['checked_out'] == 1
+            with engine.connect():
+                pass
+        
+        metrics = get_pool_metrics('transform')
+        assert metrics['checkouts'] == 2
+        assert metrics['connects'] == 1
+        assert metrics['checked_out'] == 0
+        assert metrics['held_seconds'] >= 0
 
 
 class TestExecuteQuery:
@@ -99,3 +161,164 @@ class TestExecuteUpdate:
         
         assert result == 5
         mock_connection.commit.assert_called_once()
+
+
+class TestCopyDataframe:
+    """Test suite for COPY-based bulk loading."""
+    
+    def test_copy_to_table_writes_csv(self):
+        """Test that rows are streamed as CSV with NULLs and integer delays."""
+        cursor = Mock()
+        df = pd.DataFrame({
+            'airline': ['AA', 'DL'],
+            'departure_delay': [15.0, None],
+            'cancellation_reason': [None, 'Weather, heavy']
+        })
+        
+        rows = copy_to_table(cursor, df, 'raw.flights')
+        
+        assert rows == 2
+        sql, buffer = cursor.copy_expert.call_args[0]
+        assert sql == (
+            'COPY raw.flights (airline, departure_delay, cancellation_reason) '
+            'FROM STDIN WITH (FORMAT csv)'
+        )
+        assert buffer.getvalue().splitlines() == ['AA,15,', 'DL,,"Weather, heavy"']
+    
+    def test_copy_to_table_keeps_floats_beyond_int64(self):
+        """Test that whole floats too large for an int64 are not coerced to Int64."""
+        cursor = Mock()
+        df = pd.DataFrame({'small': [15.0, None], 'huge': [1e19, -1e19], 'inf': [float('inf'), 1.0]})
+        
+        copy_to_table(cursor, df, 'raw.numbers')
+        
+        buffer = cursor.copy_expert.call_args[0][1]
+        assert buffer.getvalue().splitlines() == ['15,1e+19,inf', ',-1e+19,1.0']
+    
+    def test_copy_dataframe_streams_each_frame_in_one_copy(self, monkeypatch):
+        """Test that without a batch_size every chunk-sized frame is a single COPY."""
+        monkeypatch.setattr(config.pipeline, 'chunk_size', 5000)
+        engine = Mock()
+        cursor = engine.raw_connection.return_value.cursor.return_value
+        
+        rows = copy_frames([pd.DataFrame({'airline': ['AA'] * 5000}), pd.DataFrame({'airline': ['DL'] * 3})],
+                           'flights', engine)
+        
+        assert rows == 5003
+        assert cursor.copy_expert.call_count == 2
+    
+    def test_copy_dataframe_bounds_copy_by_chunk_size(self, monkeypatch):
+        """Test that a frame larger than the configured chunk size is split into bounded COPYs."""
+        monkeypatch.setattr(config.pipeline, 'chunk_size', 2)
+        engine = Mock()
+        cursor = engine.raw_connection.return_value.cursor.return_value
+        
+        rows = copy_dataframe(pd.DataFrame({'airline': ['AA'] * 5}), 'flights', engine)
+        
+        assert rows == 5
+        assert cursor.copy_expert.call_count == 3
+    
+    def test_copy_dataframe_chunks_by_batch_size(self):
+        """Test that the frame is copied in batch_size chunks and committed once."""
+        engine = Mock()
+        connection = engine.raw_connection.return_value
+        cursor = connection.cursor.return_value
+        df = pd.DataFrame({'airline': ['AA'] * 5})
+        
+        rows = copy_dataframe(df, 'flights', engine, schema='raw', batch_size=2)
+        
+        assert rows == 5
+        assert cursor.copy_expert.call_count == 3
+        connection.commit.assert_called_once()
+        connection.close.assert_called_once()
+    
+    def test_copy_dataframe_rolls_back_on_error(self):
+        """Test that a failed COPY rolls back the transaction."""
+        engine = Mock()
+        connection = engine.raw_connection.return_value
+        connection.cursor.return_value.copy_expert.side_effect = RuntimeError('boom')
+        df = pd.DataFrame({'airline': ['AA']})
+        
+        with pytest.raises(RuntimeError):
+            copy_dataframe(df, 'flights', engine)
+        
+        connection.rollback.assert_called_once()
+        connection.commit.assert_not_called()
+
+
+class TestWatermarks:
+    """Test suite for incremental job watermarks."""
+    
+    def test_get_watermark_defaults_to_zero(self):
+        """Test that a job that never ran starts from id 0."""
+        connection = Mock()
+        connection.execute.return_value.fetchone.return_value = None
+        
+        assert get_watermark(connection, 'transform.flights_clean') == 0
+    
+    def test_get_watermark_returns_last_id(self):
+        """Test that the stored high-water mark is returned."""
+        connection = Mock()
+        connection.execute.return_value.fetchone.return_value = (1234,)
+        
+        assert get_watermark(connection, 'transform.flights_clean') == 1234
+    
+    def test_set_watermark_upserts(self):
+        """Test that the mark is upserted by name."""
+        connection = Mock()
+        
+        set_watermark(connection, 'transform.flights_clean', 99)
+        
+        query, params = connection.execute.call_args[0]
+        assert 'ON CONFLICT (name)' in str(query)
+        assert params == {'name': 'transform.flights_clean', 'last_id': 99, 'last_loaded_at': None}
+
+
+class TestDataVersions:
+    """Test suite for published data versions."""
+    
+    def test_get_data_versions_defaults_to_zero(self):
+        """Test that sources never published report version 0, in the order asked."""
+        connection = Mock()
+        connection.execute.return_value.fetchall.return_value = [('data_version.analytics', 7)]
+        
+        assert get_data_versions(connection, ('staging', 'analytics')) == (0, 7)
+    
+    def test_publish_data_version_increments_and_notifies(self):
+        """Test that publishing bumps the version in its own transaction and calls listeners."""
+        engine = MagicMock()
+        conn = engine.begin.return_value.__enter__.return_value
+        conn.execute.return_value.scalar.return_value = 3
+        published = []
+        on_data_version_change(published.append)
+        
+        assert publish_data_version(engine, 'staging') == 3
+        
+        query, params = conn.execute.call_args[0]
+        assert 'last_id = staging.etl_watermarks.last_id + 1' in str(query)
+        assert params == {'name': 'data_version.staging'}
+        assert published == ['staging']
+        remove_data_version_listener(published.append)
+    
+    def test_bound_method_listeners_do_not_keep_their_object_alive(self):
+        """Test that a listener's object can be collected and removed listeners are not called."""
+        class Listener:
+            def __init__(self):
+                self.sources = []
+            
+            def __call__(self, source):
+                self.sources.append(source)
+        
+        engine = MagicMock()
+        kept, dropped = Listener(), Listener()
+        on_data_version_change(kept.__call__)
+        on_data_version_change(dropped.__call__)
+        dropped_ref = weakref.ref(dropped)
+        del dropped
+        
+        publish_data_version(engine, 'staging')
+        remove_data_version_listener(kept.__call__)
+        publish_data_version(engine, 'analytics')
+        
+        assert dropped_ref() is None
+        assert kept.sources == ['staging']
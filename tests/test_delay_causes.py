@@ -0,0 +1,64 @@
+"""
+Unit tests for BTS delay cause ingestion.
+"""
+import pytest
+from unittest.mock import Mock, patch
+import pandas as pd
+from pipeline.delay_causes import (
+    read_delay_causes, ingest_delay_causes, COUNT_COLUMNS, DEFAULT_DELAY_CAUSES_PATH
+)
+
+
+class TestReadDelayCauses:
+    """Test suite for typed chunked parsing of the BTS file."""
+    
+    def test_read_delay_causes_chunks(self):
+        """Test that the bundled file is parsed in bounded chunks."""
+        chunks = list(read_delay_causes(DEFAULT_DELAY_CAUSES_PATH, chunksize=2000))
+        
+        assert [len(chunk) for chunk in chunks] == [2000, 2000, 1686]
+    
+    def test_read_delay_causes_dtypes(self):
+        """Test that explicit compact dtypes are applied."""
+        chunk = next(iter(read_delay_causes(DEFAULT_DELAY_CAUSES_PATH, chunksize=500)))
+        
+        assert chunk['carrier'].dtype == 'category'
+        assert chunk['airport'].dtype == 'category'
+        assert chunk['year'].dtype == 'int16'
+        for column in COUNT_COLUMNS:
+            assert chunk[column].dtype == 'float32'
+
+
+class TestIngestDelayCauses:
+    """Test suite for loading raw.delay_causes."""
+    
+    @patch('pipeline.delay_causes.get_db_connection')
+    def test_ingest_delay_causes_replaces_each_month_once(self, mock_conn):
+        """Test that each month is deleted once before its rows are copied."""
+        mock_engine = Mock()
+        mock_conn.return_value = mock_engine
+        connection = mock_engine.raw_connection.return_value
+        cursor = connection.cursor.return_value
+        
+        result = ingest_delay_causes(DEFAULT_DELAY_CAUSES_PATH, chunksize=2000)
+        
+        assert result == 5686
+        deletes = [c[0][1] for c in cursor.execute.call_args_list]
+        assert sorted(deletes) == [(2025, 4), (2025, 5), (2025, 6)]
+        assert cursor.copy_expert.call_count == 3
+        assert 'COPY raw.delay_causes' in cursor.copy_expert.call_args[0][0]
+        connection.commit.assert_called_once()
+    
+    @patch('pipeline.delay_causes.get_db_connection')
+    def test_ingest_delay_causes_rolls_back_on_error(self, mock_conn):
+        """Test that a failed load leaves previous months untouched."""
+        mock_engine = Mock()
+        mock_conn.return_value = mock_engine
+        connection = mock_engine.raw_connection.return_value
+        connection.cursor.return_value.copy_expert.side_effect = RuntimeError('boom')
+        
+        with pytest.raises(RuntimeError):
+            ingest_delay_causes(DEFAULT_DELAY_CAUSES_PATH)
+        
+        connection.rollback.assert_called_once()
+        connection.commit.assert_not_called()
@@ -5,7 +5,19 @@ import pytest
 from unittest.mock import Mock, patch, MagicMock
 import pandas as pd
 from datetime import datetime
-from pipeline.ingest import generate_sample_data, ingest_data
+from pipeline.exceptions import DataIngestionError
+from concurrent.futures import ThreadPoolExecutor
+from pipeline.ingest import (
+    generate_sample_data, generate_sample_chunks, ingest_data,
+    ingest_data_parallel, ingest_data_streaming, plan_ingest_shards, upsert_frames
+)
+
+
+@pytest.fixture(autouse=True)
+def mock_raw_has_duplicates():
+    """Treat raw.flights as an append-only table without a unique natural key."""
+    with patch('pipeline.ingest.raw_is_deduplicated', return_value=False) as mock_deduplicated:
+        yield mock_deduplicated
 
 
 class TestGenerateSampleData:
@@ -55,20 +67,61 @@ class TestGenerateSampleData:
         df = generate_sample_data(100)
         
         assert (df['origin'] != df['destination']).all()
+    
+    
+    def test_generate_sample_data_is_seeded(self):
+        """Test that the same seed reproduces the same frame."""
+        df1 = generate_sample_data(500, seed=42)
+        df2 = generate_sample_data(500, seed=42)
+        
+        pd.testing.assert_frame_equal(df1, df2)
+    
+    def test_generate_sample_data_distributions(self):
+        """Test cancellation rate and delay relationships on a large sample."""
+        df = generate_sample_data(200_000, seed=7)
+        flown = df[~df['cancelled']]
+        
+        assert abs(df['cancelled'].mean() - 0.05) < 0.005
+        assert df.loc[df['cancelled'], 'cancellation_reason'].notna().all()
+        assert flown['cancellation_reason'].isna().all()
+        assert flown['departure_delay'].between(-10, 120).all()
+        assert (flown['arrival_delay'] - flown['departure_delay']).between(-15, 30).all()
+        assert (
+            flown['actual_departure'] - flown['scheduled_departure']
+            == pd.to_timedelta(flown['departure_delay'].astype('int64'), unit='m')
+        ).all()
+        assert (
+            flown['actual_arrival'] - flown['scheduled_arrival']
+            == pd.to_timedelta(flown['arrival_delay'].astype('int64'), unit='m')
+        ).all()
+        assert df['scheduled_departure'].dt.hour.between(6, 22).all()
+        assert df['distance'].between(200, 3000).all()
+    
+    def test_generate_sample_chunks_sizes(self):
+        """Test that chunks cover num_records without exceeding chunk_size."""
+        chunks = list(generate_sample_chunks(250, chunk_size=100, seed=1))
+        
+        assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+        pd.testing.assert_frame_equal(
+            chunks[0],
+            next(generate_sample_chunks(250, chunk_size=100, seed=1))
+        )
 
 
 class TestIngestData:
     """Test suite for data ingestion."""
     
+    @patch('pipeline.ingest._ensure_raw_partitions')
+    @patch('pipeline.ingest.copy_dataframe')
     @patch('pipeline.ingest.get_db_connection')
     @patch('pipeline.ingest.generate_sample_data')
-    def test_ingest_data_success(self, mock_generate, mock_conn):
+    def test_ingest_data_success(self, mock_generate, mock_conn, mock_copy, mock_partitions):
         """Test successful data ingestion."""
         # Setup mocks
-        mock_df = pd.DataFrame({'col1': [1, 2, 3]})
+        mock_df = pd.DataFrame({'col1': range(1000), 'flight_date': pd.Timestamp('2024-01-01')})
         mock_generate.return_value = mock_df
         
-        mock_engine = Mock()
+        mock_engine = MagicMock()
         mock_conn.return_value = mock_engine
         
         # Execute
@@ -78,20 +131,194 @@ class TestIngestData:
         assert result == 1000
         mock_generate.assert_called_once_with(num_records=1000)
     
+    @patch('pipeline.ingest._ensure_raw_partitions')
+    @patch('pipeline.ingest.copy_dataframe')
     @patch('pipeline.ingest.get_db_connection')
     @patch('pipeline.ingest.generate_sample_data')
-    def test_ingest_data_calls_to_sql(self, mock_generate, mock_conn):
-        """Test that to_sql is called with correct parameters."""
+    def test_ingest_data_uses_copy(self, mock_generate, mock_conn, mock_copy, mock_partitions):
+        """Test that data is bulk loaded into raw.flights with COPY."""
         mock_df = MagicMock()
         mock_generate.return_value = mock_df
         
-        mock_engine = Mock()
+        mock_engine = MagicMock()
         mock_conn.return_value = mock_engine
         
         ingest_data()
         
-        mock_df.to_sql.assert_called_once()
-        call_args = mock_df.to_sql.call_args
-        assert call_args[0][0] == 'flights'
+        mock_df.to_sql.assert_not_called()
+        mock_copy.assert_called_once()
+        call_args = mock_copy.call_args
+        assert call_args[0][0] is mock_df
+        assert call_args[0][1] == 'flights'
+        assert call_args[0][2] is mock_engine
         assert call_args[1]['schema'] == 'raw'
-        assert call_args[1]['if_exists'] == 'append'
+    
+    @patch('pipeline.ingest._ensure_raw_partitions')
+    @patch('pipeline.ingest.copy_dataframe')
+    @patch('pipeline.ingest.get_db_connection')
+    def test_ingest_data_creates_partitions_first(self, mock_conn, mock_copy, mock_partitions):
+        """Test that monthly partitions for the generated dates exist before the COPY."""
+        calls = []
+        mock_partitions.side_effect = lambda *args: calls.append('partitions')
+        mock_copy.side_effect = lambda *args, **kwargs: calls.append('copy')
+        
+        ingest_data(num_records=200)
+        
+        assert calls == ['partitions', 'copy']
+        _, start_date, end_date = mock_partitions.call_args[0]
+        assert start_date <= end_date
+
+
+class TestIngestDataStreaming:
+    """Test suite for streaming chunked ingestion."""
+    
+    @patch('pipeline.ingest._ensure_raw_partitions')
+    @patch('pipeline.ingest.get_memory_usage')
+    @patch('pipeline.ingest.get_db_connection')
+    def test_streaming_copies_each_chunk(self, mock_conn, mock_memory, mock_partitions):
+        """Test that every generated chunk is COPYed over one connection."""
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        mock_memory.return_value = 100.0
+        cursor = mock_engine.raw_connection.return_value.cursor.return_value
+        
+        result = ingest_data_streaming(num_records=250, chunk_size=100)
+        
+        assert result == 250
+        assert cursor.copy_expert.call_count == 3
+        mock_engine.raw_connection.return_value.commit.assert_called_once()
+    
+    @patch('pipeline.ingest._ensure_raw_partitions')
+    @patch('pipeline.ingest.get_memory_usage')
+    @patch('pipeline.ingest.copy_frames')
+    @patch('pipeline.ingest.get_db_connection')
+    def test_streaming_generates_lazily(self, mock_conn, mock_copy, mock_memory, mock_partitions):
+        """Test that chunks are built one at a time as the loader consumes them."""
+        sizes = []
+        
+        def consume(chunks, *args, **kwargs):
+            for chunk in chunks:
+                sizes.append(len(chunk))
+            return sum(sizes)
+        
+        mock_copy.side_effect = consume
+        mock_memory.side_effect = [100.0, 120.0, 110.0, 130.0]
+        
+        result = ingest_data_streaming(num_records=300, chunk_size=100)
+        
+        assert result == 300
+        assert sizes == [100, 100, 100]
+        assert mock_memory.call_count == 4
+    
+    @patch('pipeline.ingest.ingest_data_streaming')
+    def test_ingest_data_streaming_flag(self, mock_streaming):
+        """Test that ingest_data delegates to the streaming path when asked."""
+        mock_streaming.return_value = 42
+        
+        assert ingest_data(num_records=42, streaming=True) == 42
+        mock_streaming.assert_called_once_with(num_records=42, mode=None)
+
+
+class TestUpsertIngest:
+    """Test suite for deduplicating upsert ingestion."""
+    
+    @patch('pipeline.ingest.raw_is_deduplicated', return_value=True)
+    @patch('pipeline.ingest._ensure_raw_partitions')
+    @patch('pipeline.ingest.copy_dataframe')
+    @patch('pipeline.ingest.upsert_frames')
+    @patch('pipeline.ingest.get_db_connection')
+    def test_upsert_mode_merges_instead_of_copying(self, mock_conn, mock_upsert, mock_copy, mock_partitions,
+                                                   mock_deduplicated):
+        """Test that upsert mode loads through the ON CONFLICT merge."""
+        assert ingest_data(num_records=100, mode='upsert') == 100
+        
+        mock_copy.assert_not_called()
+        frames, engine = mock_upsert.call_args[0]
+        assert len(frames[0]) == 100
+        assert engine is mock_conn.return_value
+    
+    def test_unknown_mode_rejected(self):
+        """Test that an unknown ingest mode fails before anything is loaded."""
+        with pytest.raises(DataIngestionError):
+            ingest_data(mode='overwrite')
+    
+    def test_upsert_stages_then_merges_once(self):
+        """Test that every chunk is COPYed to a temp table and merged in one statement."""
+        engine = MagicMock()
+        connection = engine.raw_connection.return_value
+        cursor = connection.cursor.return_value
+        cursor.rowcount = 150
+        
+        result = upsert_frames(generate_sample_chunks(250, chunk_size=100, seed=1), engine)
+        
+        assert result == 250
+        assert cursor.copy_expert.call_count == 3
+        assert all('COPY flights_ingest' in c[0][0] for c in cursor.copy_expert.call_args_list)
+        merge = cursor.execute.call_args_list[-1][0][0]
+        assert 'ON CONFLICT (flight_date, airline, flight_number, origin, destination, scheduled_departure)' in merge
+        assert 'IS DISTINCT FROM' in merge
+        connection.commit.assert_called_once()
+    
+    @patch('pipeline.ingest.get_db_connection')
+    def test_upsert_without_natural_key_fails(self, mock_conn):
+        """Test that upsert ingest never changes the schema itself."""
+        with pytest.raises(DataIngestionError, match='pipeline.migrations raw_natural_key'):
+            ingest_data(num_records=10, mode='upsert')
+        
+        mock_conn.return_value.begin.assert_not_called()
+    
+    @patch('pipeline.ingest.raw_is_deduplicated', return_value=True)
+    @patch('pipeline.ingest._ensure_raw_partitions')
+    @patch('pipeline.ingest.copy_dataframe')
+    @patch('pipeline.ingest.upsert_frames')
+    @patch('pipeline.ingest.get_db_connection')
+    def test_append_after_natural_key_merges(self, mock_conn, mock_upsert, mock_copy, mock_partitions,
+                                             mock_deduplicated):
+        """Test that append loads merge once raw.flights has a unique natural key."""
+        assert ingest_data(num_records=100, mode='append') == 100
+        
+        mock_copy.assert_not_called()
+        mock_upsert.assert_called_once()
+
+
+class TestParallelIngest:
+    """Test suite for sharded multi-process ingestion."""
+    
+    def test_shards_cover_every_record(self):
+        """Test that shard sizes differ by at most one and add up to the load."""
+        plan = plan_ingest_shards(1003, 4, seed=1)
+        
+        assert [records for records, _ in plan] == [251, 251, 251, 250]
+    
+    def test_shard_data_is_reproducible(self):
+        """Test that a shard's rows depend only on the root seed and shard index."""
+        def shard_frame(seed, index):
+            records, shard_seed = plan_ingest_shards(400, 4, seed=seed)[index]
+            return pd.concat(generate_sample_chunks(records, chunk_size=50, seed=shard_seed))
+        
+        pd.testing.assert_frame_equal(shard_frame(7, 2), shard_frame(7, 2))
+        assert not shard_frame(7, 1)['flight_number'].equals(shard_frame(7, 2)['flight_number'])
+    
+    @patch('pipeline.ingest.ProcessPoolExecutor', ThreadPoolExecutor)
+    @patch('pipeline.ingest._ensure_raw_partitions')
+    @patch('pipeline.ingest.copy_frames')
+    @patch('pipeline.ingest.get_db_connection')
+    def test_shard_stats_are_combined(self, mock_conn, mock_copy, mock_partitions):
+        """Test that every shard loads its own rows and the stats add up."""
+        mock_copy.side_effect = lambda chunks, *args, **kwargs: sum(len(chunk) for chunk in chunks)
+        
+        stats = ingest_data_parallel(num_records=1000, workers=2, shards=3, chunk_size=200, seed=1)
+        
+        assert stats.records == 1000
+        assert [shard.records for shard in stats.shards] == [334, 333, 333]
+        assert mock_copy.call_count == 3
+        mock_partitions.assert_called_once()
+        assert stats.peak_memory_mb > 0
+    
+    @patch('pipeline.ingest.ingest_data_parallel')
+    def test_ingest_data_workers_flag(self, mock_parallel):
+        """Test that more than one worker selects the parallel path."""
+        mock_parallel.return_value.records = 500
+        
+        assert ingest_data(num_records=500, workers=4) == 500
+        mock_parallel.assert_called_once_with(num_records=500, workers=4, mode=None)
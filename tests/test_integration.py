@@ -2,7 +2,7 @@
 Integration tests for the complete pipeline.
 """
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, MagicMock, patch
 import pandas as pd
 
 
@@ -15,7 +15,7 @@ class TestPipelineIntegration:
     def test_full_pipeline_execution(self, mock_ingest_conn, mock_transform_conn, mock_agg_conn):
         """Test complete pipeline from ingest to aggregation."""
         # Setup mocks for ingestion
-        mock_ingest_engine = Mock()
+        mock_ingest_engine = MagicMock()
         mock_ingest_conn.return_value = mock_ingest_engine
         
         # Setup mocks for transformation
@@ -35,13 +35,13 @@ class TestPipelineIntegration:
         ingest_result = ingest_data()
         assert ingest_result == 1000
         
-        # Verify ingestion called database
-        assert mock_ingest_engine.connect.called
+        # Verify ingestion bulk loaded over a raw DBAPI connection
+        assert mock_ingest_engine.raw_connection.called
     
     @patch('pipeline.quality_checks.get_db_connection')
     def test_quality_checks_integration(self, mock_conn):
         """Test quality checks run successfully."""
-        mock_engine = Mock()
+        mock_engine = MagicMock()
         mock_connection = Mock()
         
         # Mock results for quality checks
@@ -68,19 +68,19 @@ class TestPipelineIntegration:
 class TestDatabaseIntegration:
     """Integration tests for database operations."""
     
-    @patch('pipeline.db_utils.create_engine')
-    def test_database_session_lifecycle(self, mock_create_engine):
+    @patch('pipeline.db_utils.get_engine')
+    def test_database_session_lifecycle(self, mock_get_engine):
         """Test complete database session lifecycle."""
         from pipeline.db_utils import get_db_session
         
         mock_engine = Mock()
         mock_connection = Mock()
         mock_engine.connect.return_value = mock_connection
-        mock_create_engine.return_value = mock_engine
+        mock_get_engine.return_value = mock_engine
         
         with get_db_session() as session:
             assert session == mock_connection
         
-        # Verify cleanup
+        # Verify the connection is returned to the shared pool
         mock_connection.close.assert_called_once()
-        mock_engine.dispose.assert_called_once()
+        mock_engine.dispose.assert_not_called()
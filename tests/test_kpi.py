@@ -0,0 +1,135 @@
+"""
+Unit tests for KPI query module.
+"""
+import pytest
+import pandas as pd
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+from pipeline.exceptions import ConfigurationError
+from pipeline.kpi import KpiResult, compare_kpis, load_kpi_queries, run_kpis, run_kpis_duckdb
+from pipeline.landing import read_flights, write_flights
+from pipeline.transform import FLIGHT_COLUMNS, dedupe_latest
+
+
+@pytest.fixture
+def snapshot_csv(tmp_path):
+    """Small staging.flights_clean snapshot as CSV."""
+    path = tmp_path / 'flights_clean.csv'
+    pd.DataFrame({
+        'flight_date': ['2024-01-01', '2024-01-01', '2024-01-02'],
+        'airline': ['AA', 'AA', 'DL'],
+        'origin': ['JFK', 'JFK', 'ATL'],
+        'destination': ['LAX', 'LAX', 'SFO'],
+        'departure_delay': [10, 30, 0],
+        'arrival_delay': [5, 40, 0],
+        'cancelled': [False, False, True],
+        'cancellation_reason': [None, None, 'Weather']
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+class TestLoadKpiQueries:
+    """Test suite for parsing kpi_queries.sql."""
+    
+    def test_loads_every_numbered_query(self):
+        """Test that each numbered KPI is named after its header comment."""
+        queries = load_kpi_queries()
+        
+        assert list(queries) == [
+            'overall_delay_statistics_by_airline',
+            'route_performance_analysis',
+            'daily_trends',
+            'worst_performing_routes',
+            'cancellation_reasons_breakdown'
+        ]
+        assert all(sql.startswith('SELECT') for sql in queries.values())
+
+
+class TestRunKpis:
+    """Test suite for the KPI engines."""
+    
+    def test_duckdb_runs_kpi_sql_over_snapshot(self, snapshot_csv):
+        """Test that the Postgres KPI SQL runs unchanged in DuckDB."""
+        queries = load_kpi_queries()
+        
+        results = run_kpis_duckdb(snapshot_csv, queries={
+            'overall_delay_statistics_by_airline': queries['overall_delay_statistics_by_airline']
+        })
+        
+        rows = results[0].rows
+        assert list(rows['airline']) == ['AA', 'DL']
+        assert list(rows['median_arrival_delay']) == [22.5, 0.0]
+        assert list(rows['cancellation_rate']) == [0.0, 100.0]
+        assert results[0].engine == 'duckdb'
+    
+    def test_daily_trends_are_bounded_by_the_data(self, snapshot_csv):
+        """Test that the daily trends window ends at the latest flight, not today."""
+        queries = load_kpi_queries()
+        
+        results = run_kpis_duckdb(snapshot_csv, queries={'daily_trends': queries['daily_trends']})
+        
+        assert list(results[0].rows['total_flights']) == [1, 2]
+    
+    def test_snapshot_path_with_quote(self, snapshot_csv, tmp_path):
+        """Test that a quote in the snapshot path does not break the generated SQL."""
+        path = tmp_path / "o'hare.csv"
+        path.write_text(open(snapshot_csv).read())
+        
+        results = run_kpis_duckdb(str(path), queries={'flights': 'SELECT COUNT(*) AS n FROM staging.flights_clean'})
+        
+        assert list(results[0].rows['n']) == [3]
+    
+    def test_landing_ties_resolve_like_dedupe_latest(self, tmp_path):
+        """Test that versions landed at the same instant keep the one the transform keeps."""
+        def versions(delays):
+            return pd.DataFrame({
+                'flight_date': pd.to_datetime(['2024-01-01'] * len(delays)),
+                'airline': 'AA',
+                'flight_number': 'AA1',
+                'origin': 'JFK',
+                'destination': 'LAX',
+                'scheduled_departure': pd.Timestamp('2024-01-01 10:00'),
+                'departure_delay': delays,
+                'arrival_delay': delays,
+                'cancelled': False
+            }).reindex(columns=FLIGHT_COLUMNS)
+        
+        with patch('pipeline.landing.pd.Timestamp.now', return_value=pd.Timestamp('2024-01-02')):
+            write_flights(versions([5, 10]), batch_id='a', landing_dir=str(tmp_path))
+            write_flights(versions([20, 30]), batch_id='b', landing_dir=str(tmp_path))
+        
+        expected = dedupe_latest(read_flights(landing_dir=str(tmp_path)))
+        with patch('pipeline.landing.get_landing_dir', return_value=str(tmp_path)):
+            results = run_kpis_duckdb('landing', queries={
+                'delays': 'SELECT arrival_delay FROM staging.flights_clean'
+            })
+        
+        assert list(results[0].rows['arrival_delay']) == list(expected['arrival_delay']) == [30]
+    
+    @patch('pipeline.kpi.get_db_connection')
+    @patch('pipeline.kpi.pd.read_sql')
+    def test_postgres_runs_each_query_on_one_connection(self, mock_read_sql, mock_conn):
+        """Test that the Postgres engine times every query on a single connection."""
+        mock_read_sql.return_value = pd.DataFrame({'airline': ['AA']})
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        
+        results = run_kpis('postgres')
+        
+        assert len(results) == 5
+        assert mock_read_sql.call_count == 5
+        mock_engine.connect.assert_called_once()
+    
+    def test_unknown_engine_raises(self):
+        """Test that an unknown engine is rejected."""
+        with pytest.raises(ConfigurationError):
+            run_kpis('sqlite')
+    
+    def test_compare_kpis_ignores_numeric_types(self):
+        """Test that Postgres Decimals compare equal to DuckDB doubles."""
+        postgres = [KpiResult('kpi', 'postgres', 0.1, pd.DataFrame({'avg': [Decimal('12.50')]}))]
+        duck = [KpiResult('kpi', 'duckdb', 0.1, pd.DataFrame({'avg': [12.5]}))]
+        other = [KpiResult('kpi', 'duckdb', 0.1, pd.DataFrame({'avg': [13.0]}))]
+        
+        assert compare_kpis(postgres, duck) == {'kpi': True}
+        assert compare_kpis(postgres, other) == {'kpi': False}
@@ -0,0 +1,146 @@
+"""
+Unit tests for KPI query service module.
+"""
+import pytest
+import pandas as pd
+from unittest.mock import MagicMock, patch
+from pipeline.exceptions import ConfigurationError
+from pipeline.kpi_service import KpiService, ResultCache
+
+
+QUERIES = {'daily_trends': 'SELECT 1', 'worst_performing_routes': 'SELECT 2'}
+
+
+@pytest.fixture
+def mock_db():
+    """Patch the service's engine, data version and query execution."""
+    with patch('pipeline.kpi_service.get_db_connection') as mock_conn, \
+            patch('pipeline.kpi_service.get_data_versions') as mock_versions, \
+            patch('pipeline.kpi_service.pd.read_sql') as mock_read_sql:
+        mock_conn.return_value = MagicMock()
+        mock_versions.return_value = (1,)
+        mock_read_sql.side_effect = lambda *args, **kwargs: pd.DataFrame({'value': [1.5, 2.5]})
+        yield mock_versions, mock_read_sql
+
+
+class TestResultCache:
+    """Test suite for the memory-capped LRU cache."""
+    
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest untouched entry goes first once the cap is hit."""
+        frame = pd.DataFrame({'value': range(10)})
+        size = int(frame.memory_usage(deep=True).sum())
+        cache = ResultCache(max_bytes=2 * size)
+        
+        cache.put('a', frame)
+        cache.put('b', frame)
+        cache.get('a')
+        cache.put('c', frame)
+        
+        assert cache.get('b') is None
+        assert cache.get('a') is frame
+        assert cache.stats()['evictions'] == 1
+        assert cache.stats()['bytes'] == 2 * size
+    
+    def test_skips_results_larger_than_cap(self):
+        """Test that a result bigger than the whole cache is not stored."""
+        cache = ResultCache(max_bytes=10)
+        
+        cache.put('a', pd.DataFrame({'value': range(100)}))
+        
+        assert cache.stats()['entries'] == 0
+
+
+class TestKpiService:
+    """Test suite for cached KPI reads."""
+    
+    def test_repeated_reads_hit_cache(self, mock_db):
+        """Test that a KPI only runs once while the data version is unchanged."""
+        _, mock_read_sql = mock_db
+        service = KpiService(queries=QUERIES, cache_dir=None)
+        
+        first = service.query('daily_trends')
+        second = service.query('daily_trends')
+        
+        assert second is first
+        assert mock_read_sql.call_count == 1
+    
+    def test_parameters_are_part_of_key(self, mock_db):
+        """Test that different bind parameters are cached separately."""
+        _, mock_read_sql = mock_db
+        service = KpiService(queries=QUERIES, cache_dir=None)
+        
+        service.query('daily_trends', {'airline': 'AA'})
+        service.query('daily_trends', {'airline': 'DL'})
+        
+        assert mock_read_sql.call_count == 2
+    
+    def test_new_data_version_reruns_query(self, mock_db):
+        """Test that a published load invalidates cached results."""
+        mock_versions, mock_read_sql = mock_db
+        service = KpiService(queries=QUERIES, cache_dir=None, version_check_seconds=0)
+        
+        service.query('daily_trends')
+        mock_versions.return_value = (2,)
+        service.query('daily_trends')
+        
+        assert mock_read_sql.call_count == 2
+        assert service.cache.stats()['entries'] == 1
+    
+    def test_version_is_trusted_between_checks(self, mock_db):
+        """Test that warm reads do not ask Postgres for the data version."""
+        mock_versions, _ = mock_db
+        service = KpiService(queries=QUERIES, cache_dir=None, version_check_seconds=60)
+        
+        for _ in range(3):
+            service.query('daily_trends')
+        
+        assert mock_versions.call_count == 1
+    
+    def test_local_publish_forces_version_check(self, mock_db):
+        """Test that a load committed in this process is seen on the next read."""
+        mock_versions, _ = mock_db
+        service = KpiService(queries=QUERIES, cache_dir=None, version_check_seconds=60)
+        
+        service.query('daily_trends')
+        service._on_data_version_change('staging')
+        service.query('daily_trends')
+        
+        assert mock_versions.call_count == 2
+    
+    @patch('pipeline.kpi_service.remove_data_version_listener')
+    def test_close_stops_load_notifications(self, mock_remove, mock_db):
+        """Test that closing a service unregisters its listener and drops its results."""
+        service = KpiService(queries=QUERIES, cache_dir=None)
+        service.query('daily_trends')
+        
+        service.close()
+        
+        mock_remove.assert_called_once_with(service._on_data_version_change)
+        assert service.cache.stats()['entries'] == 0
+    
+    def test_results_persist_to_disk(self, mock_db, tmp_path):
+        """Test that a new service instance is served from the persisted results."""
+        _, mock_read_sql = mock_db
+        KpiService(queries=QUERIES, cache_dir=str(tmp_path)).query('daily_trends')
+        
+        rows = KpiService(queries=QUERIES, cache_dir=str(tmp_path)).query('daily_trends')
+        
+        assert list(rows['value']) == [1.5, 2.5]
+        assert mock_read_sql.call_count == 1
+    
+    def test_old_versions_pruned_from_disk(self, mock_db, tmp_path):
+        """Test that persisted results of superseded versions are deleted."""
+        mock_versions, _ = mock_db
+        service = KpiService(queries=QUERIES, cache_dir=str(tmp_path), version_check_seconds=0)
+        service.query('daily_trends')
+        
+        mock_versions.return_value = (2,)
+        service.query('worst_performing_routes')
+        
+        assert len(list(tmp_path.iterdir())) == 1
+    
+    def test_unknown_kpi_raises(self, mock_db):
+        """Test that an unknown KPI name is rejected."""
+        with pytest.raises(ConfigurationError):
+            KpiService(queries=QUERIES, cache_dir=None).query('missing')
@@ -0,0 +1,89 @@
+"""
+Unit tests for the Parquet landing zone module.
+"""
+import pytest
+import pandas as pd
+from unittest.mock import patch
+from pipeline.exceptions import ConfigurationError
+from pipeline.landing import read_flights, write_flights
+from pipeline.transform import dedupe_latest, read_landing_flights
+
+
+def _flights(flight_numbers, dates, arrival_delays):
+    return pd.DataFrame({
+        'flight_date': pd.to_datetime(dates),
+        'airline': 'AA',
+        'flight_number': flight_numbers,
+        'origin': 'JFK',
+        'destination': 'LAX',
+        'scheduled_departure': pd.to_datetime(dates) + pd.Timedelta(hours=10),
+        'departure_delay': arrival_delays,
+        'arrival_delay': arrival_delays,
+        'cancelled': False
+    })
+
+
+class TestLandingZone:
+    """Test suite for writing and reading landed batches."""
+    
+    def test_write_partitions_by_flight_date(self, tmp_path):
+        """Test that each flight_date lands in its own hive partition."""
+        df = _flights(['AA1', 'AA2'], ['2024-01-01', '2024-01-02'], [5, 10])
+        
+        assert write_flights(df, landing_dir=str(tmp_path)) == 2
+        
+        partitions = sorted(p.name for p in (tmp_path / 'flights').iterdir())
+        assert partitions == ['flight_date=2024-01-01', 'flight_date=2024-01-02']
+    
+    def test_read_prunes_dates_and_columns(self, tmp_path):
+        """Test that reads only return the window and requested columns."""
+        df = _flights(['AA1', 'AA2', 'AA3'], ['2024-01-01', '2024-01-02', '2024-01-03'], [5, 10, 15])
+        write_flights(df, landing_dir=str(tmp_path))
+        
+        result = read_flights(
+            columns=['flight_number'], start_date='2024-01-02', end_date='2024-01-02', landing_dir=str(tmp_path)
+        )
+        
+        assert set(result.columns) == {'flight_number', 'flight_date', 'ingested_at'}
+        assert list(result['flight_number']) == ['AA2']
+        assert result['flight_date'].dtype == 'datetime64[ns]'
+    
+    def test_chunks_of_one_batch_are_all_kept(self, tmp_path):
+        """Test that chunks landed under one batch id do not overwrite each other."""
+        for chunk in range(3):
+            numbers = [f'AA{chunk * 1000 + n}' for n in range(1000)]
+            write_flights(
+                _flights(numbers, ['2024-01-01'] * 1000, [5] * 1000), batch_id='batch', landing_dir=str(tmp_path)
+            )
+        
+        assert len(read_flights(landing_dir=str(tmp_path))) == 3000
+    
+    def test_read_empty_landing_dir(self, tmp_path):
+        """Test that reading before anything landed returns no rows."""
+        assert read_flights(landing_dir=str(tmp_path)).empty
+    
+    def test_unconfigured_landing_dir_raises(self):
+        """Test that landing without LANDING_DIR is a configuration error."""
+        with patch('pipeline.landing.get_landing_dir', return_value=None):
+            with pytest.raises(ConfigurationError):
+                write_flights(_flights(['AA1'], ['2024-01-01'], [5]))
+    
+    def test_dedupe_keeps_latest_batch(self, tmp_path):
+        """Test that a re-landed flight replaces the earlier version."""
+        write_flights(_flights(['AA1', 'AA2'], ['2024-01-01', '2024-01-01'], [5, 10]), landing_dir=str(tmp_path))
+        write_flights(_flights(['AA1'], ['2024-01-01'], [45]), landing_dir=str(tmp_path))
+        
+        result = dedupe_latest(read_flights(landing_dir=str(tmp_path))).sort_values('flight_number')
+        
+        assert list(result['flight_number']) == ['AA1', 'AA2']
+        assert list(result['arrival_delay']) == [45, 10]
+    
+    def test_read_landing_flights_splits_rejects(self, tmp_path):
+        """Test that landed rows are validated with the staging reject reasons."""
+        write_flights(_flights(['AA1', 'AA2'], ['2024-01-01', '2024-01-01'], [5, 1500]), landing_dir=str(tmp_path))
+        
+        with patch('pipeline.landing.get_landing_dir', return_value=str(tmp_path)):
+            clean, rejected = read_landing_flights()
+        
+        assert list(clean['flight_number']) == ['AA1']
+        assert list(rejected['reason']) == ['departure_delay_out_of_range']
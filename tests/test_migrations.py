@@ -0,0 +1,59 @@
+"""
+Unit tests for schema migrations.
+"""
+from unittest.mock import MagicMock, patch
+
+from pipeline.migrations import add_raw_natural_key, init_statements
+
+
+class TestRawNaturalKey:
+    """Test suite for the raw.flights natural key migration."""
+    
+    @patch('pipeline.migrations.raw_is_deduplicated')
+    def test_natural_key_index_built_once(self, mock_deduplicated):
+        """Test that raw is only compacted and indexed when the unique key is missing."""
+        engine = MagicMock()
+        conn = engine.begin.return_value.__enter__.return_value
+        
+        mock_deduplicated.return_value = True
+        assert add_raw_natural_key(engine) == 0
+        conn.execute.assert_not_called()
+        
+        mock_deduplicated.return_value = False
+        conn.execute.return_value.rowcount = 12
+        assert add_raw_natural_key(engine) == 12
+        statements = [str(c[0][0]) for c in conn.execute.call_args_list]
+        assert statements[0].startswith('LOCK TABLE raw.flights')
+        assert 'DELETE FROM raw.flights' in statements[1]
+        assert 'NULLS NOT DISTINCT' in statements[2]
+
+
+class TestPartitionFlights:
+    """Test suite for converting heap flight tables to partitioned tables."""
+    
+    def test_init_statements_select_one_table(self, tmp_path):
+        """Test that a table's DDL is taken from init.sql without its neighbours'."""
+        path = tmp_path / 'init.sql'
+        path.write_text(
+            "-- raw.flights; comments may hold semicolons\n"
+            "CREATE TABLE raw.flights (id SERIAL) PARTITION BY RANGE (flight_date);\n"
+            "CREATE TABLE raw.flights_default PARTITION OF raw.flights DEFAULT;\n"
+            "CREATE TABLE raw.flights_ingest (id INTEGER);\n"
+            "CREATE INDEX idx_flights_date ON raw.flights(flight_date);\n"
+            "CREATE INDEX idx_clean_date ON staging.flights_clean(flight_date);\n"
+        )
+        
+        statements = init_statements('raw.flights', path)
+        
+        assert statements == [
+            'CREATE TABLE raw.flights (id SERIAL) PARTITION BY RANGE (flight_date)',
+            'CREATE TABLE raw.flights_default PARTITION OF raw.flights DEFAULT',
+            'CREATE INDEX idx_flights_date ON raw.flights(flight_date)'
+        ]
+    
+    def test_init_sql_defines_partitioned_tables(self):
+        """Test that both migrated tables are found in the shipped init.sql."""
+        for table in ('raw.flights', 'staging.flights_clean'):
+            statements = init_statements(table)
+            assert 'PARTITION BY RANGE (flight_date)' in statements[0]
+            assert any('DEFAULT' in statement for statement in statements)
@@ -0,0 +1,136 @@
+"""
+Unit tests for performance monitoring module.
+"""
+import json
+import time
+import pytest
+from unittest.mock import patch
+from pipeline import monitoring
+from pipeline.config import config
+from pipeline.monitoring import (
+    get_cpu_usage, record_rows, stage_run, track_stage, PerformanceMonitor
+)
+
+
+@pytest.fixture
+def emitted():
+    """Capture emitted stage runs instead of queueing them for the writer."""
+    runs = []
+    with patch('pipeline.monitoring._emit', side_effect=runs.append):
+        yield runs
+
+
+class TestStageRun:
+    """Test suite for stage run records."""
+    
+    def test_records_timings_and_rows(self, emitted):
+        """Test that a stage run measures the block and sums reported rows."""
+        with stage_run('transform'):
+            record_rows(rows_in=100)
+            record_rows(rows_in=50, rows_out=120)
+            time.sleep(0.01)
+        
+        run = emitted[0]
+        assert run.stage == 'transform'
+        assert run.status == 'success'
+        assert run.wall_seconds >= 0.01
+        assert run.cpu_seconds >= 0
+        assert run.peak_rss_mb > 0
+        assert (run.rows_in, run.rows_out) == (150, 120)
+        assert run.rows_per_sec == pytest.approx(120 / run.wall_seconds, rel=1e-3)
+    
+    def test_peak_rss_is_per_stage(self, emitted):
+        """Test that a stage's peak is not an earlier stage's high-water mark."""
+        with stage_run('ingest'):
+            buffer = b'x' * (200 * 1024 * 1024)
+            time.sleep(0.1)
+        del buffer
+        
+        with stage_run('transform'):
+            time.sleep(0.1)
+        
+        ingest, transform = emitted
+        assert ingest.peak_rss_mb > transform.peak_rss_mb + 150
+    
+    def test_failed_stage_is_recorded(self, emitted):
+        """Test that an exception marks the run failed and still propagates."""
+        with pytest.raises(ValueError):
+            with stage_run('ingest'):
+                raise ValueError('bad batch')
+        
+        assert emitted[0].status == 'failed'
+        assert emitted[0].error == 'ValueError: bad batch'
+    
+    def test_track_stage_takes_int_result_as_rows_out(self, emitted):
+        """Test that the decorator uses an int return value but not a bool."""
+        @track_stage('ingest')
+        def load():
+            return 42
+        
+        @track_stage()
+        def check():
+            return True
+        
+        assert load() == 42
+        assert check() is True
+        
+        assert (emitted[0].stage, emitted[0].rows_out) == ('ingest', 42)
+        assert (emitted[1].stage, emitted[1].rows_out) == ('check', None)
+    
+    def test_record_rows_outside_stage_is_ignored(self):
+        """Test that reporting rows with no stage in progress does nothing."""
+        record_rows(rows_in=10)
+    
+    def test_performance_monitor_records_stage(self, emitted):
+        """Test that the legacy context manager also emits a stage run."""
+        with PerformanceMonitor('backfill'):
+            pass
+        
+        assert emitted[0].stage == 'backfill'
+
+
+class TestTelemetryWriter:
+    """Test suite for the background telemetry writer."""
+    
+    def test_writes_jsonl_and_database(self, monkeypatch, tmp_path):
+        """Test that emitted runs reach both sinks off the calling thread."""
+        path = tmp_path / 'stage_runs.jsonl'
+        monkeypatch.setattr(config.pipeline, 'telemetry_enabled', True)
+        monkeypatch.setattr(config.pipeline, 'telemetry_path', str(path))
+        
+        with patch('pipeline.monitoring._write_db') as mock_write_db:
+            with stage_run('aggregate'):
+                record_rows(rows_out=7)
+            assert monitoring.flush_telemetry(timeout=5)
+        
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert records[0]['stage'] == 'aggregate'
+        assert records[0]['rows_out'] == 7
+        assert set(records[0]) == set(monitoring.STAGE_RUN_COLUMNS)
+        assert mock_write_db.call_args[0][0][0]['stage'] == 'aggregate'
+    
+    def test_failing_sink_does_not_raise(self, monkeypatch, tmp_path):
+        """Test that an unreachable database only skips the database copy."""
+        path = tmp_path / 'stage_runs.jsonl'
+        monkeypatch.setattr(config.pipeline, 'telemetry_path', str(path))
+        
+        with patch('pipeline.monitoring._write_db', side_effect=RuntimeError('down')):
+            monitoring._write_batch([{'stage': 'transform'}])
+        
+        assert path.read_text().count('\n') == 1
+    
+    def test_disabled_telemetry_queues_nothing(self):
+        """Test that nothing is queued while telemetry is disabled."""
+        with stage_run('transform'):
+            pass
+        
+        assert monitoring._queue.unfinished_tasks == 0
+
+
+def test_get_cpu_usage_does_not_block():
+    """Test that CPU usage is sampled without waiting for an interval."""
+    start = time.perf_counter()
+    usage = get_cpu_usage()
+    
+    assert time.perf_counter() - start < 0.5
+    assert 0 <= usage <= 100
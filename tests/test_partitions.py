@@ -0,0 +1,139 @@
+"""
+Unit tests for partition management.
+"""
+import pytest
+from datetime import date
+from unittest.mock import MagicMock, patch
+from pipeline.exceptions import ConfigurationError
+from pipeline.partitions import (
+    RETAINED_TABLES, _create_partition, delete_expired_rows, drop_expired_partitions, enforce_retention,
+    ensure_monthly_partitions, list_partitions, partition_name
+)
+
+
+class TestPartitionNames:
+    """Test suite for partition naming."""
+    
+    def test_partition_name_is_monthly(self):
+        """Test that partitions are named after their table and month."""
+        assert partition_name('raw.flights', date(2024, 3, 1)) == 'raw.flights_p2024_03'
+
+
+class TestEnsureMonthlyPartitions:
+    """Test suite for on-demand partition creation."""
+    
+    @patch('pipeline.partitions._create_partition')
+    @patch('pipeline.partitions.list_partitions')
+    def test_creates_only_missing_months(self, mock_list, mock_create):
+        """Test that every month in the range is covered once."""
+        mock_list.return_value = {'raw.flights_p2024_01': date(2024, 1, 1)}
+        conn = MagicMock()
+        
+        created = ensure_monthly_partitions(conn, 'raw.flights', '2024-01-20', '2024-03-02')
+        
+        assert created == ['raw.flights_p2024_02', 'raw.flights_p2024_03']
+        assert [c[0][2] for c in mock_create.call_args_list] == [date(2024, 2, 1), date(2024, 3, 1)]
+    
+    @patch('pipeline.partitions.list_partitions')
+    def test_skips_empty_range(self, mock_list):
+        """Test that a load without dates creates nothing."""
+        assert ensure_monthly_partitions(MagicMock(), 'raw.flights', None, None) == []
+        mock_list.assert_not_called()
+    
+    @patch('pipeline.partitions.is_partitioned', return_value=False)
+    def test_unpartitioned_table_names_migration(self, mock_partitioned):
+        """Test that a heap table from an older deployment is refused with the migration to run."""
+        conn = MagicMock()
+        
+        with pytest.raises(ConfigurationError, match='pipeline.migrations partition_flights'):
+            list_partitions(conn, 'raw.flights')
+        conn.execute.assert_not_called()
+
+
+class TestCreatePartition:
+    """Test suite for creating a partition over rows already in the default."""
+    
+    @patch('pipeline.partitions._insertable_columns')
+    def test_moved_rows_skip_generated_columns(self, mock_columns):
+        """Test that rows moved out of the default partition leave key_hash to Postgres."""
+        mock_columns.return_value = ['id', 'flight_date', 'airline']
+        conn = MagicMock()
+        conn.execute.return_value.scalar.return_value = True
+        
+        _create_partition(conn, 'raw.flights', date(2024, 2, 1))
+        
+        statements = [str(c[0][0]) for c in conn.execute.call_args_list]
+        assert 'PARTITION OF raw.flights' in statements[3]
+        assert statements[4] == (
+            'INSERT INTO raw.flights (id, flight_date, airline) '
+            'SELECT id, flight_date, airline FROM partition_rows'
+        )
+
+
+class TestDropExpiredPartitions:
+    """Test suite for partition-based retention."""
+    
+    @patch('pipeline.partitions.list_partitions')
+    def test_drops_only_fully_expired_months(self, mock_list):
+        """Test that partitions are detached and dropped, never row-deleted."""
+        mock_list.return_value = {
+            'raw.flights_p2024_01': date(2024, 1, 1),
+            'raw.flights_p2024_02': date(2024, 2, 1),
+            'raw.flights_p2024_03': date(2024, 3, 1)
+        }
+        conn = MagicMock()
+        
+        dropped = drop_expired_partitions(conn, 'raw.flights', 30, today=date(2024, 3, 15))
+        
+        assert dropped == ['raw.flights_p2024_01']
+        statements = [str(c[0][0]) for c in conn.execute.call_args_list]
+        assert statements == [
+            'ALTER TABLE raw.flights DETACH PARTITION raw.flights_p2024_01',
+            'DROP TABLE raw.flights_p2024_01'
+        ]
+    
+    def test_derived_rows_expire_at_the_partition_boundary(self):
+        """Test that row deletes drop the same whole months as the partitions."""
+        conn = MagicMock()
+        
+        delete_expired_rows(conn, 'staging.flights_rejected', 30, today=date(2024, 3, 15))
+        
+        statement, params = conn.execute.call_args[0]
+        assert str(statement) == 'DELETE FROM staging.flights_rejected WHERE flight_date < :boundary'
+        assert params == {'boundary': date(2024, 2, 1)}
+    
+    @patch('pipeline.partitions.publish_data_version')
+    @patch('pipeline.aggregate.rebuild_airline_stats')
+    @patch('pipeline.aggregate.remerge_route_performance')
+    @patch('pipeline.partitions.delete_expired_rows', return_value=3)
+    @patch('pipeline.partitions.drop_expired_partitions', return_value=[])
+    @patch('pipeline.partitions.get_db_connection')
+    def test_retention_trims_derived_tables(
+        self, mock_conn, mock_drop, mock_delete, mock_remerge, mock_rebuild, mock_publish
+    ):
+        """Test that default partitions and derived tables are trimmed and the all-time rollups re-merged."""
+        mock_conn.return_value = MagicMock()
+        
+        enforce_retention(retention_days=30)
+        
+        trimmed = [c[0][1] for c in mock_delete.call_args_list]
+        assert trimmed == ['raw.flights_default', 'staging.flights_clean_default'] + RETAINED_TABLES
+        mock_remerge.assert_called_once()
+        mock_rebuild.assert_called_once()
+        assert [c[0][1] for c in mock_publish.call_args_list] == ['staging', 'analytics']
+    
+    @patch('pipeline.partitions.publish_data_version')
+    @patch('pipeline.partitions.delete_expired_rows', return_value=0)
+    @patch('pipeline.partitions.drop_expired_partitions')
+    @patch('pipeline.partitions.get_db_connection')
+    def test_retention_publishes_only_when_something_expired(self, mock_conn, mock_drop, mock_delete, mock_publish):
+        """Test that KPI caches are only invalidated when partitions were dropped."""
+        mock_conn.return_value = MagicMock()
+        mock_drop.return_value = []
+        
+        enforce_retention(retention_days=30)
+        mock_publish.assert_not_called()
+        
+        mock_drop.side_effect = [['raw.flights_p2024_01'], []]
+        enforce_retention(retention_days=30)
+        assert mock_publish.call_count == 2
@@ -2,8 +2,21 @@
 Unit tests for data quality checks.
 """
 import pytest
-from unittest.mock import Mock, patch
-from pipeline.quality_checks import check_null_values, check_duplicate_records
+from datetime import datetime, timedelta
+from unittest.mock import Mock, MagicMock, patch
+from pipeline.config import config
+from pipeline.exceptions import DataQualityError
+from pipeline.quality_checks import (
+    CheckResult, check_null_values, check_duplicate_records,
+    run_checks_concurrently, run_consolidated_checks, run_incremental_checks, run_quality_checks
+)
+
+
+@pytest.fixture(autouse=True)
+def mock_raw_has_duplicates():
+    """Treat raw.flights as an append-only table without a unique natural key."""
+    with patch('pipeline.quality_checks.raw_is_deduplicated', return_value=False) as mock_deduplicated:
+        yield mock_deduplicated
 
 
 class TestQualityChecks:
@@ -12,7 +25,7 @@ class TestQualityChecks:
     @patch('pipeline.quality_checks.get_db_connection')
     def test_check_null_values_pass(self, mock_conn):
         """Test null check passes with clean data."""
-        mock_engine = Mock()
+        mock_engine = MagicMock()
         mock_result = Mock()
         mock_result.fetchone.return_value = (1000, 0, 0, 0, 0)
         mock_engine.connect().__enter__().execute.return_value = mock_result
@@ -24,7 +37,7 @@ class TestQualityChecks:
     @patch('pipeline.quality_checks.get_db_connection')
     def test_check_null_values_fail(self, mock_conn):
         """Test null check fails with null values."""
-        mock_engine = Mock()
+        mock_engine = MagicMock()
         mock_result = Mock()
         mock_result.fetchone.return_value = (1000, 5, 0, 0, 0)
         mock_engine.connect().__enter__().execute.return_value = mock_result
@@ -36,7 +49,7 @@ class TestQualityChecks:
     @patch('pipeline.quality_checks.get_db_connection')
     def test_check_duplicates_pass(self, mock_conn):
         """Test duplicate check passes with no duplicates."""
-        mock_engine = Mock()
+        mock_engine = MagicMock()
         mock_result = Mock()
         mock_result.fetchone.return_value = (0,)
         mock_engine.connect().__enter__().execute.return_value = mock_result
@@ -44,3 +57,169 @@ class TestQualityChecks:
         
         result = check_duplicate_records()
         assert result is True
+    
+    @patch('pipeline.quality_checks.get_db_connection')
+    def test_check_duplicates_skipped_with_unique_key(self, mock_conn, mock_raw_has_duplicates):
+        """Test that a unique natural key on raw.flights makes the duplicate scan unnecessary."""
+        mock_raw_has_duplicates.return_value = True
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        
+        assert check_duplicate_records() is True
+        mock_engine.connect.return_value.__enter__.return_value.execute.assert_not_called()
+
+
+class TestCheckRunners:
+    """Test suite for the consolidated and concurrent check runners."""
+    
+    @patch('pipeline.quality_checks.get_db_connection')
+    def test_consolidated_checks_use_one_scan(self, mock_conn):
+        """Test that every check is answered from a single query."""
+        mock_engine = MagicMock()
+        conn = mock_engine.connect.return_value.__enter__.return_value
+        conn.execute.return_value.fetchone.return_value = (1000, 0, 0, 0, 0, 0, datetime.now())
+        mock_conn.return_value = mock_engine
+        
+        results = run_consolidated_checks()
+        
+        conn.execute.assert_called_once()
+        assert [result.name for result in results] == ['null_values', 'duplicate_records', 'data_freshness']
+        assert all(result.passed for result in results)
+        assert results[0].details['total_records'] == 1000
+    
+    @patch('pipeline.quality_checks.get_db_connection')
+    def test_consolidated_checks_report_failures(self, mock_conn):
+        """Test that duplicate groups and stale data fail their checks."""
+        mock_engine = MagicMock()
+        conn = mock_engine.connect.return_value.__enter__.return_value
+        conn.execute.return_value.fetchone.return_value = (
+            1000, 0, 0, 0, 0, 3, datetime.now() - timedelta(hours=48)
+        )
+        mock_conn.return_value = mock_engine
+        
+        results = {result.name: result for result in run_consolidated_checks()}
+        
+        assert results['null_values'].passed is True
+        assert results['duplicate_records'].passed is False
+        assert results['duplicate_records'].details['duplicate_count'] == 3
+        assert results['data_freshness'].passed is False
+    
+    @patch('pipeline.quality_checks.get_db_connection')
+    def test_consolidated_checks_skip_grouping_with_unique_key(self, mock_conn, mock_raw_has_duplicates):
+        """Test that a deduplicated raw.flights is checked without grouping on the natural key."""
+        mock_raw_has_duplicates.return_value = True
+        mock_engine = MagicMock()
+        conn = mock_engine.connect.return_value.__enter__.return_value
+        conn.execute.return_value.fetchone.return_value = (1000, 0, 0, 0, 0, 0, datetime.now())
+        mock_conn.return_value = mock_engine
+        
+        results = run_consolidated_checks()
+        
+        assert 'GROUP BY' not in str(conn.execute.call_args[0][0])
+        assert all(result.passed for result in results)
+    
+    def test_concurrent_checks_return_timed_results(self):
+        """Test that concurrent checks keep their order and are timed."""
+        checks = {'first': lambda: True, 'second': lambda: False}
+        
+        results = run_checks_concurrently(checks)
+        
+        assert [result.name for result in results] == ['first', 'second']
+        assert [result.passed for result in results] == [True, False]
+        assert all(isinstance(result, CheckResult) and result.seconds >= 0 for result in results)
+    
+    @patch('pipeline.quality_checks.run_consolidated_checks')
+    def test_run_quality_checks_strategy(self, mock_consolidated):
+        """Test that the strategy picks the runner and results are combined."""
+        mock_consolidated.return_value = [
+            CheckResult('null_values', True, 0.1),
+            CheckResult('duplicate_records', False, 0.1)
+        ]
+        
+        assert run_quality_checks(strategy='consolidated') is False
+        
+        with pytest.raises(DataQualityError):
+            run_quality_checks(strategy='sideways')
+
+
+class TestIncrementalChecks:
+    """Test suite for the quality gate over the newly loaded batch."""
+    
+    @patch('pipeline.quality_checks._get_max_raw_id')
+    @patch('pipeline.quality_checks.get_watermark')
+    @patch('pipeline.quality_checks.get_db_connection')
+    def test_only_batch_past_watermark_is_scanned(self, mock_conn, mock_watermark, mock_max_id):
+        """Test that the checks are bounded to raw ids the next transform will read."""
+        mock_engine = MagicMock()
+        conn = mock_engine.connect.return_value.__enter__.return_value
+        conn.execute.return_value.fetchone.side_effect = [(100, 0), (100, 0, 0, 0, 0, 0, datetime.now())]
+        mock_conn.return_value = mock_engine
+        mock_watermark.return_value = 900
+        mock_max_id.return_value = 1000
+        
+        results = run_incremental_checks()
+        
+        for call in conn.execute.call_args_list:
+            query, params = call[0]
+            assert 'WHERE id > :last_id AND id <= :max_id' in str(query)
+            assert params == {'last_id': 900, 'max_id': 1000}
+        assert all(result.passed for result in results)
+    
+    @patch('pipeline.quality_checks.run_consolidated_checks')
+    @patch('pipeline.quality_checks._get_max_raw_id')
+    @patch('pipeline.quality_checks.get_watermark')
+    @patch('pipeline.quality_checks.get_db_connection')
+    def test_empty_batch_blocks(self, mock_conn, mock_watermark, mock_max_id, mock_consolidated):
+        """Test that the gate fails without scanning when nothing new was loaded."""
+        mock_conn.return_value = MagicMock()
+        mock_watermark.return_value = 1000
+        mock_max_id.return_value = 1000
+        
+        assert run_quality_checks(strategy='incremental') is False
+        mock_consolidated.assert_not_called()
+    
+    @patch('pipeline.quality_checks.run_incremental_checks')
+    def test_failed_batch_fails_gate(self, mock_incremental):
+        """Test that a failing blocking check makes the gate return False."""
+        mock_incremental.return_value = [CheckResult('reject_ratio', False, 0.01)]
+        
+        assert run_quality_checks(strategy='incremental') is False
+    
+    @pytest.mark.parametrize('rejected, passes', [(5, True), (6, False)])
+    @patch('pipeline.quality_checks.run_consolidated_checks', return_value=[])
+    @patch('pipeline.quality_checks._get_max_raw_id')
+    @patch('pipeline.quality_checks.get_watermark')
+    @patch('pipeline.quality_checks.get_db_connection')
+    def test_reject_ratio_limit(self, mock_conn, mock_watermark, mock_max_id, mock_consolidated,
+                                monkeypatch, rejected, passes):
+        """Test that the gate blocks once the batch's reject ratio exceeds the configured limit."""
+        mock_engine = MagicMock()
+        conn = mock_engine.connect.return_value.__enter__.return_value
+        conn.execute.return_value.fetchone.return_value = (100, rejected)
+        mock_conn.return_value = mock_engine
+        mock_watermark.return_value = 900
+        mock_max_id.return_value = 1000
+        monkeypatch.setattr(config.pipeline, 'max_reject_ratio', 0.05)
+        
+        assert run_quality_checks(strategy='incremental') is passes
+    
+    @patch('pipeline.quality_checks.run_consolidated_checks')
+    @patch('pipeline.quality_checks._get_max_raw_id')
+    @patch('pipeline.quality_checks.get_watermark')
+    @patch('pipeline.quality_checks.get_db_connection')
+    def test_consolidated_checks_do_not_block(self, mock_conn, mock_watermark, mock_max_id, mock_consolidated):
+        """Test that null, duplicate and stale batches are reported without holding back the batch."""
+        mock_engine = MagicMock()
+        conn = mock_engine.connect.return_value.__enter__.return_value
+        conn.execute.return_value.fetchone.return_value = (100, 0)
+        mock_conn.return_value = mock_engine
+        mock_watermark.return_value = 900
+        mock_max_id.return_value = 1000
+        mock_consolidated.return_value = [
+            CheckResult('null_values', False, 0.01),
+            CheckResult('duplicate_records', False, 0.01),
+            CheckResult('data_freshness', False, 0.01)
+        ]
+        
+        assert run_quality_checks(strategy='incremental') is True
+        assert not any(result.blocking for result in mock_consolidated.return_value)
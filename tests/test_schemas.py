@@ -3,8 +3,10 @@ Unit tests for validation schemas.
 """
 import pytest
 from datetime import datetime, date
+import pandas as pd
 from pydantic import ValidationError
-from pipeline.schemas import FlightRecord
+from pipeline.ingest import generate_sample_data
+from pipeline.schemas import FlightRecord, validate_flights
 
 
 class TestFlightRecord:
@@ -122,3 +124,74 @@ class TestFlightRecord:
         
         assert record.actual_departure is None
         assert record.departure_delay is None
+
+
+def _corrupted_sample():
+    """Sample flights with one broken rule (or none) per row."""
+    df = generate_sample_data(num_records=40, seed=7)
+    df.loc[1, 'origin'] = 'jfk'
+    df.loc[2, 'destination'] = df.loc[2, 'origin']
+    df.loc[3, 'departure_delay'] = 1441
+    df.loc[4, 'arrival_delay'] = -61
+    df.loc[5, 'distance'] = 0
+    df.loc[6, 'airline'] = 'A'
+    df.loc[7, 'airline'] = None
+    df.loc[8, 'flight_number'] = 'X' * 21
+    df.loc[9, 'scheduled_arrival'] = pd.NaT
+    df.loc[10, 'origin'] = 'JF'
+    df.loc[11, 'destination'] = '123'
+    df.loc[12, 'cancellation_reason'] = 'R' * 51
+    df.loc[13, 'departure_delay'] = 1440
+    df.loc[14, 'arrival_delay'] = -60
+    df.loc[15, 'origin'] = 'J1K'
+    return df
+
+
+class TestValidateFlights:
+    """Test suite for the columnar FlightRecord validator."""
+    
+    def test_matches_flight_record(self):
+        """Test that the columnar and per-row validators accept the same rows."""
+        df = _corrupted_sample()
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+        
+        expected = []
+        for record in records:
+            try:
+                FlightRecord(**record)
+                expected.append(True)
+            except ValidationError:
+                expected.append(False)
+        
+        report = validate_flights(df)
+        
+        assert list(report.valid) == expected
+        assert report.reject_count == 12
+    
+    def test_reject_report_reasons(self):
+        """Test that rejects carry the row index and rule broken."""
+        df = _corrupted_sample()
+        
+        report = validate_flights(df)
+        rejects = set(zip(report.rejects['row'], report.rejects['reason']))
+        
+        assert (1, 'origin_not_uppercase') in rejects
+        assert (2, 'same_origin_destination') in rejects
+        assert (3, 'departure_delay_out_of_range') in rejects
+        assert (5, 'distance_not_positive') in rejects
+        assert (7, 'missing_airline') in rejects
+        assert (9, 'missing_scheduled_arrival') in rejects
+        assert report.reason_counts()['airline_length'] == 1
+    
+    def test_accepts_arrow_like_batches(self):
+        """Test that objects exposing to_pandas() are validated as frames."""
+        df = generate_sample_data(num_records=10, seed=1)
+        
+        class Batch:
+            def to_pandas(self):
+                return df
+        
+        report = validate_flights(Batch())
+        
+        assert report.valid_count == 10
+        assert report.rejects.empty
@@ -0,0 +1,106 @@
+"""
+Unit tests for delay sketch module.
+"""
+import pytest
+import numpy as np
+import pandas as pd
+from unittest.mock import MagicMock, patch
+from pipeline.exceptions import DataTransformationError
+from pipeline.sketches import (
+    BUCKET_WIDTH, ERROR_BOUND_MINUTES, build_histograms, delay_quantiles, quantiles_from_histogram
+)
+
+
+def _histogram(delays):
+    """Bucket counts for a list of delays, as build_histograms computes them."""
+    df = pd.DataFrame({
+        'flight_date': pd.Timestamp('2024-01-01'),
+        'airline': 'AA',
+        'origin': 'JFK',
+        'destination': 'LAX',
+        'arrival_delay': delays,
+        'cancelled': False
+    })
+    histogram = build_histograms(df)['airline']
+    return histogram['delay_bucket'], histogram['flights']
+
+
+class TestQuantilesFromHistogram:
+    """Test suite for quantile estimation from delay buckets."""
+    
+    @pytest.mark.parametrize('seed', range(5))
+    def test_error_within_documented_bound(self, seed):
+        """Test that estimates stay within ERROR_BOUND_MINUTES of PERCENTILE_CONT."""
+        rng = np.random.default_rng(seed)
+        delays = np.clip(rng.gamma(1.5, 25, size=5000).astype(int) - 20, -60, 1440)
+        quantiles = (0.01, 0.25, 0.5, 0.9, 0.99, 1.0)
+        
+        estimates = quantiles_from_histogram(*_histogram(delays), quantiles)
+        
+        exact = np.quantile(delays, quantiles)  # linear interpolation, as PERCENTILE_CONT
+        assert np.all(np.abs(np.array(estimates) - exact) <= ERROR_BOUND_MINUTES)
+    
+    def test_merged_histograms_match_histogram_of_union(self):
+        """Test that summing two days' buckets gives the same quantiles as one histogram."""
+        first, second = [0, 3, 12, 40], [7, 7, 95, -10, 1440]
+        buckets_a, counts_a = _histogram(first)
+        buckets_b, counts_b = _histogram(second)
+        merged = pd.concat([
+            pd.DataFrame({'bucket': buckets_a, 'flights': counts_a}),
+            pd.DataFrame({'bucket': buckets_b, 'flights': counts_b})
+        ]).groupby('bucket')['flights'].sum()
+        
+        assert quantiles_from_histogram(merged.index, merged.values) == \
+            quantiles_from_histogram(*_histogram(first + second))
+    
+    def test_estimates_stay_inside_delay_range(self):
+        """Test that the last bucket is clamped to the maximum valid delay."""
+        delays = [1440] * 10
+        
+        assert quantiles_from_histogram(*_histogram(delays), (0.5, 1.0)) == [1440.0, 1440.0]
+    
+    def test_empty_histogram(self):
+        """Test that no flights gives no quantiles."""
+        assert quantiles_from_histogram([], [], (0.5, 0.9)) == [None, None]
+    
+    def test_cancelled_and_null_delays_excluded(self):
+        """Test that only flown flights with an arrival delay are bucketed."""
+        df = pd.DataFrame({
+            'flight_date': pd.Timestamp('2024-01-01'),
+            'airline': ['AA', 'AA', 'AA'],
+            'origin': 'JFK',
+            'destination': 'LAX',
+            'arrival_delay': pd.array([10, None, 99], dtype='Int64'),
+            'cancelled': [False, False, True]
+        })
+        
+        histogram = build_histograms(df)['route']
+        
+        assert list(histogram['delay_bucket']) == [(10 + 60) // BUCKET_WIDTH]
+        assert list(histogram['flights']) == [1]
+
+
+class TestDelayQuantiles:
+    """Test suite for reading quantiles from stored histograms."""
+    
+    @patch('pipeline.sketches.get_db_connection')
+    @patch('pipeline.sketches.pd.read_sql')
+    def test_quantiles_per_group(self, mock_read_sql, mock_conn):
+        """Test that merged buckets are turned into one row of quantiles per group."""
+        mock_read_sql.return_value = pd.DataFrame({
+            'airline': ['AA', 'AA', 'DL'],
+            'delay_bucket': [12, 14, 12],
+            'flights': [1, 1, 3]
+        })
+        mock_conn.return_value = MagicMock()
+        
+        result = delay_quantiles('airline', '2024-01-01', '2024-01-31', quantiles=(0.5, 0.999))
+        
+        assert list(result.columns) == ['airline', 'flights', 'p50', 'p99_9']
+        assert list(result['flights']) == [2, 3]
+        assert mock_read_sql.call_args[1]['params'] == {'start_date': '2024-01-01', 'end_date': '2024-01-31'}
+    
+    def test_unknown_sketch_raises(self):
+        """Test that an unknown grouping is rejected."""
+        with pytest.raises(DataTransformationError):
+            delay_quantiles('airport')
@@ -1,18 +1,40 @@
 """
 Unit tests for transformation module.
 """
+import re
 import pytest
+from datetime import date
 from unittest.mock import Mock, patch, MagicMock
 import pandas as pd
-from pipeline.transform import clean_data
+from pipeline.migrations import init_statements
+from pipeline.transform import (
+    _dedupe_query, _reject_reasons, clean_data, clean_data_in_database, clean_data_partition, get_reject_counts,
+    merge_transform_results, plan_transform_partitions, reset_reject_counts
+)
+
+
+@pytest.fixture(autouse=True)
+def mock_staging_partitions():
+    """Skip partition DDL; the mocked connections have no catalog to read."""
+    with patch('pipeline.transform._prepare_staging_partitions') as mock_partitions:
+        mock_partitions.return_value = ('2024-01-01', '2024-01-31')
+        yield mock_partitions
+
+
+@pytest.fixture(autouse=True)
+def mock_raw_has_duplicates():
+    """Treat raw.flights as an append-only table without a unique natural key."""
+    with patch('pipeline.transform.raw_is_deduplicated', return_value=False) as mock_deduplicated:
+        yield mock_deduplicated
 
 
 class TestCleanData:
     """Test suite for data cleaning and transformation."""
     
+    @patch('pipeline.transform.copy_to_table')
     @patch('pipeline.transform.get_db_connection')
     @patch('pipeline.transform.pd.read_sql')
-    def test_clean_data_removes_nulls(self, mock_read_sql, mock_conn):
+    def test_clean_data_removes_nulls(self, mock_read_sql, mock_conn, mock_copy):
         """Test that records with null critical fields are removed."""
         # Create test data with nulls
         test_data = pd.DataFrame({
@@ -26,7 +48,7 @@ class TestCleanData:
         })
         
         mock_read_sql.return_value = test_data
-        mock_engine = Mock()
+        mock_engine = MagicMock()
         mock_conn.return_value = mock_engine
         
         # Should remove the record with null flight_date
@@ -35,9 +57,10 @@ class TestCleanData:
         # Verify truncate was called
         mock_engine.connect().__enter__().execute.assert_called()
     
+    @patch('pipeline.transform.copy_to_table')
     @patch('pipeline.transform.get_db_connection')
     @patch('pipeline.transform.pd.read_sql')
-    def test_clean_data_removes_invalid_delays(self, mock_read_sql, mock_conn):
+    def test_clean_data_removes_invalid_delays(self, mock_read_sql, mock_conn, mock_copy):
         """Test that records with invalid delays are removed."""
         test_data = pd.DataFrame({
             'flight_date': ['2024-01-01', '2024-01-02', '2024-01-03'],
@@ -50,7 +73,7 @@ class TestCleanData:
         })
         
         mock_read_sql.return_value = test_data
-        mock_engine = Mock()
+        mock_engine = MagicMock()
         mock_conn.return_value = mock_engine
         
         clean_data()
@@ -58,9 +81,10 @@ class TestCleanData:
         # Verify the function ran
         assert mock_read_sql.called
     
+    @patch('pipeline.transform.copy_to_table')
     @patch('pipeline.transform.get_db_connection')
     @patch('pipeline.transform.pd.read_sql')
-    def test_clean_data_deduplicates(self, mock_read_sql, mock_conn):
+    def test_clean_data_deduplicates(self, mock_read_sql, mock_conn, mock_copy):
         """Test that duplicate records are removed."""
         # The SQL query itself handles deduplication with DISTINCT ON
         test_data = pd.DataFrame({
@@ -81,16 +105,17 @@ class TestCleanData:
         })
         
         mock_read_sql.return_value = test_data
-        mock_engine = Mock()
+        mock_engine = MagicMock()
         mock_conn.return_value = mock_engine
         
         result = clean_data()
         
         assert result == 1
     
+    @patch('pipeline.transform.copy_to_table')
     @patch('pipeline.transform.get_db_connection')
     @patch('pipeline.transform.pd.read_sql')
-    def test_clean_data_truncates_staging(self, mock_read_sql, mock_conn):
+    def test_clean_data_truncates_staging(self, mock_read_sql, mock_conn, mock_copy):
         """Test that staging table is truncated before loading."""
         test_data = pd.DataFrame({
             'flight_date': ['2024-01-01'],
@@ -103,10 +128,415 @@ class TestCleanData:
         })
         
         mock_read_sql.return_value = test_data
-        mock_engine = Mock()
+        mock_engine = MagicMock()
         mock_conn.return_value = mock_engine
         
         clean_data()
         
-        # Verify execute was called (for truncate)
-        assert mock_engine.connect().__enter__().execute.called
+        # Truncate and reload commit together
+        conn = mock_engine.begin.return_value.__enter__.return_value
+        assert 'TRUNCATE TABLE staging.flights_clean' in str(conn.execute.call_args_list[0][0][0])
+        assert mock_copy.call_args[0][0] is conn.connection.cursor.return_value
+    
+    @patch('pipeline.transform.copy_to_table')
+    @patch('pipeline.transform.get_db_connection')
+    @patch('pipeline.transform.pd.read_sql')
+    def test_clean_data_copies_valid_rows_to_staging(self, mock_read_sql, mock_conn, mock_copy):
+        """Test that only valid rows are bulk loaded into staging.flights_clean."""
+        test_data = pd.DataFrame({
+            'flight_date': ['2024-01-01', '2024-01-02', '2024-01-03'],
+            'airline': ['AA', 'DL', 'UA'],
+            'origin': ['JFK', 'ATL', 'ORD'],
+            'destination': ['LAX', 'SFO', 'DEN'],
+            'departure_delay': [10, 2000, None],
+            'arrival_delay': [15, 25, None],
+            'cancelled': [False, False, True]
+        })
+        
+        mock_read_sql.return_value = test_data
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        
+        result = clean_data()
+        
+        assert result == 2
+        loaded_df = mock_copy.call_args[0][1]
+        assert list(loaded_df['airline']) == ['AA', 'UA']
+        assert mock_copy.call_args[0][2] == 'staging.flights_clean'
+
+
+class TestCleanDataIncremental:
+    """Test suite for watermark-based incremental transformation."""
+    
+    def test_clean_data_rejects_unknown_mode(self):
+        """Test that an unknown mode is refused."""
+        from pipeline.exceptions import DataTransformationError
+        
+        with pytest.raises(DataTransformationError):
+            clean_data(mode='sideways')
+    
+    @patch('pipeline.transform.pd.read_sql')
+    @patch('pipeline.transform._get_max_raw_id')
+    @patch('pipeline.transform.get_watermark')
+    @patch('pipeline.transform.get_db_connection')
+    def test_incremental_noop_without_new_rows(self, mock_conn, mock_watermark, mock_max_id, mock_read_sql):
+        """Test that nothing is read when raw has not grown past the watermark."""
+        mock_conn.return_value = MagicMock()
+        mock_watermark.return_value = 500
+        mock_max_id.return_value = 500
+        
+        result = clean_data(mode='incremental')
+        
+        assert result == 0
+        mock_read_sql.assert_not_called()
+    
+    @patch('pipeline.transform.set_watermark')
+    @patch('pipeline.transform.copy_to_table')
+    @patch('pipeline.transform.pd.read_sql')
+    @patch('pipeline.transform._get_max_raw_id')
+    @patch('pipeline.transform.get_watermark')
+    @patch('pipeline.transform.get_db_connection')
+    def test_incremental_upserts_delta_and_advances_watermark(
+        self, mock_conn, mock_watermark, mock_max_id, mock_read_sql, mock_copy, mock_set_watermark,
+        mock_staging_partitions
+    ):
+        """Test that only the delta is read, staged with validity flags and committed with the watermark."""
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        connection = mock_engine.begin.return_value.__enter__.return_value
+        connection.execute.return_value.rowcount = 1
+        mock_watermark.return_value = 100
+        mock_max_id.return_value = 150
+        mock_read_sql.return_value = pd.DataFrame({
+            'flight_date': ['2024-01-01', '2024-01-02'],
+            'airline': ['AA', 'DL'],
+            'flight_number': ['AA1', 'DL2'],
+            'origin': ['JFK', 'ATL'],
+            'destination': ['LAX', 'SFO'],
+            'scheduled_departure': ['2024-01-01 10:00:00', '2024-01-02 10:00:00'],
+            'actual_departure': [None, None],
+            'scheduled_arrival': [None, None],
+            'actual_arrival': [None, None],
+            'departure_delay': [10, 2000],
+            'arrival_delay': [15, 25],
+            'cancelled': [False, False],
+            'cancellation_reason': [None, None],
+            'distance': [2475, 2139]
+        })
+        
+        result = clean_data(mode='incremental')
+        
+        assert result == 1
+        assert mock_read_sql.call_args[1]['params'] == {
+            'last_id': 100, 'max_id': 150, 'min_date': '2024-01-01', 'max_date': '2024-01-31'
+        }
+        assert 'id > :last_id' in str(mock_read_sql.call_args[0][0])
+        mock_staging_partitions.assert_called_once_with(connection, 100, 150)
+        staged = mock_copy.call_args[0][1]
+        assert list(staged['is_valid']) == [True, False]
+        mock_set_watermark.assert_called_once_with(connection, 'transform.flights_clean', 150)
+    
+    @patch('pipeline.transform.set_watermark')
+    @patch('pipeline.transform.copy_to_table')
+    @patch('pipeline.transform.pd.read_sql')
+    @patch('pipeline.transform._get_max_raw_id')
+    @patch('pipeline.transform.get_watermark')
+    @patch('pipeline.transform.get_db_connection')
+    def test_incremental_removes_invalid_null_keys(
+        self, mock_conn, mock_watermark, mock_max_id, mock_read_sql, mock_copy, mock_set_watermark
+    ):
+        """Test that a staged flight with a NULL key column is removed when its new version is invalid."""
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        connection = mock_engine.begin.return_value.__enter__.return_value
+        mock_watermark.return_value = 100
+        mock_max_id.return_value = 101
+        mock_read_sql.return_value = pd.DataFrame({
+            'flight_date': ['2024-01-01'], 'airline': ['AA'], 'flight_number': [None],
+            'origin': ['JFK'], 'destination': ['LAX'], 'scheduled_departure': [None],
+            'departure_delay': [2000], 'arrival_delay': [15]
+        })
+        
+        clean_data(mode='incremental')
+        
+        delete = next(
+            str(c[0][0]) for c in connection.execute.call_args_list if 'DELETE FROM staging.flights_clean' in str(c[0][0])
+        )
+        assert 's.airline = d.airline' in delete
+        assert 's.flight_number IS NOT DISTINCT FROM d.flight_number' in delete
+        assert 's.scheduled_departure IS NOT DISTINCT FROM d.scheduled_departure' in delete
+        assert list(mock_copy.call_args[0][1]['is_valid']) == [False]
+    
+    
+    @patch('pipeline.transform.publish_data_version')
+    @patch('pipeline.transform.clean_data_incremental', return_value=0)
+    @patch('pipeline.transform.get_watermark')
+    @patch('pipeline.transform.get_db_connection')
+    def test_incremental_publishes_when_only_rejects_or_deletes(
+        self, mock_conn, mock_watermark, mock_incremental, mock_publish
+    ):
+        """Test that a delta that loaded nothing still publishes a new staging version."""
+        mock_conn.return_value = MagicMock()
+        
+        mock_watermark.side_effect = [100, 150]
+        clean_data(mode='incremental')
+        mock_publish.assert_called_once_with(mock_conn.return_value, 'staging')
+        
+        mock_publish.reset_mock()
+        mock_watermark.side_effect = [150, 150]
+        clean_data(mode='incremental')
+        mock_publish.assert_not_called()
+
+
+class TestCleanDataInDatabase:
+    """Test suite for the server-side INSERT ... SELECT transform."""
+    
+    @patch('pipeline.transform.set_watermark')
+    @patch('pipeline.transform._get_max_raw_id')
+    @patch('pipeline.transform.pd.read_sql')
+    @patch('pipeline.transform.get_db_connection')
+    def test_full_pushdown_runs_single_statement(self, mock_conn, mock_read_sql, mock_max_id, mock_set_watermark):
+        """Test that full mode truncates and loads with one INSERT ... SELECT."""
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        connection = mock_engine.begin.return_value.__enter__.return_value
+        connection.execute.return_value.fetchone.return_value = (95, 5, {'arrival_delay_out_of_range': 5})
+        mock_max_id.return_value = 100
+        
+        result = clean_data_in_database('full')
+        
+        assert result == {'accepted': 95, 'rejected': 5, 'reasons': {'arrival_delay_out_of_range': 5}}
+        mock_read_sql.assert_not_called()
+        statements = [str(c[0][0]) for c in connection.execute.call_args_list]
+        assert 'TRUNCATE TABLE staging.flights_clean' in statements[0]
+        assert 'INSERT INTO staging.flights_clean' in statements[1]
+        assert 'DISTINCT ON (key_hash, flight_date' in statements[1]
+        assert 'ORDER BY key_hash, flight_date' in statements[1]
+        assert 'RETURNING 1' in statements[1]
+        assert 'DELETE FROM' not in statements[1]
+        assert 'INSERT INTO staging.flights_rejected' in statements[1]
+        mock_set_watermark.assert_called_once_with(connection, 'transform.flights_clean', 100)
+    
+    @patch('pipeline.transform.set_watermark')
+    @patch('pipeline.transform._get_max_raw_id')
+    @patch('pipeline.transform.get_watermark')
+    @patch('pipeline.transform.get_db_connection')
+    def test_incremental_pushdown_removes_invalid_keys(self, mock_conn, mock_watermark, mock_max_id, mock_set_watermark):
+        """Test that incremental pushdown upserts the delta without truncating."""
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        connection = mock_engine.begin.return_value.__enter__.return_value
+        connection.execute.return_value.fetchone.return_value = (10, 1, {'missing_airline': 1})
+        mock_watermark.return_value = 40
+        mock_max_id.return_value = 51
+        
+        result = clean_data(mode='incremental', pushdown=True)
+        
+        assert result == 10
+        statement, params = connection.execute.call_args_list[0][0]
+        assert 'TRUNCATE' not in str(statement)
+        assert 'ON CONFLICT' in str(statement)
+        assert 'DELETE FROM staging.flights_clean' in str(statement)
+        assert params == {'last_id': 40, 'max_id': 51, 'min_date': '2024-01-01', 'max_date': '2024-01-31'}
+        assert 'flight_date BETWEEN :min_date AND :max_date' in str(statement)
+    
+    @patch('pipeline.transform.set_watermark')
+    @patch('pipeline.transform._get_max_raw_id')
+    @patch('pipeline.transform.get_watermark')
+    @patch('pipeline.transform.get_db_connection')
+    def test_incremental_pushdown_removes_invalid_null_keys(
+        self, mock_conn, mock_watermark, mock_max_id, mock_set_watermark
+    ):
+        """Test that a staged flight with a NULL key column is matched when its new version is invalid."""
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        connection = mock_engine.begin.return_value.__enter__.return_value
+        connection.execute.return_value.fetchone.return_value = (0, 1, {'departure_delay_out_of_range': 1})
+        mock_watermark.return_value = 40
+        mock_max_id.return_value = 41
+        
+        clean_data(mode='incremental', pushdown=True)
+        
+        statement = str(connection.execute.call_args_list[0][0][0])
+        removed = statement[statement.index('removed AS'):statement.index('accepted AS')]
+        assert 's.airline = l.airline' in removed
+        assert 's.flight_number IS NOT DISTINCT FROM l.flight_number' in removed
+        assert 's.scheduled_departure IS NOT DISTINCT FROM l.scheduled_departure' in removed
+
+
+def test_dedupe_order_matches_key_hash_index():
+    """Test that idx_flights_key_hash lists the dedupe ORDER BY column for column, so no sort is needed."""
+    index = next(s for s in init_statements('raw.flights') if 'idx_flights_key_hash' in s)
+    index_columns = re.search(r'\((.*)\)', index, re.S).group(1)
+    order_by = _dedupe_query().split('ORDER BY')[1]
+    
+    assert index_columns.split() == order_by.split()
+
+
+class TestRejects:
+    """Test suite for reject reason accounting."""
+    
+    def test_reject_reasons_report_first_broken_rule(self):
+        """Test that each invalid row gets the code of the first rule it breaks."""
+        df = pd.DataFrame({
+            'flight_date': ['2024-01-01', None, '2024-01-03', '2024-01-04'],
+            'airline': ['AA', None, 'UA', 'DL'],
+            'origin': ['JFK', 'ATL', 'ORD', 'SEA'],
+            'destination': ['LAX', 'SFO', 'DEN', 'BOS'],
+            'departure_delay': [10, 20, 2000, 5],
+            'arrival_delay': [15, 25, -90, None]
+        })
+        
+        reasons = _reject_reasons(df)
+        
+        assert list(reasons) == [None, 'missing_flight_date', 'departure_delay_out_of_range', None]
+    
+    @patch('pipeline.transform.copy_to_table')
+    @patch('pipeline.transform.get_db_connection')
+    @patch('pipeline.transform.pd.read_sql')
+    def test_full_transform_quarantines_rejects(self, mock_read_sql, mock_conn, mock_copy):
+        """Test that rejects are bulk loaded with reasons and counted."""
+        mock_read_sql.return_value = pd.DataFrame({
+            'raw_id': [1, 2, 3],
+            'flight_date': ['2024-01-01', None, '2024-01-03'],
+            'airline': ['AA', 'DL', 'UA'],
+            'origin': ['JFK', 'ATL', 'ORD'],
+            'destination': ['LAX', 'SFO', 'DEN'],
+            'departure_delay': [10, 20, 30],
+            'arrival_delay': [15, 25, 1500],
+            'cancelled': [False, False, False]
+        })
+        mock_conn.return_value = MagicMock()
+        reset_reject_counts()
+        
+        assert clean_data() == 1
+        
+        rejected_df = mock_copy.call_args_list[0][0][1]
+        assert mock_copy.call_args_list[0][0][2] == 'staging.flights_rejected'
+        assert list(rejected_df['raw_id']) == [2, 3]
+        assert list(rejected_df['reason']) == ['missing_flight_date', 'arrival_delay_out_of_range']
+        assert 'raw_id' not in mock_copy.call_args_list[1][0][1]
+        assert get_reject_counts() == {'missing_flight_date': 1, 'arrival_delay_out_of_range': 1}
+
+
+class TestCleanDataFromLanding:
+    """Test suite for rebuilding staging from the landing zone."""
+    
+    @patch('pipeline.transform.ensure_monthly_partitions')
+    @patch('pipeline.transform.copy_to_table')
+    @patch('pipeline.transform.get_db_connection')
+    @patch('pipeline.transform.read_landing_flights')
+    def test_landing_mode_replaces_window(self, mock_read, mock_conn, mock_copy, mock_partitions):
+        """Test that landing mode swaps only the window and loads rejects then clean rows."""
+        clean = pd.DataFrame({'flight_date': pd.to_datetime(['2024-01-02']), 'airline': ['AA']})
+        rejected = pd.DataFrame({'flight_date': pd.to_datetime(['2024-01-02']), 'reason': ['missing_airline']})
+        mock_read.return_value = (clean, rejected)
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        conn = mock_engine.begin.return_value.__enter__.return_value
+        
+        assert clean_data('landing', start_date='2024-01-01', end_date='2024-01-03') == 1
+        
+        statements = [str(call[0][0]) for call in conn.execute.call_args_list]
+        assert statements[:2] == [
+            'DELETE FROM staging.flights_clean WHERE flight_date >= :start_date AND flight_date <= :end_date',
+            'DELETE FROM staging.flights_rejected WHERE flight_date >= :start_date AND flight_date <= :end_date'
+        ]
+        assert [call[0][2] for call in mock_copy.call_args_list] == [
+            'staging.flights_rejected', 'staging.flights_clean'
+        ]
+
+
+class TestPartitionedTransform:
+    """Test suite for the per-partition transform used by the mapped DAG tasks."""
+    
+    @patch('pipeline.transform._get_max_raw_id')
+    @patch('pipeline.transform.get_watermark')
+    @patch('pipeline.transform.get_db_connection')
+    def test_plan_one_partition_per_month(self, mock_conn, mock_watermark, mock_max_id, mock_staging_partitions):
+        """Test that the delta is split by month and partitions are created up front."""
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        connection = mock_engine.begin.return_value.__enter__.return_value
+        connection.execute.return_value.scalars.return_value.all.return_value = [
+            date(2024, 1, 1), date(2024, 2, 1)
+        ]
+        mock_watermark.return_value = 10
+        mock_max_id.return_value = 20
+        
+        partitions = plan_transform_partitions()
+        
+        assert partitions == [
+            {'start_date': '2024-01-01', 'end_date': '2024-01-31', 'last_id': 10, 'max_id': 20, 'include_undated': True},
+            {'start_date': '2024-02-01', 'end_date': '2024-02-29', 'last_id': 10, 'max_id': 20, 'include_undated': False}
+        ]
+        mock_staging_partitions.assert_called_once_with(connection, 10, 20)
+    
+    @patch('pipeline.transform._get_max_raw_id')
+    @patch('pipeline.transform.get_watermark')
+    @patch('pipeline.transform.get_db_connection')
+    def test_plan_nothing_new(self, mock_conn, mock_watermark, mock_max_id):
+        """Test that no partitions are planned when raw has not grown."""
+        mock_conn.return_value = MagicMock()
+        mock_watermark.return_value = 20
+        mock_max_id.return_value = 20
+        
+        assert plan_transform_partitions() == []
+    
+    @patch('pipeline.transform.set_watermark')
+    @patch('pipeline.transform.get_db_connection')
+    def test_partition_leaves_watermark_alone(self, mock_conn, mock_set_watermark):
+        """Test that a partition only loads its own dates and does not move the watermark."""
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        connection = mock_engine.begin.return_value.__enter__.return_value
+        connection.execute.return_value.fetchone.return_value = (7, 1, {'missing_airline': 1})
+        
+        result = clean_data_partition('2024-02-01', '2024-02-29', 10, 20)
+        
+        assert result['accepted'] == 7
+        query, params = connection.execute.call_args[0]
+        assert 'OR flight_date IS NULL' not in str(query)
+        assert params == {'last_id': 10, 'max_id': 20, 'min_date': '2024-02-01', 'max_date': '2024-02-29'}
+        mock_set_watermark.assert_not_called()
+    
+    @patch('pipeline.transform.get_db_connection')
+    def test_partition_rerun_clears_its_earlier_rejects(self, mock_conn):
+        """Test that a rerun deletes the rejects of its own raw id and date window before inserting."""
+        mock_engine = MagicMock()
+        mock_conn.return_value = mock_engine
+        connection = mock_engine.begin.return_value.__enter__.return_value
+        connection.execute.return_value.fetchone.return_value = (0, 0, {})
+        
+        clean_data_partition(None, None, 10, 20, include_undated=True)
+        
+        query, params = connection.execute.call_args_list[0][0]
+        assert 'DELETE FROM staging.flights_rejected' in str(query)
+        assert 'raw_id > :last_id AND raw_id <= :max_id' in str(query)
+        assert 'OR flight_date IS NULL' in str(query)
+        assert params == {'last_id': 10, 'max_id': 20, 'min_date': None, 'max_date': None}
+        assert 'INSERT INTO staging.flights_rejected' in str(connection.execute.call_args_list[1][0][0])
+    
+    @patch('pipeline.transform.publish_data_version')
+    @patch('pipeline.transform.set_watermark')
+    @patch('pipeline.transform.get_db_connection')
+    def test_merge_advances_watermark_once(self, mock_conn, mock_set_watermark, mock_publish):
+        """Test that the fan-in sums counts, moves the watermark and returns the changed windows."""
+        mock_conn.return_value = MagicMock()
+        reset_reject_counts()
+        results = [
+            {'start_date': '2024-01-01', 'end_date': '2024-01-31', 'max_id': 20,
+             'accepted': 5, 'rejected': 1, 'reasons': {'missing_airline': 1}},
+            {'start_date': '2024-02-01', 'end_date': '2024-02-29', 'max_id': 20,
+             'accepted': 3, 'rejected': 2, 'reasons': {'missing_airline': 2}}
+        ]
+        
+        windows = merge_transform_results(results)
+        
+        assert windows == [
+            {'start_date': '2024-01-01', 'end_date': '2024-01-31'},
+            {'start_date': '2024-02-01', 'end_date': '2024-02-29'}
+        ]
+        assert mock_set_watermark.call_args[0][1:] == ('transform.flights_clean', 20)
+        assert get_reject_counts() == {'missing_airline': 3}
+        mock_publish.assert_called_once()